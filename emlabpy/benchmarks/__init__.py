@@ -0,0 +1,4 @@
+"""
+The benchmarks package. These scripts time the hot paths of Emlabpy on synthetic data of increasing size.
+Run them from the emlabpy folder, e.g. python -m benchmarks.benchmark_repository_load
+"""
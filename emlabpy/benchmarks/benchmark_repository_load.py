@@ -0,0 +1,55 @@
+"""
+This benchmark times the loading of object parameter values into the Repository.
+Synthetic exported SpineDB data is generated at increasing sizes. When loading grows linearly with the DB size,
+the time per parameter value stays (roughly) constant.
+
+Run from the emlabpy folder: python -m benchmarks.benchmark_repository_load
+"""
+import time
+
+from util.spinedb_reader_writer import *
+
+object_classes = ['EnergyProducers', 'Zones', 'PowerGridNodes']
+parameters_per_class = 10
+ticks = 10
+
+
+def generate_db_data(objects_per_class: int) -> dict:
+    """
+    Generate a dict in the same structure as SpineDB.export_data(). Every parameter has a value for every tick.
+
+    :param objects_per_class: Amount of objects per object class
+    :return: Dict with objects, object_parameters and object_parameter_values
+    """
+    db_data = {'objects': [], 'object_parameters': [], 'object_parameter_values': []}
+    for object_class_name in object_classes:
+        parameter_names = ['parameter' + str(i) for i in range(parameters_per_class)]
+        db_data['object_parameters'] += [(object_class_name, i, None, None, None) for i in parameter_names]
+        for object_number in range(objects_per_class):
+            object_name = object_class_name + str(object_number)
+            db_data['objects'].append((object_class_name, object_name, None))
+            db_data['object_parameter_values'] += [(object_class_name, object_name, parameter_name, tick, str(tick))
+                                                   for parameter_name in parameter_names for tick in range(ticks)]
+    return db_data
+
+
+def time_repository_load(db_data: dict, current_tick: int) -> float:
+    reps = Repository()
+    reps.current_tick = current_tick
+    start = time.perf_counter()
+    add_object_parameter_values_to_repository(reps, db_data, {})
+    return time.perf_counter() - start
+
+
+def run_benchmark(sizes=(100, 200, 400, 800, 1600)):
+    print('{:>10} {:>12} {:>12} {:>16}'.format('objects', 'values', 'seconds', 'us per value'))
+    for objects_per_class in sizes:
+        db_data = generate_db_data(objects_per_class)
+        amount_of_values = len(db_data['object_parameter_values'])
+        seconds = time_repository_load(db_data, ticks // 2)
+        print('{:>10} {:>12} {:>12.4f} {:>16.3f}'.format(objects_per_class * len(object_classes), amount_of_values,
+                                                          seconds, 1e6 * seconds / amount_of_values))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,153 @@
+"""
+This benchmark times how EMLab scales with the size of the fleet. For every scale a synthetic scenario is generated
+(see scenario_generator.py) with the amount of PowerPlants and EnergyProducers multiplied by the scale, and the
+following steps are run on it as in emlab.py: reading the Repository, the electricity spot market (COMPETES dummy),
+the capacity market, the CO2 price and the commit of everything that was staged.
+Every step is measured with the RunReport, so the wall time, CPU time, SpineDB time and staged rows are recorded.
+
+The results are written to a JSON file. When a baseline JSON file of an earlier version is given, the wall times are
+compared to it and every step that became slower than the tolerance allows is reported as regression.
+
+Run from the emlabpy folder:
+python -m benchmarks.benchmark_scaling [--scales 1 10 100] [--output results.json] [--baseline baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.scenario_generator import write_scenario
+from modules.capacitymarket import CapacityMarketSubmitBids, CapacityMarketClearing
+from modules.co2market import CO2MarketDetermineCO2Price
+from modules.electricityspotmarket import ElectricitySpotMarketSubmitBids, ElectricitySpotMarketClearing
+from util.spinedb_reader_writer import SpineDBReaderWriter
+
+# Roughly the size of the current Dutch fleet, this is scale 1
+base_scenario = {'plants': 400, 'owners': 40, 'technologies': 30, 'zones': 2, 'ticks': 5, 'historical_ppdp_ticks': 4}
+scaled_parameters = ['plants', 'owners']
+results_version = 1
+
+
+def get_scenario(scale: int) -> dict:
+    return {key: value * scale if key in scaled_parameters else value for (key, value) in base_scenario.items()}
+
+
+def run_scale(scale: int, directory: str) -> list:
+    """
+    Generate the scenario of a scale and measure all steps on it.
+
+    :param scale: Multiplier of the amount of PowerPlants and EnergyProducers of the base scenario
+    :param directory: Directory in which the SpineDBs are created
+    :return: The RunReport records of the steps, with the scale and amount of PowerPlants added
+    """
+    scenario = get_scenario(scale)
+    db_url = 'sqlite:///' + os.path.join(directory, 'emlab_' + str(scale) + '.sqlite')
+    config_url = 'sqlite:///' + os.path.join(directory, 'config_' + str(scale) + '.sqlite')
+    start = time.perf_counter()
+    write_scenario(db_url, config_url, **scenario)
+    print('Scale ' + str(scale) + ': scenario with ' + str(scenario['plants']) + ' PowerPlants generated in ' +
+          '{:.1f}'.format(time.perf_counter() - start) + ' seconds')
+
+    dbrw = SpineDBReaderWriter(db_url, config_url)
+    try:
+        with dbrw.run_report.measure('Read Repository', None, dbrw):
+            reps = dbrw.read_db_and_create_repository()
+        tick = reps.current_tick
+        electricity_spot_market_modules = [ElectricitySpotMarketSubmitBids(reps), ElectricitySpotMarketClearing(reps)]
+        capacity_market_modules = [CapacityMarketSubmitBids(reps), CapacityMarketClearing(reps)]
+        co2_market_module = CO2MarketDetermineCO2Price(reps)
+
+        with dbrw.run_report.measure('Electricity Spot Market', tick, dbrw):
+            for module in electricity_spot_market_modules:
+                module.act()
+        with dbrw.run_report.measure('Capacity Market', tick, dbrw):
+            for module in capacity_market_modules:
+                module.act()
+        with dbrw.run_report.measure('CO2 Price', tick, dbrw):
+            co2_market_module.act()
+        with dbrw.run_report.measure('Commit', tick, dbrw):
+            dbrw.commit('Benchmark scale ' + str(scale))
+    finally:
+        dbrw.db.close_connection()
+        dbrw.config_db.close_connection()
+
+    return [dict(scale=scale, plants=scenario['plants'], **record) for record in dbrw.run_report.records]
+
+
+def run_benchmark(scales=(1, 10, 100)) -> dict:
+    """
+    :return: The results: the versions and scenario the benchmark was run with and the records of all scales
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        records = []
+        for scale in scales:
+            records += run_scale(scale, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {'version': results_version, 'python': platform.python_version(), 'numpy': np.__version__,
+            'base_scenario': base_scenario, 'records': records}
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Compare the wall times of the results to those of the baseline. Only the steps and scales that are in both
+    are compared.
+
+    :param results: Results of run_benchmark
+    :param baseline: Results of an earlier run_benchmark
+    :param tolerance: Allowed relative increase of the wall time
+    :return: List of (scale, step, baseline wall time, wall time) of every step that is slower than allowed
+    """
+    if baseline.get('version') != results['version'] or baseline.get('base_scenario') != results['base_scenario']:
+        raise ValueError('Baseline was run with another version of the benchmark or another base scenario')
+    baseline_wall_times = {(record['scale'], record['module']): record['wall_time'] for record in baseline['records']}
+    regressions = []
+    for record in results['records']:
+        key = (record['scale'], record['module'])
+        if key in baseline_wall_times and record['wall_time'] > (1 + tolerance) * baseline_wall_times[key]:
+            regressions.append((record['scale'], record['module'], baseline_wall_times[key], record['wall_time']))
+    return regressions
+
+
+def print_results(results: dict, baseline: dict = None):
+    baseline_wall_times = {} if baseline is None else \
+        {(record['scale'], record['module']): record['wall_time'] for record in baseline['records']}
+    print('{:>6} {:>8} {:<24} {:>10} {:>10} {:>10} {:>12} {:>10}'.format(
+        'scale', 'plants', 'step', 'wall', 'cpu', 'db', 'staged rows', 'baseline'))
+    for record in results['records']:
+        baseline_wall_time = baseline_wall_times.get((record['scale'], record['module']))
+        print('{:>6} {:>8} {:<24} {:>10.3f} {:>10.3f} {:>10.3f} {:>12} {:>10}'.format(
+            record['scale'], record['plants'], record['module'], record['wall_time'], record['cpu_time'],
+            record['db_time'], record['staged_rows'],
+            '' if baseline_wall_time is None else '{:.3f}'.format(baseline_wall_time)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark EMLab at multiple scales of the fleet')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--output', default='benchmark_scaling.json', help='JSON file to write the results to')
+    parser.add_argument('--baseline', help='JSON file with the results of an earlier version to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative increase of the wall time')
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmark(args.scales)
+    with open(args.output, 'w') as results_file:
+        json.dump(benchmark_results, results_file, indent=2)
+
+    benchmark_baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            benchmark_baseline = json.load(baseline_file)
+    print_results(benchmark_results, benchmark_baseline)
+    if benchmark_baseline is not None:
+        for (regression_scale, step, baseline_time, wall_time) in compare_to_baseline(benchmark_results,
+                                                                                      benchmark_baseline,
+                                                                                      args.tolerance):
+            print('Regression at scale ' + str(regression_scale) + ': ' + step + ' took ' +
+                  '{:.3f}'.format(wall_time) + ' seconds, baseline ' + '{:.3f}'.format(baseline_time))
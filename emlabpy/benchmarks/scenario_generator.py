@@ -0,0 +1,241 @@
+"""
+This file generates synthetic EMLab and configuration SpineDBs, so that EMLab can be run and benchmarked at any size.
+The scenario has the object classes, parameters and values that the Repository reads from the SpineDB created by the
+Spine Toolbox project: trends, zones and their PowerGridNodes and Hourly Demand, EnergyProducers, Substances,
+PowerGeneratingTechnologies and their fuel mix, PowerPlants, the markets, the governments and the
+PowerPlantDispatchPlans and MarketClearingPoints of the ticks that have been simulated already.
+All numbers are drawn from a seeded random generator, so the same arguments always generate the same scenario.
+
+The first zone is 'NL' with the 'DutchElectricitySpotMarket', as the modules look these up by name.
+
+Run from the emlabpy folder: python -m benchmarks.scenario_generator <EMLab DB url> <config DB url> [plants]
+"""
+import sys
+
+import numpy as np
+from spinedb_api import Map, TimeSeriesVariableResolution
+from spinedb_api.helpers import create_new_spine_database
+
+from util.spinedb import SpineDB
+
+fuels = ['Coal', 'Natural Gas', 'Lignite', 'Uranium', 'Biomass', 'Oil']
+first_zone = 'NL'
+first_electricity_spot_market = 'DutchElectricitySpotMarket'
+
+
+def get_zone_names(zones: int) -> list:
+    return [first_zone] + ['Zone' + str(i) for i in range(1, zones)]
+
+
+def get_electricity_spot_market_name(zone: str) -> str:
+    return first_electricity_spot_market if zone == first_zone else zone + 'ElectricitySpotMarket'
+
+
+class ScenarioData:
+    """
+    Collects the objects and parameter values of a scenario in the structure of SpineDB.import_data().
+    """
+    def __init__(self):
+        self.object_classes = dict()
+        self.object_parameters = dict()
+        self.objects = dict()
+        self.object_parameter_values = []
+        self.alternatives = dict()
+
+    def add_object(self, object_class_name: str, object_name: str, parameter_values: dict, alternative: str = '0'):
+        """
+        Add an object with its parameter values in one alternative.
+
+        :param object_class_name: Name of the object class
+        :param object_name: Name of the object
+        :param parameter_values: Dict of parameter name: value
+        :param alternative: Alternative (the tick) of the values
+        """
+        self.object_classes[object_class_name] = None
+        self.objects[(object_class_name, object_name, None)] = None
+        self.alternatives[alternative] = None
+        for parameter_name, value in parameter_values.items():
+            self.object_parameters[(object_class_name, parameter_name, None, None, None)] = None
+            self.object_parameter_values.append((object_class_name, object_name, parameter_name, value, alternative))
+
+    def to_dict(self) -> dict:
+        return {'object_classes': list(self.object_classes.keys()),
+                'object_parameters': list(self.object_parameters.keys()),
+                'objects': list(self.objects.keys()),
+                'alternatives': list(self.alternatives.keys()),
+                'object_parameter_values': self.object_parameter_values}
+
+
+def generate_emlab_data(plants: int = 400, owners: int = 40, technologies: int = 30, zones: int = 2,
+                        ticks: int = 5, historical_ppdp_ticks: int = 4, start_year: int = 2020, end_year: int = 2050,
+                        hours: int = 8760, seed: int = 0) -> dict:
+    """
+    Generate the data of a synthetic EMLab SpineDB.
+
+    :param plants: Amount of PowerPlants
+    :param owners: Amount of EnergyProducers
+    :param technologies: Amount of PowerGeneratingTechnologies
+    :param zones: Amount of zones, each with a PowerGridNode, Hourly Demand and electricity spot and capacity market
+    :param ticks: Amount of ticks that have been simulated, the current tick is ticks - 1
+    :param historical_ppdp_ticks: Amount of ticks before the current one with dispatch plans of every PowerPlant
+    :param start_year: Start year of the simulation
+    :param end_year: End year of the simulation, the Hourly Demand is generated up to this year
+    :param hours: Amount of hours in the Hourly Demand of a year
+    :param seed: Seed of the random generator
+    :return: Dict in the structure of SpineDB.import_data()
+    """
+    random_generator = np.random.default_rng(seed)
+    data = ScenarioData()
+    current_tick = ticks - 1
+    for tick in range(ticks):
+        data.add_object('SystemClockTicks', 'SystemClockTicks', {'ticks': tick}, str(tick))
+
+    # Zones, their PowerGridNode (with the same name) and demand
+    # Objects are only read into the Repository through their parameter values, so every object has at least one
+    zone_names = get_zone_names(zones)
+    years = [str(year) for year in range(5 * round(start_year / 5), end_year + 5, 5)]
+    for zone in zone_names:
+        data.add_object('Zones', zone, {'Country': zone})
+        data.add_object('PowerGridNodes', zone, {'Country': zone})
+        peak_load = random_generator.uniform(10000, 20000)
+        load_duration_curve = np.sort(random_generator.uniform(0.4, 1, hours))[::-1] * peak_load
+        data.add_object('Hourly Demand', zone, {
+            'Hourly Demand': Map(years, [Map([float(hour) for hour in range(hours)],
+                                             (load_duration_curve * 1.01 ** i).tolist())
+                                         for i in range(len(years))]),
+            'ldc': TimeSeriesVariableResolution(
+                [np.datetime64(str(start_year), 'h') + hour for hour in range(hours)], load_duration_curve.tolist(),
+                False, False)})
+
+    # Trends
+    for fuel in fuels:
+        start = random_generator.uniform(2, 30)
+        data.add_object('TriangularTrends', fuel + 'PriceTrend',
+                        {'Start': start, 'Top': 1.01, 'Max': 1.05, 'Min': 0.97})
+    data.add_object('StepTrends', 'CO2CapTrend',
+                    {'start': 100 * plants * 5000, 'duration': 1, 'increment': -2 * plants * 5000, 'minValue': 0})
+    data.add_object('StepTrends', 'MinCO2PriceTrend', {'start': 10, 'duration': 1, 'increment': 1, 'minValue': 0})
+    data.add_object('StepTrends', 'MSRUpperTriggerTrend', {'start': 833 * plants, 'duration': 1, 'increment': 0,
+                                                           'minValue': 0})
+    data.add_object('StepTrends', 'MSRLowerTriggerTrend', {'start': 400 * plants, 'duration': 1, 'increment': 0,
+                                                           'minValue': 0})
+    data.add_object('StepTrends', 'MSRReleaseTrend', {'start': 100 * plants, 'duration': 1, 'increment': 0,
+                                                      'minValue': 0})
+
+    # Substances, technologies and their fuel mix
+    for fuel in fuels:
+        data.add_object('Substances', fuel, {'co2Density': random_generator.uniform(0, 0.4), 'energyDensity': 1,
+                                             'quality': 1, 'trend': fuel + 'PriceTrend'})
+    technology_names = ['Technology' + str(i) for i in range(technologies)]
+    for i, technology in enumerate(technology_names):
+        fuel = fuels[i % len(fuels)]
+        data.add_object('GeometricTrends', technology + 'FixedOperatingCostTrend',
+                        {'start': random_generator.uniform(10000, 60000), 'growthRate': 0.01})
+        data.add_object('PowerGeneratingTechnologies', technology, {
+            'FUELNEW': fuel, 'FUELTYPENEW': 'TechType' + str(i), 'peakSegmentDependentAvailability':
+                random_generator.uniform(0.5, 1), 'expectedPermittime': 1, 'expectedLeadtime': 2,
+            'LifeTime(Years)': 40, 'fixedOperatingCostTimeSeries': technology + 'FixedOperatingCostTrend',
+            'co2CaptureEfficiency': 0})
+        data.add_object('PowerGeneratingTechnologyFuel', technology, {'FUELNEW': fuel})
+
+    # Actors and markets
+    owner_names = ['EnergyProducer' + str(i) for i in range(owners)]
+    for owner in owner_names:
+        data.add_object('EnergyProducers', owner, {'cash': 1e9})
+    for zone in zone_names:
+        data.add_object('ElectricitySpotMarkets', get_electricity_spot_market_name(zone), {'zone': zone})
+        data.add_object('CapacityMarkets', zone + 'CapacityMarket', {
+            'zone': zone, 'InstalledReserveMargin': 0.15, 'LowerMargin': 0.025, 'UpperMargin': 0.025,
+            'PriceCap': 75000})
+    data.add_object('CO2Auction', 'CO2Auction', {'zone': first_zone})
+    data.add_object('Governments', 'EuropeanGovernment', {'co2Penalty': 100, 'co2CapTrend': 'CO2CapTrend',
+                                                          'minCo2PriceTrend': 'MinCO2PriceTrend'})
+    for zone in zone_names:
+        data.add_object('NationalGovernments', zone + 'Government', {'governedZone': zone,
+                                                                     'minNationalCo2PriceTrend': 'MinCO2PriceTrend'})
+    data.add_object('MarketStabilityReserve', 'MarketStabilityReserve', {
+        'UpperTriggerTrend': 'MSRUpperTriggerTrend', 'LowerTriggerTrend': 'MSRLowerTriggerTrend',
+        'ReleaseTrend': 'MSRReleaseTrend', 'Zone': first_zone})
+
+    # PowerPlants
+    plant_technologies = random_generator.integers(0, technologies, plants)
+    plant_owners = random_generator.integers(0, owners, plants)
+    plant_zones = random_generator.integers(0, zones, plants)
+    plant_capacities = random_generator.integers(10, 1500, plants)
+    plant_efficiencies = random_generator.uniform(0.3, 0.6, plants)
+    plant_on_stream_years = start_year - random_generator.integers(0, 35, plants)
+    for i in range(plants):
+        technology_index = plant_technologies[i].item()
+        data.add_object('PowerPlants', 'PowerPlant' + str(i), {
+            'TECHTYPENL': 'TechType' + str(technology_index), 'FUELNL': fuels[technology_index % len(fuels)],
+            'BUSNL': zone_names[plant_zones[i]], 'FirmNL': owner_names[plant_owners[i]],
+            'MWNL': plant_capacities[i].item(), 'EfficiencyNL': plant_efficiencies[i].item(), 'STATUSNL': 'OPR',
+            'ON-STREAMNL': plant_on_stream_years[i].item()})
+        for tick in range(ticks):
+            data.add_object('PowerPlants', 'PowerPlant' + str(i),
+                            {'Allowances': random_generator.integers(0, 1000).item()}, str(tick))
+
+    # Dispatch plans and clearing points of the ticks before the current one
+    for tick in range(max(0, current_tick - historical_ppdp_ticks), current_tick):
+        prices = random_generator.uniform(0, 100, plants)
+        clearing_price = 60.0
+        for i in range(plants):
+            accepted = prices[i] <= clearing_price
+            data.add_object('PowerPlantDispatchPlans', 'PowerPlantDispatchPlan ' + str(tick) + ' ' + str(i), {
+                'Plant': 'PowerPlant' + str(i), 'EnergyProducer': owner_names[plant_owners[i]],
+                'Market': get_electricity_spot_market_name(zone_names[plant_zones[i]]),
+                'Capacity': plant_capacities[i].item(), 'Price': prices[i].item(),
+                'AcceptedAmount': plant_capacities[i].item() if accepted else 0,
+                'Status': 'Accepted' if accepted else 'Failed'}, str(tick))
+        for zone in zone_names:
+            market = get_electricity_spot_market_name(zone)
+            data.add_object('MarketClearingPoints', 'MarketClearingPoint ' + market + ' ' + str(tick), {
+                'Market': market, 'Price': clearing_price,
+                'TotalCapacity': plant_capacities[(prices <= clearing_price) & (plant_zones == zone_names.index(zone))]
+                .sum().item()}, str(tick))
+        data.add_object('MarketClearingPoints', 'MarketClearingPoint CO2Auction ' + str(tick), {
+            'Market': 'CO2Auction', 'Price': 20.0 + tick, 'TotalCapacity': 0}, str(tick))
+
+    return data.to_dict()
+
+
+def generate_config_data(start_year: int = 2020, time_step: int = 1, end_year: int = 2050) -> dict:
+    """
+    Generate the data of the configuration SpineDB: the Coupling Parameters and the import priorities.
+    Objects are referred to by name, so the classes they refer to have to be imported first.
+
+    :return: Dict in the structure of SpineDB.import_data()
+    """
+    data = ScenarioData()
+    for (coupling_parameter, value) in [('Start Year', start_year), ('Time Step', time_step), ('End Year', end_year)]:
+        data.add_object('Coupling Parameters', coupling_parameter, {'value': value})
+    data.add_object('EMLAB Parameters', 'Import Priorities', {
+        'GeometricTrends': 10, 'TriangularTrends': 10, 'StepTrends': 10, 'Zones': 9, 'PowerGridNodes': 8,
+        'EnergyProducers': 8, 'Substances': 7, 'ElectricitySpotMarkets': 7, 'CapacityMarkets': 7, 'CO2Auction': 7,
+        'PowerGeneratingTechnologies': 6, 'PowerGeneratingTechnologyFuel': 5, 'PowerPlants': 4})
+    return data.to_dict()
+
+
+def write_scenario(db_url: str, config_url: str, **scenario_size):
+    """
+    Generate a scenario and write it to new SpineDBs.
+
+    :param db_url: URL of the EMLab SpineDB to create
+    :param config_url: URL of the configuration SpineDB to create
+    :param scenario_size: Keyword arguments of generate_emlab_data
+    """
+    for (url, data) in [(db_url, generate_emlab_data(**scenario_size)),
+                        (config_url, generate_config_data(scenario_size.get('start_year', 2020),
+                                                          end_year=scenario_size.get('end_year', 2050)))]:
+        create_new_spine_database(url)
+        db = SpineDB(url, 'w')
+        db.import_data(data)
+        db.commit('Synthetic scenario')
+        db.close_connection()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3:
+        write_scenario(sys.argv[1], sys.argv[2], plants=int(sys.argv[3]))
+    else:
+        write_scenario(sys.argv[1], sys.argv[2])
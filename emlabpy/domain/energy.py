@@ -6,26 +6,195 @@ Jim Hommes - 13-5-2021
 from domain.actors import EnergyProducer
 from domain.import_object import *
 import logging
+import numpy as np
 import random
 
 
+class PowerPlantFleet(dict):
+    """
+    Dict of PowerPlant name to PowerPlant, that stores the data of the PowerPlants in columns: one NumPy array per
+    attribute, with one row per PowerPlant. The PowerPlants are views onto their row.
+    Attributes that refer to other objects (technology, location, owner) and the status are stored as index into a
+    list of the distinct values.
+
+    A PowerPlant that is created on its own has a fleet of its own. When it is put into a PowerPlantFleet, its data is
+    copied into the fleet and the PowerPlant becomes a view onto its new row.
+    """
+    numeric_columns = {'capacity': int, 'efficiency': float, 'age': int, 'construction_start_time': int,
+                       'on_stream_year': int, 'has_on_stream_year': bool}
+    object_columns = {'technology': None, 'location': None, 'owner': None, 'status': 'NOTSET'}
+
+    def __init__(self, allowance_ticks=100):
+        super().__init__()
+        self.allowance_ticks = allowance_ticks
+        self.size = 0
+        self.columns = {column_name: np.zeros(0, dtype=dtype)
+                        for (column_name, dtype) in self.numeric_columns.items()}
+        for column_name in self.object_columns.keys():
+            self.columns[column_name] = np.zeros(0, dtype=np.int32)
+        self.banked_allowances = np.zeros((0, allowance_ticks))
+        # Per object column: the distinct values, and the index of each value
+        self.object_values = {column_name: [] for column_name in self.object_columns.keys()}
+        self.object_value_indices = {column_name: dict() for column_name in self.object_columns.keys()}
+
+    def __setitem__(self, name, power_plant):
+        if power_plant.fleet is not self:
+            self.adopt(power_plant)
+        super().__setitem__(name, power_plant)
+
+    def __reduce__(self):
+        # The PowerPlants refer to this fleet, so the items are restored after the fleet has been created
+        return self.__class__, (self.allowance_ticks,), (vars(self), list(self.items()))
+
+    def __setstate__(self, state):
+        (attributes, items) = state
+        self.__dict__.update(attributes)
+        for (name, power_plant) in items:
+            super().__setitem__(name, power_plant)
+
+    def add_row(self) -> int:
+        """
+        Add a row with default values. The arrays grow by doubling, so that adding rows one by one is cheap.
+
+        :return: The index of the new row
+        """
+        if self.size == len(self.banked_allowances):
+            new_length = self.size + max(1, self.size // 2)
+            for (column_name, column) in self.columns.items():
+                self.columns[column_name] = np.resize(column, new_length)
+            self.banked_allowances = np.resize(self.banked_allowances, (new_length, self.allowance_ticks))
+        index = self.size
+        self.size += 1
+        for column_name in self.numeric_columns.keys():
+            self.columns[column_name][index] = 0
+        for (column_name, default_value) in self.object_columns.items():
+            self.set_object(column_name, index, default_value)
+        self.banked_allowances[index] = 0
+        return index
+
+    def trim(self):
+        """
+        Release the memory of the rows that were allocated ahead, e.g. after loading.
+        """
+        for (column_name, column) in self.columns.items():
+            self.columns[column_name] = column[:self.size].copy()
+        self.banked_allowances = self.banked_allowances[:self.size].copy()
+
+    def adopt(self, power_plant):
+        """
+        Copy the data of a PowerPlant into a new row of this fleet and make the PowerPlant a view onto that row.
+        """
+        index = self.add_row()
+        for column_name in self.numeric_columns.keys():
+            self.columns[column_name][index] = power_plant.fleet.columns[column_name][power_plant.index]
+        for column_name in self.object_columns.keys():
+            self.set_object(column_name, index, power_plant.fleet.get_object(column_name, power_plant.index))
+        self.banked_allowances[index] = power_plant.fleet.banked_allowances[power_plant.index]
+        power_plant.fleet = self
+        power_plant.index = index
+
+    def get_object(self, column_name: str, index: int):
+        return self.object_values[column_name][self.columns[column_name][index]]
+
+    def set_object(self, column_name: str, index: int, value):
+        value_indices = self.object_value_indices[column_name]
+        if value not in value_indices.keys():
+            value_indices[value] = len(self.object_values[column_name])
+            self.object_values[column_name].append(value)
+        self.columns[column_name][index] = value_indices[value]
+
+    def get_object_index(self, column_name: str, value) -> int:
+        """
+        :return: The index of the value in an object column, or -1 if no PowerPlant has this value
+        """
+        return self.object_value_indices[column_name].get(value, -1)
+
+    def select(self, mask: np.ndarray) -> list:
+        """
+        Get the PowerPlants of which the row is selected by the mask, in the order of this dict.
+
+        :param mask: Boolean array over the rows of this fleet
+        :return: List of PowerPlants
+        """
+        selected = mask.tolist()
+        return [power_plant for power_plant in self.values() if selected[power_plant.index]]
+
+    def get_column(self, column_name: str) -> np.ndarray:
+        """
+        Get the values of a column for all rows. For object columns these are the indices into object_values.
+        """
+        return self.columns[column_name][:self.size]
+
+    def update_ages(self, current_year: int):
+        """
+        Derive the age of the PowerPlants that have an on-stream year from the current year, e.g. after the clock has
+        been advanced.
+        """
+        with_on_stream_year = self.get_column('has_on_stream_year')
+        self.get_column('age')[with_on_stream_year] = \
+            current_year - self.get_column('on_stream_year')[with_on_stream_year]
+
+
+def fleet_column(column_name: str) -> property:
+    """
+    Property of a PowerPlant that reads and writes its row in a numeric column of the PowerPlantFleet.
+    """
+    def get_value(power_plant):
+        return power_plant.fleet.columns[column_name][power_plant.index].item()
+
+    def set_value(power_plant, value):
+        power_plant.fleet.columns[column_name][power_plant.index] = value
+    return property(get_value, set_value)
+
+
+def fleet_object_column(column_name: str) -> property:
+    """
+    Property of a PowerPlant that reads and writes its row in an object column of the PowerPlantFleet.
+    """
+    def get_value(power_plant):
+        return power_plant.fleet.get_object(column_name, power_plant.index)
+
+    def set_value(power_plant, value):
+        power_plant.fleet.set_object(column_name, power_plant.index, value)
+    return property(get_value, set_value)
+
+
 class PowerPlant(ImportObject):
-    def __init__(self, name):
+    """
+    View onto a row of a PowerPlantFleet. All data other than the name, parameters and the strings used while loading
+    is stored in the fleet.
+    """
+    __slots__ = ('fleet', 'index', 'techtypestr', 'fuelstr')
+
+    capacity = fleet_column('capacity')
+    efficiency = fleet_column('efficiency')
+    # TODO: Implement GetActualEfficiency
+    # this.setActualEfficiency(this.getTechnology().getEfficiency(
+    #                 timeOfPermitorBuildingStart + getActualLeadtime() + getActualPermittime()));
+    age = fleet_column('age')
+    construction_start_time = fleet_column('construction_start_time')
+    on_stream_year = fleet_column('on_stream_year')
+    technology = fleet_object_column('technology')
+    location = fleet_object_column('location')
+    owner = fleet_object_column('owner')
+    status = fleet_object_column('status')
+
+    def __init__(self, name, fleet: PowerPlantFleet = None):
         super().__init__(name)
-        self.technology = None
-        self.location = None
-        self.age = 0
-        self.owner = None
-        self.capacity = 0
-        self.efficiency = 0
-        # TODO: Implement GetActualEfficiency
-        # this.setActualEfficiency(this.getTechnology().getEfficiency(
-        #                 timeOfPermitorBuildingStart + getActualLeadtime() + getActualPermittime()));
-        self.construction_start_time = 0
-        self.banked_allowances = [0 for i in range(100)]
+        self.fleet = fleet if fleet is not None else PowerPlantFleet()
+        self.index = self.fleet.add_row()
         self.techtypestr = ''
         self.fuelstr = ''
-        self.status = 'NOTSET'
+        if fleet is not None:
+            fleet[name] = self
+
+    @property
+    def banked_allowances(self) -> np.ndarray:
+        return self.fleet.banked_allowances[self.index]
+
+    @banked_allowances.setter
+    def banked_allowances(self, value):
+        self.fleet.banked_allowances[self.index] = value
 
     def add_parameter_value(self, reps, parameter_name, parameter_value, alternative):
         if parameter_name == 'TECHTYPENL':
@@ -62,7 +231,10 @@ class PowerPlant(ImportObject):
         elif parameter_name == 'STATUSNL':
             self.status = parameter_value
         elif parameter_name == 'ON-STREAMNL':
-            self.age = reps.current_tick - int(parameter_value) + reps.start_simulation_year
+            # The age is derived from the on-stream year again whenever the current tick changes
+            self.on_stream_year = int(parameter_value)
+            self.fleet.columns['has_on_stream_year'][self.index] = True
+            self.age = reps.current_tick - self.on_stream_year + reps.start_simulation_year
 
     def calculate_emission_intensity(self, reps):
         emission = 0
@@ -117,6 +289,16 @@ class PowerPlant(ImportObject):
         else:
             return 0
 
+    def __str__(self):
+        return str({'name': self.name, 'parameters': self.parameters, 'technology': self.technology,
+                    'location': self.location, 'age': self.age, 'owner': self.owner, 'capacity': self.capacity,
+                    'efficiency': self.efficiency, 'construction_start_time': self.construction_start_time,
+                    'banked_allowances': self.banked_allowances.tolist(), 'techtypestr': self.techtypestr,
+                    'fuelstr': self.fuelstr, 'status': self.status})
+
+    def __repr__(self):
+        return self.__str__()
+
 
 class PowerGeneratingTechnology(ImportObject):
     def __init__(self, name):
@@ -222,7 +404,127 @@ class SubstanceInFuelMix(ImportObject):
             self.substances.append(reps.substances[parameter_value])
 
 
-class PowerPlantDispatchPlan(ImportObject):
+class FleetCostCalculator:
+    """
+    Calculates the marginal cost and emission intensity of (a selection of) the PowerPlants of a PowerPlantFleet at
+    once. The selection is given as array of rows of the fleet, e.g. the operational PowerPlants only.
+    The fuel mixes are translated into a matrix with one row per technology of the fleet and one column per fuel
+    in the mix, holding the index of the Substance (or -1). The values per PowerPlant are then gathered from the fleet
+    columns, in the same order of operations as PowerPlant.calculate_emission_intensity and
+    PowerPlant.calculate_marginal_cost_excl_co2_market_cost, so the results are identical.
+    The matrix is rebuilt for every calculation, as technologies, fuel mixes and substances are changed in place when
+    the Repository is refreshed. It only has a row per technology, so this is cheap compared to the calculation.
+    """
+
+    def __init__(self, fleet: PowerPlantFleet, fuel_mixes: dict):
+        self.fleet = fleet
+        self.fuel_mixes = fuel_mixes
+        self.substances = []
+        self.co2_densities = np.zeros(0)
+        self.fuel_mix_substances = np.zeros((0, 0), dtype=np.int64)
+        self.fuel_mix_shares = np.zeros(0)
+        self.capture_efficiencies = np.zeros(0)
+        self.has_fuel_mix = np.zeros(0, dtype=bool)
+
+    def update_fuel_mix_matrix(self):
+        """
+        Rebuild the technology to fuel mix matrix from the current technologies, fuel mixes and substances.
+        """
+        technologies = self.fleet.object_values['technology']
+        fuel_mixes = [None if technology is None else self.fuel_mixes.get(technology.name)
+                      for technology in technologies]
+        substance_indices = dict()
+        self.substances = []
+        for fuel_mix in fuel_mixes:
+            for substance in (fuel_mix.substances if fuel_mix is not None else []):
+                if substance not in substance_indices.keys():
+                    substance_indices[substance] = len(self.substances)
+                    self.substances.append(substance)
+        n_fuels = max([len(fuel_mix.substances) for fuel_mix in fuel_mixes if fuel_mix is not None], default=0)
+        self.co2_densities = np.array([substance.co2_density for substance in self.substances], dtype=float)
+        self.fuel_mix_substances = np.full((len(technologies), n_fuels), -1, dtype=np.int64)
+        self.fuel_mix_shares = np.zeros(len(technologies))
+        self.capture_efficiencies = np.zeros(len(technologies))
+        self.has_fuel_mix = np.zeros(len(technologies), dtype=bool)
+        for (row, (technology, fuel_mix)) in enumerate(zip(technologies, fuel_mixes)):
+            if fuel_mix is None:
+                continue
+            self.has_fuel_mix[row] = True
+            self.fuel_mix_shares[row] = fuel_mix.share
+            self.capture_efficiencies[row] = float(technology.co2_capture_efficiency)
+            for (column, substance) in enumerate(fuel_mix.substances):
+                self.fuel_mix_substances[row, column] = substance_indices[substance]
+
+    def get_rows(self, rows: np.ndarray = None) -> np.ndarray:
+        """
+        :param rows: Array of rows of the fleet, or None for all rows
+        :return: The array of rows
+        """
+        return np.arange(self.fleet.size) if rows is None else rows
+
+    def sum_over_fuel_mix(self, get_fuel_values, rows: np.ndarray) -> np.ndarray:
+        """
+        Sum a value over the fuels in the mix of the selected PowerPlants, fuel by fuel. The matrix has to be up to
+        date. Raises a ValueError if a selected PowerPlant has no technology or fuel mix, as there is no value for it.
+
+        :param get_fuel_values: Function of the Substance indices of one fuel for all selected rows, and their
+        technology rows, that returns the value of that fuel for all selected rows
+        :param rows: Array of the selected rows of the fleet
+        :return: Array with one value per selected row
+        """
+        technology_rows = self.fleet.get_column('technology')[rows]
+        without_fuel_mix = ~self.has_fuel_mix[technology_rows]
+        if without_fuel_mix.any():
+            selected = np.zeros(self.fleet.size, dtype=bool)
+            selected[rows[without_fuel_mix]] = True
+            raise ValueError('No technology or fuel mix for PowerPlants: ' +
+                             ', '.join(power_plant.name for power_plant in self.fleet.select(selected)))
+        fuel_mix_substances = self.fuel_mix_substances[technology_rows]
+        total = np.zeros(len(technology_rows))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for column in range(fuel_mix_substances.shape[1]):
+                substance_indices = fuel_mix_substances[:, column]
+                total += np.where(substance_indices >= 0, get_fuel_values(substance_indices, technology_rows), 0.0)
+        return total
+
+    def get_emission_intensities(self, rows: np.ndarray = None) -> np.ndarray:
+        """
+        :param rows: Array of rows of the fleet to calculate, or None for all rows
+        :return: The emission intensity (ton CO2 / MWh) per row
+        """
+        rows = self.get_rows(rows)
+        efficiencies = self.fleet.get_column('efficiency')[rows]
+        self.update_fuel_mix_matrix()
+        return self.sum_over_fuel_mix(
+            lambda substance_indices, technology_rows: self.fuel_mix_shares[technology_rows] * (
+                self.co2_densities[substance_indices] * (1 - self.capture_efficiencies[technology_rows])) /
+            efficiencies, rows)
+
+    def get_marginal_fuel_costs_per_mw_by_tick(self, time: int, rows: np.ndarray = None) -> np.ndarray:
+        """
+        :param rows: Array of rows of the fleet to calculate, or None for all rows
+        :return: The marginal fuel cost (Euro / MWh) per row
+        """
+        rows = self.get_rows(rows)
+        efficiencies = self.fleet.get_column('efficiency')[rows]
+        self.update_fuel_mix_matrix()
+        prices = np.array([substance.get_price_for_tick(time) for substance in self.substances], dtype=float)
+        return self.sum_over_fuel_mix(
+            lambda substance_indices, technology_rows: self.fuel_mix_shares[technology_rows] *
+            prices[substance_indices] / efficiencies, rows)
+
+    def get_marginal_costs_excl_co2_market_cost(self, time: int, rows: np.ndarray = None) -> np.ndarray:
+        """
+        :param rows: Array of rows of the fleet to calculate, or None for all rows
+        :return: The marginal cost excluding the CO2 market cost (Euro / MWh) per row
+        """
+        co2_tax = 0  # TODO: Retrieve CO2 Market Price
+        with np.errstate(invalid='ignore'):
+            return self.get_marginal_fuel_costs_per_mw_by_tick(time, rows) + \
+                self.get_emission_intensities(rows) * co2_tax
+
+
+class PowerPlantDispatchPlan(IndexedImportObject):
     def __init__(self, name):
         super().__init__(name)
         self.plant = None
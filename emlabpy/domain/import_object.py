@@ -5,7 +5,10 @@ class ImportObject:
     Parent Class for all objects imported from Spine
     Will probably become redundant in the future as it's neater to translate parameters to Python parameters
     instead of a dict like this
+    The name and parameters are kept in slots, so that subclasses that define __slots__ themselves (like PowerPlant)
+    have no __dict__ per object. Other subclasses keep their attributes in a __dict__ as usual.
     """
+    __slots__ = ('name', 'parameters')
 
     def __init__(self, name: str):
         self.name = name
@@ -14,8 +17,49 @@ class ImportObject:
     def add_parameter_value(self, reps, parameter_name: str, parameter_value, alternative: str):
         self.parameters[parameter_name] = parameter_value
 
+    def get_attributes(self) -> dict:
+        """
+        :return: Dict of all attributes, including the name and parameters slots
+        """
+        return {'name': self.name, 'parameters': self.parameters, **getattr(self, '__dict__', {})}
+
     def __str__(self):
-        return str(vars(self))
+        return str(self.get_attributes())
 
     def __repr__(self):
-        return str(vars(self))
+        return str(self.get_attributes())
+
+    def __setstate__(self, state):
+        # The attributes are set directly, as subclasses may act on setting an attribute (e.g. Trend, which then
+        # drops its precomputed values)
+        (attributes, slots) = state if isinstance(state, tuple) else (state, None)
+        for (key, value) in (slots or {}).items():
+            object.__setattr__(self, key, value)
+        if attributes:
+            self.__dict__.update(attributes)
+
+
+class IndexedImportObject(ImportObject):
+    """
+    Parent Class for imported objects that are stored in an IndexedDict of the Repository.
+    Whenever an attribute is set, the indexes this object is part of are updated.
+    The list of IndexedDicts is kept in a slot, so that it does not show up in vars() of the object.
+    """
+    __slots__ = ('indexed_by',)
+
+    def __init__(self, name: str):
+        self.indexed_by = []
+        super().__init__(name)
+
+    def __setattr__(self, key, value):
+        super().__setattr__(key, value)
+        for indexed_dict in getattr(self, 'indexed_by', ()):
+            indexed_dict.update_indexes(self)
+
+    def __getstate__(self):
+        # The IndexedDicts are not part of the state: they add themselves again when they are unpickled
+        return self.__dict__, {'name': self.name, 'parameters': self.parameters}
+
+    def __setstate__(self, state):
+        object.__setattr__(self, 'indexed_by', [])
+        super().__setstate__(state)
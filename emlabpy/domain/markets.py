@@ -4,6 +4,7 @@ This file contains all Market and Market operation classes.
 Jim Hommes - 13-5-2021
 """
 from domain.import_object import *
+import numpy as np
 
 
 class Market(ImportObject):
@@ -34,7 +35,7 @@ class CO2Market(Market):
     pass
 
 
-class MarketClearingPoint(ImportObject):
+class MarketClearingPoint(IndexedImportObject):
     def __init__(self, name):
         super().__init__(name)
         self.market = None
@@ -79,6 +80,17 @@ class SlopingDemandCurve:
         elif self.um_volume < volume:
             return 0
 
+    def get_prices_at_volumes(self, volumes: np.ndarray) -> np.ndarray:
+        """
+        Array version of get_price_at_volume.
+
+        :param volumes: Array of volumes
+        :return: Array of prices, one per volume
+        """
+        m = self.price_cap / (self.um_volume - self.lm_volume)
+        return np.where(volumes < self.lm_volume, self.price_cap,
+                        np.where(volumes <= self.um_volume, self.price_cap - m * (volumes - self.lm_volume), 0))
+
     def get_volume_at_price(self, price):
         m = self.price_cap / (self.um_volume - self.lm_volume)
         if price >= self.price_cap:
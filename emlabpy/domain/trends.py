@@ -4,20 +4,61 @@ This file contains all Trend classes: mathematical definitions of functions.
 Jim Hommes - 13-5-2021
 """
 from domain.import_object import *
-import random
+import numpy as np
 import math
+import zlib
 
 
 class Trend(ImportObject):
     """
     This class is the parent class of all Trend classes.
+    The values are precomputed into an array over the simulation horizon, so that get_value and get_values are
+    lookups. Subclasses define the value for one tick in compute_value.
     """
     def __init__(self, name):
         super().__init__(name)
+        self.precomputed_values = np.array([])
 
-    def get_value(self, time):
+    def __setattr__(self, key, value):
+        # Changing a parameter of the trend invalidates the precomputed values
+        if key != 'precomputed_values':
+            super().__setattr__('precomputed_values', np.array([]))
+        super().__setattr__(key, value)
+
+    def compute_value(self, time):
         pass
 
+    def precompute(self, horizon: int):
+        """
+        Compute the values of ticks 0 up to (not including) horizon.
+
+        :param horizon: Number of ticks
+        """
+        self.precomputed_values = np.array([self.compute_value(time) for time in range(horizon)])
+
+    def get_value(self, time):
+        if not 0 <= time < len(self.precomputed_values):
+            if time < 0:
+                return self.compute_value(time)
+            self.precompute(max(time + 1, 2 * len(self.precomputed_values)))
+        return self.precomputed_values[time].item()
+
+    def get_values(self, ticks) -> np.ndarray:
+        """
+        Get the values of multiple ticks at once.
+
+        :param ticks: Array of ticks
+        :return: Array of values
+        """
+        ticks = np.asarray(ticks, dtype=int)
+        if ticks.size == 0:
+            return self.precomputed_values[ticks]
+        if ticks.min() < 0:
+            return np.array([self.get_value(time) for time in ticks.tolist()])
+        if ticks.max() >= len(self.precomputed_values):
+            self.precompute(max(ticks.max().item() + 1, 2 * len(self.precomputed_values)))
+        return self.precomputed_values[ticks]
+
 
 class GeometricTrend(Trend):
     """
@@ -34,7 +75,7 @@ class GeometricTrend(Trend):
         elif parameter_name == 'growthRate':
             self.growth_rate = float(parameter_value)
 
-    def get_value(self, time):
+    def compute_value(self, time):
         return pow(1 + self.growth_rate, time) * self.start
 
 
@@ -49,7 +90,7 @@ class StepTrend(Trend):
         self.min_value = 0
         self.increment = 0
 
-    def get_value(self, time):
+    def compute_value(self, time):
         return max(self.min_value, self.start + math.floor(time / self.duration) * self.increment)
 
     def add_parameter_value(self, reps, parameter_name, parameter_value, alternative):
@@ -68,13 +109,17 @@ class TriangularTrend(Trend):
     The TriangularTrend grows according to a Triangular distribution.
     Because of the random nature of this trend, values are saved in self.values so that once generated, the value \
     does not change.
+    The random numbers are drawn from a NumPy Generator of this trend. It is seeded with the Seed parameter, or else
+    with a seed derived from the name of the trend, so that every run draws the same path.
     """
     def __init__(self, name):
         super().__init__(name)
         self.top = 0
         self.max = 0
         self.min = 0
+        self.seed = None
         self.values = []
+        self.random_generator = None
 
     def add_parameter_value(self, reps, parameter_name, parameter_value, alternative):
         if parameter_name == 'Top':
@@ -84,18 +129,77 @@ class TriangularTrend(Trend):
         elif parameter_name == 'Min':
             self.min = float(parameter_value)
         elif parameter_name == 'Start':
-            self.values.append(float(parameter_value))
-
-    def get_value(self, time):
-        while len(self.values) <= time:
-            last_value = self.values[-1]
-            random_number = random.triangular(-1, 1, 0)
-            if random_number < 0:
-                self.values.append(last_value * (self.top + (random_number * (self.top - self.min))))
-            else:
-                self.values.append(last_value * (self.top + (random_number * (self.max - self.top))))
+            # A (changed) start value replaces the path drawn so far, which is drawn again from the seed
+            self.values = [float(parameter_value)]
+            self.random_generator = None
+        elif parameter_name == 'Seed':
+            self.seed = int(parameter_value)
+
+    def get_seed(self) -> int:
+        return self.seed if self.seed is not None else get_trend_seed(self.name)
+
+    def precompute(self, horizon: int):
+        if len(self.values) > 0:    # Without start value there is nothing to compute
+            self.compute_value(horizon - 1)
+            self.precomputed_values = np.array(self.values[:horizon])
+
+    def compute_value(self, time):
+        if len(self.values) <= time:
+            if self.random_generator is None:
+                self.random_generator = np.random.default_rng(self.get_seed())
+            # The path is drawn from the last known value onwards
+            path = draw_triangular_trend_paths(self.values[-1], self.top, self.max, self.min,
+                                               time + 2 - len(self.values), self.random_generator)
+            self.values.extend(path[1:].tolist())
         return self.values[time]
 
+    def get_monte_carlo_paths(self, n_paths: int, n_ticks: int, seed=None) -> np.ndarray:
+        """
+        Draw multiple paths of this trend at once, e.g. for Monte Carlo analysis. This does not change the values
+        of the trend itself.
+
+        :param n_paths: Number of paths
+        :param n_ticks: Number of ticks per path, starting with the start value
+        :param seed: Seed of the paths. If None, the seed of this trend is used
+        :return: Array of shape (n_paths, n_ticks)
+        """
+        return draw_triangular_trend_paths(self.values[0], self.top, self.max, self.min, n_ticks,
+                                           np.random.default_rng(self.get_seed() if seed is None else seed), n_paths)
+
+
+def get_trend_seed(name: str) -> int:
+    """
+    Default seed of a trend: derived from its name, so that it is the same in every run (unlike hash()).
+    """
+    return zlib.crc32(name.encode())
+
+
+def draw_triangular_trend_paths(start, top, maximum, minimum, n_ticks: int, random_generator: np.random.Generator,
+                                n_paths=None) -> np.ndarray:
+    """
+    Draw the path(s) of a triangular trend. Every tick the value is multiplied with a factor around top, of which the
+    deviation is triangularly distributed between minimum and maximum.
+
+    This function is also used (as copy) in the scripts for COMPETES, keep them identical so that EMLab and
+    COMPETES draw the same paths.
+
+    :param start: The value at the first tick
+    :param top: The most likely growth factor
+    :param maximum: The maximum growth factor
+    :param minimum: The minimum growth factor
+    :param n_ticks: Number of ticks, including the start
+    :param random_generator: NumPy Generator to draw the random numbers from
+    :param n_paths: If None, one path is drawn. Otherwise the number of paths
+    :return: Array of shape (n_ticks,), or (n_paths, n_ticks) if n_paths is given
+    """
+    shape = (n_ticks - 1,) if n_paths is None else (n_paths, n_ticks - 1)
+    random_numbers = random_generator.triangular(-1, 0, 1, shape)
+    factors = np.where(random_numbers < 0, top + (random_numbers * (top - minimum)),
+                       top + (random_numbers * (maximum - top)))
+    starts = np.full(shape[:-1] + (1,), float(start))
+    # Cumulative product from the start value: the same as multiplying the last value with the factor every tick
+    return np.cumprod(np.concatenate((starts, factors), axis=-1), axis=-1)
+
 
 class HourlyLoad(ImportObject):
     """
@@ -103,15 +207,30 @@ class HourlyLoad(ImportObject):
     """
     def __init__(self, name: str):
         super().__init__(name)
-        self.demand_map = dict()
+        self.hourly_demand = None
+        self.demand_map = None
 
-    def add_parameter_value(self, reps, parameter_name: str, parameter_value: str, alternative: str):
+    def add_parameter_value(self, reps, parameter_name: str, parameter_value, alternative: str):
         if parameter_name == 'Hourly Demand':
-            for line in parameter_value.to_dict()['data']:
-                resdict = dict()
-                for subline in line[1]['data']:
-                    resdict[subline[0]] = subline[1]
-                self.demand_map[line[0]] = resdict
+            self.hourly_demand = parameter_value
+            self.demand_map = None
+        else:
+            super().add_parameter_value(reps, parameter_name, parameter_value, alternative)
+
+    def get_demand_map(self):
+        """
+        The Hourly Demand map is large, so it is only translated to a dict when it is first used.
+        """
+        if self.demand_map is None:
+            self.demand_map = dict()
+            if self.hourly_demand is not None:
+                for line in self.hourly_demand.to_dict()['data']:
+                    resdict = dict()
+                    for subline in line[1]['data']:
+                        resdict[subline[0]] = subline[1]
+                    self.demand_map[line[0]] = resdict
+                self.hourly_demand = None
+        return self.demand_map
 
     def get_hourly_demand_by_year(self, year):
-        return self.demand_map[str(year)]
+        return self.get_demand_map()[str(year)]
@@ -15,83 +15,159 @@ from modules.payments import PayAndBankCO2Allowances, UseCO2Allowances
 from util.spinedb_reader_writer import *
 from modules.capacitymarket import *
 from modules.co2market import *
+from modules.electricityspotmarket import *
 
-# Initialize Logging
-if not os.path.isdir('logs'):
-    os.makedirs('logs')
-logging.basicConfig(filename='logs/' + str(round(time.time() * 1000)) + '-log.txt', level=logging.DEBUG)
-# Log to console? Uncomment next line
-# logging.getLogger().addHandler(logging.StreamHandler())
-
-logging.info('Starting EM-Lab Run')
-
-run_capacity_market = False
-run_electricity_spot_market = False
-run_co2_market = False
-
-# Loop over provided arguments and select modules
-# Depending on which booleans have been set to True, these modules will be run
-logging.info('Selected modules: ' + str(sys.argv[2:]))
-for arg in sys.argv[3:]:
-    if arg == 'run_capacity_market':
-        run_electricity_spot_market = True
-        run_capacity_market = True
-    if arg == 'run_electricity_spot_market':
-        run_electricity_spot_market = True
-    if arg == 'run_co2_market':
-        run_co2_market = True
-
-# First argument always has to be the Database URL
-# For manual insertion, it's of the form sqlite:///C:\path\to\db\db.sqlite
-db_url = sys.argv[1]
-logging.info('Selected database: ' + str(db_url))
-
-# Second argumant always has to be the Config Excel file
-config_spinedb_url = sys.argv[2]
-logging.info('Selected simulation parameter database: ' + str(config_spinedb_url))
-
-# Initialize SpineDB Reader Writer (also initializes DB connection)
-spinedb_reader_writer = SpineDBReaderWriter(db_url, config_spinedb_url)
-
-try:    # Try statement to always close DB properly
+
+def parse_arguments(args: list) -> dict:
+    """
+    Loop over provided arguments and select modules.
+    Depending on which booleans have been set to True, these modules will be run.
+
+    :param args: The arguments after the DB URL and the config DB URL
+    :return: Dict of the selected options: the keyword arguments of run_emlab and use_repository_snapshot
+    """
+    options = {'run_capacity_market': False, 'run_co2_market': False, 'load_class_filtered': False,
+               'use_repository_snapshot': False, 'run_competes_dummy': False,
+               # Multi-tick mode: run all ticks up to and including final_tick in this process, and commit every
+               # commit_interval ticks
+               'final_tick': None, 'commit_interval': 1}
+    for arg in args:
+        if arg in ['run_capacity_market', 'run_co2_market', 'load_class_filtered', 'use_repository_snapshot',
+                   'run_competes_dummy']:
+            options[arg] = True
+        if arg.startswith('final_tick='):
+            options['final_tick'] = int(arg.split('=')[1])
+        if arg.startswith('commit_interval='):
+            options['commit_interval'] = int(arg.split('=')[1])
+    return options
+
+
+def commit_and_record(spinedb_reader_writer: SpineDBReaderWriter, name: str, commit_message: str, tick: int):
+    with spinedb_reader_writer.run_report.measure(name, tick, spinedb_reader_writer) as record:
+        commit_start = time.perf_counter()
+        spinedb_reader_writer.commit(commit_message)
+        record['commit_time'] = time.perf_counter() - commit_start
+
+
+def run_emlab(spinedb_reader_writer: SpineDBReaderWriter, run_capacity_market=False, run_co2_market=False,
+              load_class_filtered=False, run_competes_dummy=False, final_tick=None, commit_interval=1,
+              reps: Repository = None) -> Repository:
+    """
+    Read the Repository, initialize the modules and run the selected ones.
+
+    :param spinedb_reader_writer: SpineDBReaderWriter of the EMLab SpineDB
+    :param reps: Repository of an earlier run in the same process. If given, only what changed in the SpineDB since is
+    read into it (refresh_repository) instead of reading the complete Repository
+    :return: The Repository
+    """
     # Load repository
-    reps = spinedb_reader_writer.read_db_and_create_repository()
+    with spinedb_reader_writer.run_report.measure('Read Repository', None, spinedb_reader_writer) as record:
+        if reps is None:
+            reps = spinedb_reader_writer.read_db_and_create_repository(load_class_filtered)
+        else:
+            reps = spinedb_reader_writer.refresh_repository(reps, load_class_filtered)
+        record['tick'] = reps.current_tick
 
     # Initialize all the modules
     # This initialization often includes the commit of the first structure to SpineDB
     logging.info('Start Initialization Modules')
-    capacity_market_submit_bids = CapacityMarketSubmitBids(reps)
-    capacity_market_clear = CapacityMarketClearing(reps)
-    co2_market_determine_co2_price = CO2MarketDetermineCO2Price(reps)
-    payment_and_bank_co2 = PayAndBankCO2Allowances(reps)
-    use_co2_allowances = UseCO2Allowances(reps)
-    market_stability_reserve = DetermineMarketStabilityReserveFlow(reps)
+    with spinedb_reader_writer.run_report.measure('Initialize Modules', reps.current_tick, spinedb_reader_writer):
+        if run_competes_dummy:
+            electricity_spot_market_submit_bids = ElectricitySpotMarketSubmitBids(reps)
+            electricity_spot_market_clear = ElectricitySpotMarketClearing(reps)
+        capacity_market_submit_bids = CapacityMarketSubmitBids(reps)
+        capacity_market_clear = CapacityMarketClearing(reps)
+        co2_market_determine_co2_price = CO2MarketDetermineCO2Price(reps)
+        payment_and_bank_co2 = PayAndBankCO2Allowances(reps)
+        use_co2_allowances = UseCO2Allowances(reps)
+        market_stability_reserve = DetermineMarketStabilityReserveFlow(reps)
     logging.info('End Initialization Modules')
 
     # Commit Initialization changes to SpineDB
     logging.info('Commit Initialization Modules')
-    spinedb_reader_writer.commit('Initialize all module import structures')
+    commit_and_record(spinedb_reader_writer, 'Commit', 'Initialize all module import structures', reps.current_tick)
+
+    # In the multi-tick mode the Repository stays in memory: the modules keep it up to date themselves
+    multi_tick = final_tick is not None
+    if multi_tick and reps.time_step < 1:
+        raise ValueError('Time Step has to be at least 1 to run multiple ticks')
 
     # From here on modules will be run according to the previously set booleans
-    logging.info('Start Run Modules')
+    selected_modules = []
+    if run_competes_dummy:
+        selected_modules += [electricity_spot_market_submit_bids, electricity_spot_market_clear]
     if run_capacity_market:
-        logging.info('Start Run Capacity Market')
-        capacity_market_submit_bids.act_and_commit(reps.current_tick)
-        capacity_market_clear.act_and_commit(reps.current_tick)
-        logging.info('End Run Capacity Market')
-
+        selected_modules += [capacity_market_submit_bids, capacity_market_clear]
     if run_co2_market:
-        logging.info('Start Run CO2 Market')
-        market_stability_reserve.act_and_commit(reps.current_tick)
-        co2_market_determine_co2_price.act_and_commit(reps.current_tick)
-        # payment_and_bank_co2.act_and_commit(reps.current_tick)
-        # use_co2_allowances.act_and_commit(reps.current_tick)
-        logging.info('End Run CO2 Market')
-    logging.info('End Run Modules')
-except Exception as e:
-    logging.error('Exception occurred: ' + str(e))
-    raise
-finally:
-    logging.info('Closing database connections...')
-    spinedb_reader_writer.db.close_connection()
-    spinedb_reader_writer.config_db.close_connection()
+        selected_modules += [market_stability_reserve, co2_market_determine_co2_price]
+        # payment_and_bank_co2, use_co2_allowances
+
+    ticks_since_commit = 0
+    while True:
+        # Every module commits its changes, unless multiple ticks are run: then the commits are every commit_interval
+        logging.info('Start Run Modules at tick ' + str(reps.current_tick))
+        for module in selected_modules:
+            logging.info('Start Run ' + module.name)
+            module.act_and_commit(reps.current_tick, commit=not multi_tick)
+            logging.info('End Run ' + module.name)
+        logging.info('End Run Modules at tick ' + str(reps.current_tick))
+
+        if not multi_tick or reps.current_tick + reps.time_step > final_tick:
+            break
+        ticks_since_commit += 1
+        if ticks_since_commit >= commit_interval:
+            commit_and_record(spinedb_reader_writer, 'Commit', 'Commit: ticks up to ' + str(reps.current_tick),
+                              reps.current_tick)
+            ticks_since_commit = 0
+
+        # Advance the clock, as clock.py would
+        reps.current_tick += reps.time_step
+        reps.update_power_plant_ages()
+        spinedb_reader_writer.stage_system_clock_tick(reps.current_tick)
+
+    if multi_tick:
+        commit_and_record(spinedb_reader_writer, 'Commit', 'Commit: ticks up to ' + str(reps.current_tick),
+                          reps.current_tick)
+    return reps
+
+
+if __name__ == '__main__':
+    # Initialize Logging
+    if not os.path.isdir('logs'):
+        os.makedirs('logs')
+    run_name = 'logs/' + str(round(time.time() * 1000))
+    logging.basicConfig(filename=run_name + '-log.txt', level=logging.DEBUG)
+    # Log to console? Uncomment next line
+    # logging.getLogger().addHandler(logging.StreamHandler())
+
+    logging.info('Starting EM-Lab Run')
+
+    logging.info('Selected modules: ' + str(sys.argv[2:]))
+    emlab_options = parse_arguments(sys.argv[3:])
+    use_repository_snapshot = emlab_options.pop('use_repository_snapshot')
+
+    # First argument always has to be the Database URL
+    # For manual insertion, it's of the form sqlite:///C:\path\to\db\db.sqlite
+    db_url = sys.argv[1]
+    logging.info('Selected database: ' + str(db_url))
+
+    # Second argumant always has to be the Config Excel file
+    config_spinedb_url = sys.argv[2]
+    logging.info('Selected simulation parameter database: ' + str(config_spinedb_url))
+
+    # Initialize SpineDB Reader Writer (also initializes DB connection)
+    # The Repository snapshot is kept next to the logs, and only used when the DB has not changed since it was written
+    spinedb_reader_writer = SpineDBReaderWriter(db_url, config_spinedb_url,
+                                                'snapshots' if use_repository_snapshot else None)
+
+    try:    # Try statement to always close DB properly
+        run_emlab(spinedb_reader_writer, **emlab_options)
+    except Exception as e:
+        logging.error('Exception occurred: ' + str(e))
+        raise
+    finally:
+        # The run report is written next to the log file
+        spinedb_reader_writer.run_report.write(run_name + '-report')
+        logging.info('Closing database connections...')
+        spinedb_reader_writer.db.close_connection()
+        spinedb_reader_writer.config_db.close_connection()
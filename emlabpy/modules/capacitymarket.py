@@ -4,9 +4,16 @@ The file responsible for all capacity market operations.
 Jim Hommes - 25-3-2021
 """
 import json
+import numpy as np
+from domain.markets import SlopingDemandCurve
 from modules.marketmodule import MarketModule
 from util.repository import Repository
 
+# Bid statuses as returned by the clearing functions
+BID_ACCEPTED = 0
+BID_PARTLY_ACCEPTED = 1
+BID_FAILED = 2
+
 
 class CapacityMarketSubmitBids(MarketModule):
     """
@@ -18,6 +25,8 @@ class CapacityMarketSubmitBids(MarketModule):
         reps.dbrw.stage_init_power_plant_dispatch_plan_structure()
 
     def act(self):
+        marginal_costs = self.reps.get_marginal_costs_excl_co2_market_cost_by_tick(
+            self.reps.current_tick, self.reps.get_operational_power_plants())
         # For every EnergyProducer
         for energy_producer in self.reps.energy_producers.values():
 
@@ -30,7 +39,7 @@ class CapacityMarketSubmitBids(MarketModule):
                 powerplant_load_factor = 1  # TODO: Power Plant Load Factor
 
                 # Get Marginal Cost and Fixed Operating Costs
-                mc = powerplant.calculate_marginal_cost_excl_co2_market_cost(self.reps, self.reps.current_tick)
+                mc = marginal_costs[powerplant]
                 fixed_on_m_cost = powerplant.get_actual_fixed_operating_cost()
 
                 # Determine revenues from ElectricitySpotMarket
@@ -71,26 +80,98 @@ class CapacityMarketClearing(MarketModule):
             sorted_ppdp = self.reps.get_sorted_power_plant_dispatch_plans_by_market_and_time(market,
                                                                                              self.reps.current_tick)
 
-            clearing_price = 0
-            total_supply = 0
+            status_names = {BID_ACCEPTED: self.reps.power_plant_dispatch_plan_status_accepted,
+                            BID_PARTLY_ACCEPTED: self.reps.power_plant_dispatch_plan_status_partly_accepted,
+                            BID_FAILED: self.reps.power_plant_dispatch_plan_status_failed}
 
             # Set the clearing price through the merit order
-            for ppdp in sorted_ppdp:
-                if ppdp.price <= sdc.get_price_at_volume(total_supply + ppdp.amount):
-                    total_supply += ppdp.amount
-                    clearing_price = ppdp.price
-                    self.reps.set_power_plant_dispatch_plan_production(
-                        ppdp, self.reps.power_plant_dispatch_plan_status_accepted, ppdp.amount)
-                elif ppdp.price < sdc.get_price_at_volume(total_supply):
-                    clearing_price = ppdp.price
-                    self.reps.set_power_plant_dispatch_plan_production(
-                        ppdp, self.reps.power_plant_dispatch_plan_status_partly_accepted,
-                        sdc.get_volume_at_price(clearing_price) - total_supply)
-                    total_supply += sdc.get_volume_at_price(clearing_price)
-                else:
-                    self.reps.set_power_plant_dispatch_plan_production(
-                        ppdp, self.reps.power_plant_dispatch_plan_status_failed, 0)
+            accepted_amounts, statuses, clearing_price, total_supply = clear_capacity_market_bids(
+                np.array([ppdp.price for ppdp in sorted_ppdp], dtype=float),
+                np.array([ppdp.amount for ppdp in sorted_ppdp], dtype=float), sdc)
+            for (ppdp, status, accepted_amount) in zip(sorted_ppdp, statuses.tolist(), accepted_amounts.tolist()):
+                self.reps.set_power_plant_dispatch_plan_production(ppdp, status_names[status], accepted_amount)
 
             print(clearing_price)
             self.reps.create_or_update_market_clearing_point(market, clearing_price, total_supply,
                                                              self.reps.current_tick)
+
+
+def clear_capacity_market_bids_loop(prices: np.ndarray, amounts: np.ndarray, sdc: SlopingDemandCurve,
+                                    clearing_price=0, total_supply=0):
+    """
+    Clear the capacity market bids by walking the merit order one bid at a time.
+    This is the reference implementation of clear_capacity_market_bids.
+
+    :param prices: Array of bid prices
+    :param amounts: Array of bid amounts
+    :param sdc: The SlopingDemandCurve
+    :param clearing_price: Clearing price before the first bid (when clearing the remainder of a merit order)
+    :param total_supply: Total accepted supply before the first bid (when clearing the remainder of a merit order)
+    :return: Accepted amounts and statuses per bid (in the order of the input), clearing price and total supply
+    """
+    accepted_amounts = np.zeros(len(prices))
+    statuses = np.full(len(prices), BID_FAILED)
+    for i in sorted(range(len(prices)), key=lambda j: prices[j]):
+        if prices[i] <= sdc.get_price_at_volume(total_supply + amounts[i]):
+            total_supply += amounts[i]
+            clearing_price = prices[i]
+            accepted_amounts[i] = amounts[i]
+            statuses[i] = BID_ACCEPTED
+        elif prices[i] < sdc.get_price_at_volume(total_supply):
+            clearing_price = prices[i]
+            accepted_amounts[i] = sdc.get_volume_at_price(clearing_price) - total_supply
+            statuses[i] = BID_PARTLY_ACCEPTED
+            total_supply += sdc.get_volume_at_price(clearing_price)
+    return accepted_amounts, statuses, clearing_price, total_supply
+
+
+def clear_capacity_market_bids(prices: np.ndarray, amounts: np.ndarray, sdc: SlopingDemandCurve):
+    """
+    Clear the capacity market bids in one pass over arrays. The result is identical to that of
+    clear_capacity_market_bids_loop.
+
+    The bids are sorted once and the cumulative supply is compared to the demand curve: all bids up to the first one
+    that does not fit under the curve are accepted, that bid is the marginal bid. The bids after it are only
+    walked one by one if any of them could still be (partly) accepted, which only happens for ties on the curve.
+
+    :param prices: Array of bid prices
+    :param amounts: Array of bid amounts
+    :param sdc: The SlopingDemandCurve
+    :return: Accepted amounts and statuses per bid (in the order of the input), clearing price and total supply
+    """
+    order = np.argsort(prices, kind='stable')
+    sorted_prices = prices[order]
+    sorted_amounts = amounts[order]
+    sorted_accepted_amounts = np.zeros(len(prices))
+    sorted_statuses = np.full(len(prices), BID_FAILED)
+
+    cumulative_supply = np.cumsum(sorted_amounts)
+    fits = sorted_prices <= sdc.get_prices_at_volumes(cumulative_supply)
+    marginal = len(prices) if fits.all() else int(np.argmin(fits))
+
+    sorted_accepted_amounts[:marginal] = sorted_amounts[:marginal]
+    sorted_statuses[:marginal] = BID_ACCEPTED
+    clearing_price = sorted_prices[marginal - 1].item() if marginal > 0 else 0
+    total_supply = cumulative_supply[marginal - 1].item() if marginal > 0 else 0
+
+    if marginal < len(prices):
+        # The marginal bid
+        if sorted_prices[marginal] < sdc.get_price_at_volume(total_supply):
+            clearing_price = sorted_prices[marginal].item()
+            sorted_accepted_amounts[marginal] = sdc.get_volume_at_price(clearing_price) - total_supply
+            sorted_statuses[marginal] = BID_PARTLY_ACCEPTED
+            total_supply += sdc.get_volume_at_price(clearing_price)
+
+        # The bids after the marginal bid all fail, unless one of them can still be (partly) accepted
+        remaining = slice(marginal + 1, len(prices))
+        if np.any(sorted_prices[remaining] <= sdc.get_prices_at_volumes(total_supply + sorted_amounts[remaining])) \
+                or np.any(sorted_prices[remaining] < sdc.get_price_at_volume(total_supply)):
+            sorted_accepted_amounts[remaining], sorted_statuses[remaining], clearing_price, total_supply = \
+                clear_capacity_market_bids_loop(sorted_prices[remaining], sorted_amounts[remaining], sdc,
+                                                clearing_price, total_supply)
+
+    accepted_amounts = np.empty(len(prices))
+    accepted_amounts[order] = sorted_accepted_amounts
+    statuses = np.empty(len(prices), dtype=sorted_statuses.dtype)
+    statuses[order] = sorted_statuses
+    return accepted_amounts, statuses, clearing_price, total_supply
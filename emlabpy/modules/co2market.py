@@ -5,7 +5,7 @@ Jim Hommes - 13-4-2021
 """
 from modules.marketmodule import MarketModule
 from util.repository import Repository
-import math
+import numpy as np
 
 
 class CO2MarketDetermineCO2Price(MarketModule):
@@ -45,10 +45,6 @@ class CO2MarketDetermineCO2Price(MarketModule):
                 profits_per_plant = self.reps.get_power_plant_operational_profits_by_tick_and_market(
                     self.reps.current_tick - amount_of_years_to_look_back, self.reps.electricity_spot_markets['DutchElectricitySpotMarket'])
                 emissions_per_plant = self.reps.get_power_plant_emissions_by_tick(self.reps.current_tick - amount_of_years_to_look_back)
-                willingness_to_pay_per_plant = {
-                    key: value / emissions_per_plant[key] for (key, value)
-                    in profits_per_plant.items() if emissions_per_plant[key] != 0
-                }
 
                 emission_hedging_correction = 1
 
@@ -57,18 +53,9 @@ class CO2MarketDetermineCO2Price(MarketModule):
                     co2_from_exports = self.reps.exports['Exports'].amount_of_co2 * emission_hedging_correction
 
                 # Determine CO2 Price based on the WTP merit order
-                co2price = max(willingness_to_pay_per_plant.values())
-                total_emissions = 0
-                sorted_wtp = sorted(willingness_to_pay_per_plant.items(),
-                                    key=lambda item: item[1], reverse=True)
-
-                for (power_plant_name, wtp) in sorted_wtp:
-                    emissions_per_plant_rounded = math.ceil(emissions_per_plant[power_plant_name])
-                    if co2_cap >= total_emissions + emissions_per_plant_rounded * emission_hedging_correction:
-                        total_emissions += emissions_per_plant_rounded * emission_hedging_correction
-                        co2price = wtp
-                    else:
-                        break
+                profits = np.fromiter(profits_per_plant.values(), dtype=float, count=len(profits_per_plant))
+                emissions = np.array([emissions_per_plant[key] for key in profits_per_plant.keys()], dtype=float)
+                co2price = determine_co2_price(profits, emissions, co2_cap, emission_hedging_correction)
 
             # Check if CO2Price is below the Government's min CO2 price
             print(co2price)
@@ -78,3 +65,31 @@ class CO2MarketDetermineCO2Price(MarketModule):
     def floor_co2price(self, co2price):
         """Check if CO2Price is below the Government's min CO2 price"""
         return max(co2price, self.reps.get_government().co2_min_price_trend.get_value(self.reps.current_tick))
+
+
+def determine_co2_price(profits: np.ndarray, emissions: np.ndarray, co2_cap: float,
+                        emission_hedging_correction: float = 1) -> float:
+    """
+    Determine the CO2 price through the merit order of the Willingness To Pay (profit / emission) of the PowerPlants.
+    The plants with the highest WTP are allowed to emit until their (rounded up) emissions would exceed the cap.
+    The CO2 price is the WTP of the last plant that fits under the cap.
+
+    :param profits: Array of operational profits per PowerPlant
+    :param emissions: Array of emissions per PowerPlant, in the same order
+    :param co2_cap: The CO2 cap
+    :param emission_hedging_correction: Factor applied to the emissions
+    :return: The CO2 price
+    """
+    # Plants without emissions have no WTP
+    emitting = emissions != 0
+    willingness_to_pay = profits[emitting] / emissions[emitting]
+    order = np.argsort(-willingness_to_pay, kind='stable')
+    cumulative_emissions = np.cumsum(np.ceil(emissions[emitting][order]) * emission_hedging_correction)
+    fits = co2_cap >= cumulative_emissions
+    if fits.all():
+        last_fitting = len(order) - 1
+    else:
+        last_fitting = int(np.argmin(fits)) - 1
+    if last_fitting < 0:
+        return willingness_to_pay.max().item()
+    return willingness_to_pay[order[last_fitting]].item()
@@ -3,11 +3,13 @@ The parent module class.
 This class makes sure there is structure in the commits to the SpineDB.
 Inside of every module the staging is done.
 At the end of every module, there is a commit.
+Every module run is measured in the RunReport of the SpineDBReaderWriter.
 
 Jim Hommes - 25-3-2021
 """
 
 import logging
+import time
 
 from datetime import datetime
 from util.repository import Repository
@@ -23,9 +25,20 @@ class DefaultModule:
     def act(self):
         pass
 
-    def act_and_commit(self, current_tick: int):
-        self.act()
-        self.reps.dbrw.commit('Commit: ' + self.name + ' at ' + str(datetime.now()))
+    def act_and_commit(self, current_tick: int, commit: bool = True):
+        """
+        Act and commit the staged changes. The wall time, CPU time, SpineDB time and staged rows are recorded in the
+        RunReport.
+
+        :param current_tick: The current tick
+        :param commit: If False, the changes stay staged to be committed later, e.g. when running multiple ticks
+        """
+        with self.reps.dbrw.run_report.measure(self.name, current_tick, self.reps.dbrw) as record:
+            self.act()
+            if commit:
+                commit_start = time.perf_counter()
+                self.reps.dbrw.commit('Commit: ' + self.name + ' at ' + str(datetime.now()))
+                record['commit_time'] = time.perf_counter() - commit_start
 
     def __str__(self):
         return str(vars(self))
@@ -4,7 +4,6 @@ Based on the role ClearIterativeCO2AndElectricitySpotMarketTwoCountryRole
 
 Jim Hommes - 25-3-2021
 """
-import json
 from modules.marketmodule import MarketModule
 from util.repository import Repository
 
@@ -19,6 +18,8 @@ class ElectricitySpotMarketSubmitBids(MarketModule):
         reps.dbrw.stage_init_power_plant_dispatch_plan_structure()
 
     def act(self):
+        marginal_costs = self.reps.get_marginal_costs_excl_co2_market_cost_by_tick(
+            self.reps.current_tick, self.reps.get_operational_power_plants())
         # For every energy producer we will submit bids to the Capacity Market
         for energy_producer in self.reps.energy_producers.values():
 
@@ -26,8 +27,7 @@ class ElectricitySpotMarketSubmitBids(MarketModule):
             for powerplant in self.reps.get_operational_power_plants_by_owner(energy_producer):
                 market = self.reps.get_electricity_spot_market_for_plant(powerplant)
                 capacity = powerplant.get_actual_nominal_capacity()
-                mc = powerplant.calculate_marginal_cost_excl_co2_market_cost(self.reps,
-                                                                             self.reps.current_tick)
+                mc = marginal_costs[powerplant]
                 self.reps.create_or_update_power_plant_dispatch_plan(powerplant, energy_producer, market, capacity, mc,
                                                                      self.reps.current_tick)
 
@@ -43,7 +43,7 @@ class ElectricitySpotMarketClearing(MarketModule):
 
     def act(self):
         # Calculate and submit Market Clearing Price
-        peak_load = max(json.loads(self.reps.load['NL'].parameters['ldc'].to_database())['data'].values())
+        peak_load = max(self.reps.load['NL'].parameters['ldc'].values)
         for market in self.reps.electricity_spot_markets.values():
             sorted_ppdp = self.reps.get_sorted_power_plant_dispatch_plans_by_market_and_time(market, self.reps.current_tick)
             clearing_price = 0
@@ -20,13 +20,14 @@ class PayAndBankCO2Allowances(DefaultModule):
         super().__init__("Payment Module: CO2 Payments and Banking", reps)
 
     def act(self):
+        emission_intensities = self.reps.get_emission_intensities(list(self.reps.power_plants.values()))
         for power_plant in self.reps.power_plants.values():
             market = self.reps.get_co2_market_for_plant(power_plant)
             mcp = self.reps.get_market_clearing_point_for_market_and_time(market, self.reps.current_tick)
 
             total_capacity = self.reps.get_total_accepted_amounts_by_power_plant_and_tick_and_market(power_plant,
                                                                                                      self.reps.current_tick)
-            emission_intensity = power_plant.calculate_emission_intensity(self.reps)
+            emission_intensity = emission_intensities[power_plant]
             emissions = total_capacity * emission_intensity
 
             if 1.5 * emissions * mcp.price <= int(power_plant.owner.parameters['cash']):
@@ -51,10 +52,11 @@ class UseCO2Allowances(DefaultModule):
         super().__init__("Payment Module: Use CO2 Allowances and Subtract From Banked", reps)
 
     def act(self):
+        emission_intensities = self.reps.get_emission_intensities(list(self.reps.power_plants.values()))
         for power_plant in self.reps.power_plants.values():
             total_capacity = self.reps.get_total_accepted_amounts_by_power_plant_and_tick_and_market(power_plant,
                                                                                                      self.reps.current_tick)
-            emission_intensity = power_plant.calculate_emission_intensity(self.reps)
+            emission_intensity = emission_intensities[power_plant]
             power_plant.banked_allowances[self.reps.current_tick] -= total_capacity * emission_intensity
             self.reps.dbrw.stage_co2_allowances(power_plant, power_plant.banked_allowances[self.reps.current_tick],
                                                 self.reps.current_tick)
@@ -0,0 +1,95 @@
+"""
+This file tests the AIMMS task client against a stand-in of the task API of the AIMMS DataExchange library.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from aimms_call_competes import *
+
+
+class AIMMSStandIn(ThreadingHTTPServer):
+    """
+    Mimics /api/v1/tasks: a POST to /api/v1/tasks/<service name>?InputYear=<year> starts a task that runs for the
+    duration of the service, a GET to /api/v1/tasks/<task ID> returns its status and runtime.
+    """
+
+    def __init__(self, durations):
+        super().__init__(('127.0.0.1', 0), AIMMSStandInHandler)
+        self.durations = durations
+        self.tasks = dict()
+        self.requests = []
+
+
+class AIMMSStandInHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        service_name = url.path.split('/')[-1]
+        task_id = str(uuid.uuid4())
+        self.server.tasks[task_id] = (service_name, time.perf_counter())
+        self.server.requests.append(('POST', service_name, parse_qs(url.query)['InputYear'][0]))
+        self.send_json({'id': task_id})
+
+    def do_GET(self):
+        task_id = self.path.split('/')[-1]
+        (service_name, start) = self.server.tasks[task_id]
+        self.server.requests.append(('GET', task_id))
+        runtime = time.perf_counter() - start
+        self.send_json({'id': task_id, 'status': 'finished' if runtime >= self.server.durations[service_name]
+                        else 'running', 'runtime': runtime})
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAIMMSCallCompetes:
+
+    def test_run_tasks(self):
+        server = AIMMSStandIn({'spine_run_gentransdisp': 0.3, 'spine_run_gentransinv': 0.6})
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        try:
+            client = AIMMSTaskClient('http://127.0.0.1:' + str(server.server_address[1]), min_poll_interval=0.01,
+                                     max_poll_interval=0.1)
+            statuses = []
+            start = time.perf_counter()
+            results = asyncio.run(client.run_tasks([('spine_run_gentransdisp', 2020), ('spine_run_gentransinv', 2025)],
+                                                   lambda task_id, status: statuses.append((task_id, status))))
+            elapsed = time.perf_counter() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert [status['status'] for (_, status) in results] == ['finished', 'finished']
+        assert ('POST', 'spine_run_gentransdisp', '2020') in server.requests
+        assert ('POST', 'spine_run_gentransinv', '2025') in server.requests
+        # The tasks run at the same time, and are done within one poll interval after they finish
+        assert elapsed < 0.6 + 0.1 + 0.2
+        assert any(status['status'] == 'running' for (_, status) in statuses)
+        dispatch_task_id = results[0][0]
+        assert statuses[-1][0] == results[1][0]
+        assert [status['status'] for (task_id, status) in statuses if task_id == dispatch_task_id][-1] == 'finished'
+
+    def test_poll_interval_backs_off(self):
+        server = AIMMSStandIn({'spine_run_gentransdisp': 0.5})
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        try:
+            client = AIMMSTaskClient('http://127.0.0.1:' + str(server.server_address[1]), min_poll_interval=0.01,
+                                     max_poll_interval=0.2, backoff=2)
+            asyncio.run(client.run_task('spine_run_gentransdisp', 2020))
+        finally:
+            server.shutdown()
+            server.server_close()
+        # 0.01, 0.02, 0.04, 0.08, 0.16 and then every 0.2 seconds: far fewer polls than at a fixed 0.01 seconds
+        assert len([i for i in server.requests if i[0] == 'GET']) <= 8
@@ -0,0 +1,40 @@
+import numpy as np
+from domain.markets import SlopingDemandCurve
+from modules.capacitymarket import *
+
+
+class TestCapacityMarket:
+
+    def assert_same_clearing(self, prices, amounts, sdc):
+        loop_result = clear_capacity_market_bids_loop(prices, amounts, sdc)
+        array_result = clear_capacity_market_bids(prices, amounts, sdc)
+        assert np.array_equal(loop_result[0], array_result[0])
+        assert np.array_equal(loop_result[1], array_result[1])
+        assert loop_result[2] == array_result[2]
+        assert loop_result[3] == array_result[3]
+
+    def test_clear_capacity_market_bids(self):
+        sdc = SlopingDemandCurve(0.15, 0.025, 0.025, 100, 75000)
+        prices = np.array([0, 50000, 10000, 90000, 20000], dtype=float)
+        amounts = np.array([40, 30, 30, 20, 25], dtype=float)
+        accepted_amounts, statuses, clearing_price, total_supply = clear_capacity_market_bids(prices, amounts, sdc)
+        assert statuses.tolist() == [BID_ACCEPTED, BID_PARTLY_ACCEPTED, BID_ACCEPTED, BID_FAILED, BID_ACCEPTED]
+        assert accepted_amounts[0] == 40 and accepted_amounts[3] == 0
+        assert clearing_price == 50000
+        self.assert_same_clearing(prices, amounts, sdc)
+
+    def test_clear_capacity_market_bids_equals_loop(self):
+        rng = np.random.default_rng(0)
+        sdc = SlopingDemandCurve(0.15, 0.025, 0.025, 1000, 75000)
+        for _ in range(200):
+            n = rng.integers(0, 60)
+            prices = rng.uniform(0, 90000, n).round(-3)   # Rounded, to get equal prices
+            amounts = rng.uniform(0, 80, n).round()
+            self.assert_same_clearing(prices, amounts, sdc)
+
+    def test_clear_capacity_market_bids_ties_on_curve(self):
+        sdc = SlopingDemandCurve(0.15, 0.025, 0.025, 100, 75000)
+        # After the marginal bid, bids at the price cap can still fit on the flat part of the curve
+        self.assert_same_clearing(np.array([75000, 75000, 75000]), np.array([60, 60, 10], dtype=float), sdc)
+        # After a partly accepted bid, a bid of zero at the same price is accepted
+        self.assert_same_clearing(np.array([30000, 30000]), np.array([200, 0], dtype=float), sdc)
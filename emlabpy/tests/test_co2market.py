@@ -0,0 +1,38 @@
+import math
+import numpy as np
+from modules.co2market import determine_co2_price
+
+
+class TestCO2Market:
+
+    def determine_co2_price_by_merit_order(self, profits, emissions, co2_cap):
+        willingness_to_pay_per_plant = {key: profits[key] / emissions[key] for key in range(len(profits))
+                                        if emissions[key] != 0}
+        co2price = max(willingness_to_pay_per_plant.values())
+        total_emissions = 0
+        for (key, wtp) in sorted(willingness_to_pay_per_plant.items(), key=lambda item: item[1], reverse=True):
+            if co2_cap >= total_emissions + math.ceil(emissions[key]):
+                total_emissions += math.ceil(emissions[key])
+                co2price = wtp
+            else:
+                break
+        return co2price
+
+    def test_determine_co2_price(self):
+        profits = np.array([1000, 500, 300, 50], dtype=float)
+        emissions = np.array([10, 0, 9.5, 5], dtype=float)
+        assert determine_co2_price(profits, emissions, 22) == 300 / 9.5     # First two emitting plants fit
+        assert determine_co2_price(profits, emissions, 100) == 50 / 5       # All plants fit
+        assert determine_co2_price(profits, emissions, 5) == 1000 / 10      # No plant fits: highest WTP
+
+    def test_determine_co2_price_equals_merit_order(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            n = rng.integers(1, 50)
+            profits = rng.uniform(-1000, 10000, n).round(-2)
+            emissions = rng.uniform(0, 100, n).round() * (rng.random(n) > 0.1)
+            co2_cap = rng.uniform(0, 100 * n)
+            if not emissions.any():
+                continue
+            assert determine_co2_price(profits, emissions, co2_cap) == \
+                   self.determine_co2_price_by_merit_order(profits, emissions, co2_cap)
@@ -0,0 +1,64 @@
+"""
+This file tests the cache of the sheets of the COMPETES output workbooks.
+"""
+import os
+import pandas
+import pytest
+import competes_output_cache
+from competes_output_cache import *
+
+
+def write_workbook(path, df: pandas.DataFrame):
+    with pandas.ExcelWriter(path, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Generation', index=False)
+
+
+class TestCompetesOutputCache:
+
+    df = pandas.DataFrame({'Unit': ['A', 'B', 'C'], 'MW': [10, 20, 30]})
+
+    def write_workbook(self, tmp_path) -> str:
+        path = str(tmp_path / 'Output_Dynamic_Gen&Trans_2020_Dispatch.xlsx')
+        write_workbook(path, self.df)
+        return path
+
+    def get_cache_folder(self, path) -> str:
+        return os.path.join(os.path.dirname(path), cache_folder_name, os.path.basename(path))
+
+    def test_first_read_fills_cache(self, tmp_path):
+        path = self.write_workbook(tmp_path)
+        assert read_workbook_sheet(path, 'Generation').equals(self.df)
+        workbook_hash = get_workbook_hash(path)
+        assert os.listdir(self.get_cache_folder(path)) == [workbook_hash]
+        assert os.listdir(os.path.join(self.get_cache_folder(path), workbook_hash)) == \
+            [os.path.basename(get_cache_path(path, workbook_hash, 'Generation', {}))]
+
+    def test_second_read_does_not_open_workbook(self, tmp_path, monkeypatch):
+        path = self.write_workbook(tmp_path)
+        read_df = read_workbook_sheet(path, 'Generation')
+
+        def excel_file(*args, **kwargs):
+            raise AssertionError('Workbook opened')
+        monkeypatch.setattr(competes_output_cache.pandas, 'ExcelFile', excel_file)
+        assert read_workbook_sheet(path, 'Generation').equals(read_df)
+        with pytest.raises(AssertionError, match='Workbook opened'):
+            read_workbook_sheet(path, 'Generation', index_col=0)
+
+    def test_modified_workbook(self, tmp_path):
+        path = self.write_workbook(tmp_path)
+        read_workbook_sheet(path, 'Generation')
+        first_hash = get_workbook_hash(path)
+
+        modified_df = pandas.DataFrame({'Unit': ['A', 'B'], 'MW': [15, 25]})
+        write_workbook(path, modified_df)
+        assert read_workbook_sheet(path, 'Generation').equals(modified_df)
+        assert get_workbook_hash(path) != first_hash
+        assert os.listdir(self.get_cache_folder(path)) == [get_workbook_hash(path)]
+
+    def test_read_excel_arguments(self, tmp_path):
+        path = self.write_workbook(tmp_path)
+        assert read_workbook_sheet(path, 'Generation').equals(self.df)
+        assert read_workbook_sheet(path, 'Generation', index_col=0).equals(self.df.set_index('Unit'))
+        assert len(os.listdir(os.path.join(self.get_cache_folder(path), get_workbook_hash(path)))) == 2
+        assert read_workbook_sheet(path, 'Generation').equals(self.df)
+        assert read_workbook_sheet(path, 'Generation', index_col=0).equals(self.df.set_index('Unit'))
@@ -0,0 +1,99 @@
+"""
+This file tests the steps of the coupled run on SpineDBs that are shared and cached.
+"""
+from benchmarks.scenario_generator import write_scenario
+from coupled_run import *
+
+
+def create_db(tmp_path, name, data):
+    url = 'sqlite:///' + str(tmp_path / (name + '.sqlite'))
+    db = SpineDB(url, create=True)
+    db.import_data(data)
+    db.commit('Test data')
+    db.close_connection()
+    return url
+
+
+class TestCoupledRun:
+
+    config_data = {'object_classes': ['Coupling Parameters'],
+                   'objects': [('Coupling Parameters', 'Time Step'), ('Coupling Parameters', 'Start Year')],
+                   'object_parameters': [('Coupling Parameters', 'Value')],
+                   'object_parameter_values': [('Coupling Parameters', 'Time Step', 'Value', 1),
+                                               ('Coupling Parameters', 'Start Year', 'Value', 2020)]}
+
+    def test_cached_spinedb(self, tmp_path):
+        url = create_db(tmp_path, 'emlab', {'object_classes': ['PowerPlants', 'Zones'],
+                                            'objects': [('PowerPlants', 'P1'), ('Zones', 'NL')],
+                                            'object_parameters': [('PowerPlants', 'Capacity'), ('Zones', 'Name')],
+                                            'object_parameter_values': [('PowerPlants', 'P1', 'Capacity', 10.0)]})
+        run = CoupledRun(url, url, url, [])
+        try:
+            powerplants = run.db_emlab.query_object_parameter_values_by_object_class('PowerPlants')
+            assert powerplants.get_value('P1', 'Capacity') == 10.0
+            assert run.db_emlab.query_object_parameter_values_by_object_class('PowerPlants') is powerplants
+            db_data = run.db_emlab.export_data()
+
+            # An import into another class keeps the result, but the complete DB has changed
+            run.db_emlab.import_object_parameter_values([('Zones', 'NL', 'Name', 'Netherlands', 'Base')])
+            assert run.db_emlab.query_object_parameter_values_by_object_class('PowerPlants') is powerplants
+            assert run.db_emlab.export_data() is not db_data
+
+            # Also when imported by EMLab, the class is queried again
+            run.spinedb_reader_writer.stage_init_alternative(0)
+            run.spinedb_reader_writer.stage_object_parameter_values('PowerPlants', 'P1', [('Capacity', 20.0)], 0)
+            run.spinedb_reader_writer.flush()
+            assert run.db_emlab.query_object_parameter_values_by_object_class('PowerPlants') \
+                .get_value('P1', 'Capacity', '0') == 20.0
+            assert run.staged_rows == 1 + 2
+            assert run.db_time > 0
+        finally:
+            run.close()
+
+    def test_run(self, tmp_path):
+        db_emlab_url = create_db(tmp_path, 'emlab', {})
+        db_competes_url = create_db(tmp_path, 'competes', {})
+        db_config_url = create_db(tmp_path, 'config', self.config_data)
+        run = CoupledRun(db_emlab_url, db_competes_url, db_config_url, [])
+        try:
+            run.initialize_clock()
+            run.steps = [('Increment Clock', run.increment_clock)]
+            run.run(2)
+            assert run.get_current_emlab_tick() == 2
+            # EMLab shares the connection
+            assert max(i[3] for i in run.spinedb_reader_writer.db.export_data_by_object_classes(['SystemClockTicks'])
+                       ['object_parameter_values']) == 2
+        finally:
+            run.close()
+        assert [(record['tick'], record['module']) for record in run.run_report.records] == \
+               [(0, 'Increment Clock'), (1, 'Increment Clock')]
+        assert all(record['staged_rows'] == 2 for record in run.run_report.records)
+
+    def test_emlab_steps_with_script_import(self, tmp_path):
+        db_emlab_url = 'sqlite:///' + str(tmp_path / 'emlab.sqlite')
+        db_config_url = 'sqlite:///' + str(tmp_path / 'config.sqlite')
+        write_scenario(db_emlab_url, db_config_url, plants=20, ticks=3)
+        db_competes_url = create_db(tmp_path, 'competes', {})
+        run = CoupledRun(db_emlab_url, db_competes_url, db_config_url, [])
+        try:
+            run.run_co2_market()
+            reps = run.reps
+            assert reps.power_plants['PowerPlant0'].capacity != 123
+            emlab_db = run.spinedb_reader_writer.db
+            emlab_powerplants = emlab_db.query_object_parameter_values_by_object_class('PowerPlants')
+
+            # A script imports with a keyword argument, as the steps between the EMLab steps do
+            run.db_emlab.import_object_parameter_values(
+                object_parameter_values=[('PowerPlants', 'PowerPlant0', 'MWNL', 123, '0')])
+            run.db_emlab.commit('Script import')
+            assert run.db_emlab.query_object_parameter_values_by_object_class(object_class_name='PowerPlants') \
+                .get_value('PowerPlant0', 'MWNL', '0') == 123
+            assert emlab_db.query_object_parameter_values_by_object_class('PowerPlants') is not emlab_powerplants
+
+            run.run_co2_market()
+            assert run.reps is reps
+            assert reps.power_plants['PowerPlant0'].capacity == 123
+        finally:
+            run.close()
+        # The calls of EMLab are timed once, for the report of EMLab and of the coupled run
+        assert 0 < run.spinedb_reader_writer.db_time <= run.db_time
@@ -4,6 +4,7 @@ This means that the tests either check whether elements have been written or rea
 
 Jim Hommes - 26-4-2021
 """
+from benchmarks.scenario_generator import write_scenario
 from conftest import *
 
 
@@ -97,6 +98,92 @@ class TestDBRW:
         assert sifm.substances == [reps.substances['Natural Gas']]
         assert sifm.share == 1
 
+    def test_read_db_and_create_repository_class_filtered(self, dbrw):
+        reps = dbrw.read_db_and_create_repository()
+        reps_class_filtered = dbrw.read_db_and_create_repository(class_filtered=True)
+        assert reps_class_filtered.current_tick == reps.current_tick
+        assert str(reps_class_filtered.power_plants) == str(reps.power_plants)
+        for (node_name, load) in reps.load.items():
+            assert reps_class_filtered.load[node_name].get_demand_map() == load.get_demand_map()
+
+    def test_read_db_and_create_repository_snapshot(self, dbrw, tmp_path):
+        reps = dbrw.read_db_and_create_repository()
+        dbrw.snapshot_dir = str(tmp_path)
+        reps_read = dbrw.read_db_and_create_repository()
+        reps_from_snapshot = dbrw.read_db_and_create_repository()
+        assert os.path.isfile(dbrw.get_snapshot_path())
+        dbrw.snapshot_dir = None
+        assert reps_from_snapshot is not reps_read
+        assert reps_from_snapshot.dbrw is dbrw
+        assert reps_from_snapshot.current_tick == reps.current_tick
+        assert str(reps_from_snapshot.power_plants) == str(reps.power_plants)
+        assert reps_from_snapshot.power_plant_dispatch_plans.keys() == reps.power_plant_dispatch_plans.keys()
+
+    def test_read_repository_snapshot_outdated(self, dbrw, tmp_path):
+        dbrw.snapshot_dir = str(tmp_path)
+        reps = dbrw.read_db_and_create_repository()
+        snapshot_key = dbrw.get_snapshot_key(reps.db_commit, reps.current_tick, False, {}, {})
+        assert dbrw.read_repository_snapshot(snapshot_key) is None
+        dbrw.write_repository_snapshot(snapshot_key, reps)
+        assert dbrw.read_repository_snapshot(snapshot_key) is not None
+        assert dbrw.read_repository_snapshot(snapshot_key[:3] + (reps.current_tick + 1,) + snapshot_key[4:]) is None
+        dbrw.snapshot_dir = None
+
+    def test_refresh_repository(self, dbrw):
+        reps = dbrw.read_db_and_create_repository()
+        ppdp = PowerPlantDispatchPlan('testppdp_refresh')
+        ppdp.plant = reps.power_plants['PLANT1']
+        ppdp.bidding_market = reps.electricity_spot_markets['DutchElectricitySpotMarket']
+        ppdp.bidder = ppdp.plant.owner
+        ppdp.amount = 10
+        ppdp.price = 5
+        dbrw.stage_power_plant_dispatch_plan(ppdp, reps.current_tick)
+        dbrw.commit('Test refresh')
+        reps = dbrw.refresh_repository(reps)
+        reps_read = dbrw.read_db_and_create_repository()
+        assert reps.db_commit == reps_read.db_commit
+        assert reps.power_plant_dispatch_plans['testppdp_refresh'].plant is reps.power_plants['PLANT1']
+        assert reps.power_plant_dispatch_plans.keys() == reps_read.power_plant_dispatch_plans.keys()
+        assert str(reps.power_plants) == str(reps_read.power_plants)
+
+    def test_refresh_repository_after_clock_increment(self, tmp_path):
+        db_url = 'sqlite:///' + str(tmp_path / 'emlab.sqlite')
+        config_url = 'sqlite:///' + str(tmp_path / 'config.sqlite')
+        write_scenario(db_url, config_url, plants=20, ticks=3)
+        scenario_dbrw = SpineDBReaderWriter(db_url, config_url)
+        try:
+            reps = scenario_dbrw.read_db_and_create_repository()
+            scenario_dbrw.stage_system_clock_tick(reps.current_tick + 1)
+            scenario_dbrw.commit('Clock increment')
+            reps = scenario_dbrw.refresh_repository(reps)
+            reps_read = scenario_dbrw.read_db_and_create_repository()
+            assert reps.current_tick == reps_read.current_tick
+            assert [i.age for i in reps.power_plants.values()] == [i.age for i in reps_read.power_plants.values()]
+            assert str(reps.power_plants) == str(reps_read.power_plants)
+        finally:
+            scenario_dbrw.db.close_connection()
+            scenario_dbrw.config_db.close_connection()
+
+    def test_index_object_parameter_values(self):
+        object_parameter_values = [('Zones', 'NL', 'Country', 'NL0', '0'),
+                                   ('Zones', 'NL', 'Country', 'NL2', '2'),
+                                   ('Zones', 'NL', 'Country', 'NL1', '1'),
+                                   ('Zones', 'DE', 'Country', 'DE3', '3')]
+        indexed_values = index_object_parameter_values(object_parameter_values, 1)
+        assert indexed_values == {('Zones', 'NL', 'Country'): ('Zones', 'NL', 'Country', 'NL1', '1')}
+
+    def test_add_object_parameter_values_to_repository(self):
+        reps = Repository()
+        reps.current_tick = 2
+        db_data = {'objects': [('Zones', 'NL', None), ('Zones', 'DE', None)],
+                   'object_parameters': [('Zones', 'Country', None, None, None)],
+                   'object_parameter_values': [('Zones', 'NL', 'Country', 'NL0', '0'),
+                                               ('Zones', 'NL', 'Country', 'NL2', '2'),
+                                               ('Zones', 'NL', 'Country', 'NL3', '3')]}
+        add_object_parameter_values_to_repository(reps, db_data, {})
+        assert reps.zones['NL'].parameters['Country'] == 'NL2'
+        assert 'DE' not in reps.zones.keys()
+
     def test_db_relationships_to_arr(self, dbrw):
         output_arr = []
         add_relationship_to_repository_array(dbrw.db.export_data(), output_arr, 'TargetInvestorTargets')
@@ -108,36 +195,42 @@ class TestDBRW:
         importelement_testname = 'testclass'
         assert importelement_testname not in [i[0] for i in dbrw.db.export_data()['object_classes']]
         dbrw.stage_object_class(importelement_testname)
+        dbrw.flush()
         assert importelement_testname in [i[0] for i in dbrw.db.export_data()['object_classes']]
 
     def test_stage_object_classes(self, dbrw):
         importelement_testname = 'testclass_array'
         assert importelement_testname not in [i[0] for i in dbrw.db.export_data()['object_classes']]
         dbrw.stage_object_classes([importelement_testname])
+        dbrw.flush()
         assert importelement_testname in [i[0] for i in dbrw.db.export_data()['object_classes']]
 
     def test_stage_object_parameter(self, dbrw):
         importelement_testname = 'testobject_parameter'
         assert importelement_testname not in [i[1] for i in dbrw.db.export_data()['object_parameters']]
         dbrw.stage_object_parameter('testclass', importelement_testname)
+        dbrw.flush()
         assert importelement_testname in [i[1] for i in dbrw.db.export_data()['object_parameters']]
 
     def test_stage_object_parameters(self, dbrw):
         importelement_testname = 'testobject_parameter_arr'
         assert importelement_testname not in [i[1] for i in dbrw.db.export_data()['object_parameters']]
         dbrw.stage_object_parameters('testclass', [importelement_testname])
+        dbrw.flush()
         assert importelement_testname in [i[1] for i in dbrw.db.export_data()['object_parameters']]
 
     def test_stage_object(self, dbrw):
         importelement_testname = 'testobject'
         assert importelement_testname not in [i[1] for i in dbrw.db.export_data()['objects']]
         dbrw.stage_object('testclass', importelement_testname)
+        dbrw.flush()
         assert importelement_testname in [i[1] for i in dbrw.db.export_data()['objects']]
 
     def test_stage_objects(self, dbrw):
         importelement_testname = 'testobject_arr'
         assert importelement_testname not in [i[1] for i in dbrw.db.export_data()['objects']]
         dbrw.stage_objects([('testclass', importelement_testname)])
+        dbrw.flush()
         assert importelement_testname in [i[1] for i in dbrw.db.export_data()['objects']]
 
     def test_stage_object_parameter_values(self, dbrw):
@@ -145,6 +238,7 @@ class TestDBRW:
         assert importelement_testname not in [i[3] for i in dbrw.db.export_data()['object_parameter_values']]
         dbrw.stage_object_parameter_values('testclass', 'testobject', [('testobject_parameter', importelement_testname)]
                                            , '0')
+        dbrw.flush()
         assert importelement_testname in [i[3] for i in dbrw.db.export_data()['object_parameter_values']]
 
     def test_stage_init_market_clearing_point_structure(self, dbrw_fresh):
@@ -153,6 +247,7 @@ class TestDBRW:
         assert not all(x in [i[1] for i in dbrw_fresh.db.export_data()['object_parameters']] for x in
                        ['Market', 'Price', 'TotalCapacity'])
         dbrw_fresh.stage_init_market_clearing_point_structure()
+        dbrw_fresh.flush()
         assert dbrw_fresh.market_clearing_point_object_classname in [i[0] for i in dbrw_fresh.db.export_data()['object_classes']]
         assert all(x in [i[1] for i in dbrw_fresh.db.export_data()['object_parameters']] for x in
                    ['Market', 'Price', 'TotalCapacity'])
@@ -162,6 +257,7 @@ class TestDBRW:
         assert not all(x in [i[1] for i in dbrw_fresh.db.export_data()['object_parameters']] for x in
                        ['Plant', 'Market', 'Price', 'Capacity', 'EnergyProducer', 'AcceptedAmount', 'Status'])
         dbrw_fresh.stage_init_power_plant_dispatch_plan_structure()
+        dbrw_fresh.flush()
         assert dbrw_fresh.powerplant_dispatch_plan_classname in [i[0] for i in dbrw_fresh.db.export_data()['object_classes']]
         assert all(x in [i[1] for i in dbrw_fresh.db.export_data()['object_parameters']] for x in
                    ['Plant', 'Market', 'Price', 'Capacity', 'EnergyProducer', 'AcceptedAmount', 'Status'])
@@ -175,6 +271,7 @@ class TestDBRW:
         ppdp.bidding_market = ElectricitySpotMarket("testmarket")
         ppdp.bidder = EnergyProducer("testbidder")
         dbrw.stage_power_plant_dispatch_plan(ppdp, '0')
+        dbrw.flush()
         assert importelement_testname in [i[1] for i in dbrw.db.export_data()['object_parameter_values']
                                           if i[0] == dbrw.powerplant_dispatch_plan_classname]
 
@@ -185,11 +282,35 @@ class TestDBRW:
         mcp = MarketClearingPoint(importelement_testname)
         mcp.market = ElectricitySpotMarket('Testmarket')
         dbrw.stage_market_clearing_point(mcp, '0')
+        dbrw.flush()
         assert importelement_testname in [i[1] for i in dbrw.db.export_data()['object_parameter_values']
                                               if i[0] == dbrw.market_clearing_point_object_classname]
 
+    def test_stage_buffers_until_flush(self, dbrw):
+        importelement_testname = 'testppdp_buffered'
+        ppdp = PowerPlantDispatchPlan(importelement_testname)
+        ppdp.plant = PowerPlant("testplant")
+        ppdp.bidding_market = ElectricitySpotMarket("testmarket")
+        ppdp.bidder = EnergyProducer("testbidder")
+        dbrw.stage_power_plant_dispatch_plan(ppdp, '0')
+        ppdp.status = 'Accepted'
+        dbrw.stage_power_plant_dispatch_plan(ppdp, '0')
+        assert importelement_testname not in [i[1] for i in dbrw.db.export_data()['objects']]
+        dbrw.flush()
+        assert [i[3] for i in dbrw.db.export_data()['object_parameter_values']
+                if i[1] == importelement_testname and i[2] == 'Status'] == ['Accepted']
+
     def test_stage_init_alternative(self, dbrw):
         importelement_testname = 'testalternative'
         assert importelement_testname not in [i[0] for i in dbrw.db.export_data()['alternatives']]
         dbrw.stage_init_alternative(importelement_testname)
+        dbrw.flush()
         assert importelement_testname in [i[0] for i in dbrw.db.export_data()['alternatives']]
+
+    def test_stage_system_clock_tick(self, dbrw):
+        current_tick = max(int(i[3]) for i in dbrw.db.export_data()['object_parameter_values']
+                           if i[0] == i[1] == 'SystemClockTicks' and i[2] == 'ticks')
+        dbrw.stage_system_clock_tick(current_tick + 1)
+        dbrw.flush()
+        assert str(current_tick + 1) in [i[0] for i in dbrw.db.export_data()['alternatives']]
+        assert dbrw.read_db_and_create_repository().current_tick == current_tick + 1
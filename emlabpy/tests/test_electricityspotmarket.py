@@ -0,0 +1,32 @@
+from benchmarks.scenario_generator import write_scenario
+from modules.capacitymarket import CapacityMarketSubmitBids
+from modules.electricityspotmarket import ElectricitySpotMarketSubmitBids
+from util.spinedb_reader_writer import *
+
+
+class TestElectricitySpotMarket:
+
+    def test_submit_bids_with_decommissioned_plant_without_fuel_mix(self, tmp_path):
+        db_url = 'sqlite:///' + str(tmp_path / 'emlab.sqlite')
+        config_url = 'sqlite:///' + str(tmp_path / 'config.sqlite')
+        write_scenario(db_url, config_url, plants=20, owners=2, ticks=3)
+        dbrw = SpineDBReaderWriter(db_url, config_url)
+        try:
+            reps = dbrw.read_db_and_create_repository()
+            owner = next(iter(reps.energy_producers.values()))
+            decommissioned_plant = PowerPlant('DecommissionedPlant', reps.power_plants)
+            decommissioned_plant.owner = owner
+            decommissioned_plant.status = 'DECOM'
+            assert decommissioned_plant.technology is None
+
+            ElectricitySpotMarketSubmitBids(reps).act()
+            CapacityMarketSubmitBids(reps).act()
+            ppdps = reps.power_plant_dispatch_plans.get_by_index('tick', reps.current_tick)
+            for markets in [reps.electricity_spot_markets, reps.capacity_markets]:
+                bidding_plants = [ppdp.plant for ppdp in ppdps if ppdp.bidding_market in markets.values()]
+                assert len(bidding_plants) == 20
+                assert decommissioned_plant not in bidding_plants
+            assert len(reps.get_power_plant_emissions_by_tick(reps.current_tick)) == 20
+        finally:
+            dbrw.db.close_connection()
+            dbrw.config_db.close_connection()
@@ -0,0 +1,21 @@
+from benchmarks.scenario_generator import write_scenario
+from emlab import *
+
+
+class TestEmlab:
+
+    def test_run_emlab_multiple_ticks(self, tmp_path):
+        db_url = 'sqlite:///' + str(tmp_path / 'emlab.sqlite')
+        config_url = 'sqlite:///' + str(tmp_path / 'config.sqlite')
+        write_scenario(db_url, config_url, plants=20, ticks=3)
+        spinedb_reader_writer = SpineDBReaderWriter(db_url, config_url)
+        try:
+            start_tick = spinedb_reader_writer.read_db_and_create_repository().current_tick
+            reps = run_emlab(spinedb_reader_writer, final_tick=start_tick + 2)
+            reps_read = spinedb_reader_writer.read_db_and_create_repository()
+            assert reps.current_tick == reps_read.current_tick == start_tick + 2
+            # The ages are those of the final tick, as when every tick is run in a separate process
+            assert [i.age for i in reps.power_plants.values()] == [i.age for i in reps_read.power_plants.values()]
+        finally:
+            spinedb_reader_writer.db.close_connection()
+            spinedb_reader_writer.config_db.close_connection()
@@ -0,0 +1,69 @@
+from domain.energy import PowerPlant, PowerPlantDispatchPlan
+from util.indexed_dict import IndexedDict
+
+
+class TestIndexedDict:
+
+    def test_get_by_index(self):
+        indexed_dict = IndexedDict(plant_tick=('plant', 'tick'))
+        plant = PowerPlant('plant')
+        ppdp1 = PowerPlantDispatchPlan('ppdp1')
+        ppdp2 = PowerPlantDispatchPlan('ppdp2')
+        ppdp1.plant = plant
+        ppdp2.plant = plant
+        ppdp1.tick = 1
+        ppdp2.tick = 1
+        indexed_dict[ppdp2.name] = ppdp2
+        indexed_dict[ppdp1.name] = ppdp1
+        assert indexed_dict.get_by_index('plant_tick', plant, 1) == [ppdp2, ppdp1]
+        assert indexed_dict.get_first_by_index('plant_tick', plant, 1) == ppdp2
+        assert indexed_dict.get_by_index('plant_tick', plant, 2) == []
+        assert indexed_dict.get_first_by_index('plant_tick', plant, 2) is None
+
+    def test_update_indexes_on_attribute_change(self):
+        indexed_dict = IndexedDict(plant=('plant',), plant_tick=('plant', 'tick'))
+        plant = PowerPlant('plant')
+        ppdp = PowerPlantDispatchPlan('ppdp')
+        indexed_dict[ppdp.name] = ppdp
+        ppdp.plant = plant
+        ppdp.tick = 5
+        assert indexed_dict.get_by_index('plant', plant) == [ppdp]
+        assert indexed_dict.get_by_index('plant_tick', plant, 5) == [ppdp]
+        ppdp.tick = 6
+        assert indexed_dict.get_by_index('plant_tick', plant, 5) == []
+        assert indexed_dict.get_by_index('plant_tick', plant, 6) == [ppdp]
+
+    def test_replace_and_delete(self):
+        indexed_dict = IndexedDict(plant=('plant',))
+        plant = PowerPlant('plant')
+        ppdp_old = PowerPlantDispatchPlan('ppdp')
+        ppdp_old.plant = plant
+        ppdp_new = PowerPlantDispatchPlan('ppdp')
+        ppdp_new.plant = plant
+        indexed_dict[ppdp_old.name] = ppdp_old
+        indexed_dict[ppdp_new.name] = ppdp_new
+        assert indexed_dict.get_by_index('plant', plant) == [ppdp_new]
+        ppdp_old.plant = None
+        assert indexed_dict.get_by_index('plant', None) == []
+        del indexed_dict[ppdp_new.name]
+        assert indexed_dict.get_by_index('plant', plant) == []
+        assert len(indexed_dict) == 0
+
+    def test_dict_methods_keep_indexes(self):
+        indexed_dict = IndexedDict(plant=('plant',))
+        plant = PowerPlant('plant')
+        ppdps = [PowerPlantDispatchPlan('ppdp' + str(i)) for i in range(4)]
+        for ppdp in ppdps:
+            ppdp.plant = plant
+        indexed_dict.update({ppdps[0].name: ppdps[0]}, ppdp1=ppdps[1])
+        assert indexed_dict.setdefault(ppdps[2].name, ppdps[2]) is ppdps[2]
+        assert indexed_dict.setdefault(ppdps[2].name, ppdps[3]) is ppdps[2]
+        indexed_dict |= {ppdps[3].name: ppdps[3]}
+        assert indexed_dict.get_by_index('plant', plant) == ppdps
+        assert indexed_dict.popitem() == (ppdps[3].name, ppdps[3])
+        assert indexed_dict.pop(ppdps[0].name) is ppdps[0]
+        assert indexed_dict.get_by_index('plant', plant) == ppdps[1:3]
+        ppdps[3].plant = None
+        assert indexed_dict.get_by_index('plant', None) == []
+        indexed_dict.clear()
+        assert indexed_dict.get_by_index('plant', plant) == []
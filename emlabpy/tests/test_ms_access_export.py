@@ -0,0 +1,112 @@
+"""
+This file tests the export of the COMPETES SpineDB to MS Access, written to SQLite instead.
+"""
+import sqlite3
+import pytest
+from spinedb_api import Map
+from domain import trends
+from competes_spinedb_to_ms_access import *
+
+
+class TestMSAccessExport:
+
+    db_competes_data = {
+        'objects': [('Units', 'U1', None), ('Units', 'U2', None), ('Technologies', 'CCGT', None), ('Nset', 'N1', None),
+                    ('Country', 'NED', None), ('Country', 'BEL', None), ('FuelpriceTrends', 'gasTrend', None)] +
+                   [('Months', i, None) for i in ['Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'Aug', 'Sep',
+                                                  'Oct', 'Nov', 'Dec']],
+        'object_parameter_values': [
+            ('Units', 'U1', 'MW', 10.0, 'Base'), ('Units', 'U1', 'Fuel', 'GAS', 'Base'), ('Units', 'U2', 'MW', 20.0, 'Base'),
+            ('Technologies', 'CCGT', 'Technologies',
+             Map(['2020', '2025'], [Map(['MW', 'Efficiency'], [1.0, 0.5]), Map(['MW', 'Efficiency'], [2.0, 0.6])]),
+             'Base'),
+            ('EU_ETS_CO2price', '2020', 'Jan', 25.0, 'Base'), ('EU_ETS_CO2price', '2020', 'Feb', 26.0, 'Base'),
+            ('FuelpriceTrends', 'gasTrend', 'Fuel', 'GAS', 'Base'), ('FuelpriceTrends', 'gasTrend', 'Start', 20.0, 'Base'),
+            ('FuelpriceTrends', 'gasTrend', 'Top', 1.01, 'Base'), ('FuelpriceTrends', 'gasTrend', 'Max', 1.05, 'Base'),
+            ('FuelpriceTrends', 'gasTrend', 'Min', 0.97, 'Base')],
+        'relationships': [('Lines', ['NED', 'BEL'])],
+        'relationship_parameter_values': [('Lines', ['NED', 'BEL'], 'Capacity', 100.0, 'Base')],
+    }
+
+    def test_export_to_sqlite(self, tmp_path):
+        export_to_mdb(str(tmp_path) + '/', 'COMPETES EU 2050-KIP.mdb', {'Units': 'Unit'},
+                      {'Technologies': ('Technology', 'Year')}, {'Lines': ('From', 'To')}, {}, 2020, 2022, 1,
+                      self.db_competes_data, SQLiteBackend())
+
+        connection = sqlite3.connect(str(tmp_path / 'COMPETES EU 2050-KIP.mdb'))
+        assert connection.execute('SELECT [Unit], [MW], [Fuel] FROM [Units] ORDER BY [Unit]').fetchall() == \
+               [('U1', 10.0, 'GAS'), ('U2', 20.0, None)]
+        assert connection.execute('SELECT * FROM [Technologies] ORDER BY [Year]').fetchall() == \
+               [('CCGT', '2020', 1.0, 0.5), ('CCGT', '2025', 2.0, 0.6)]
+        assert connection.execute('SELECT * FROM [Lines]').fetchall() == [('NED', 'BEL', 100.0)]
+        assert connection.execute('SELECT * FROM [EU_ETS_CO2price]').fetchall() == \
+               [('2020', 'Jan', 25.0), ('2020', 'Feb', 26.0)]
+        assert connection.execute('SELECT * FROM [Nset]').fetchall() == [('N1',)]
+        # Every year up to the end year + look ahead, for every country
+        fuel_prices = connection.execute('SELECT [Country], [Year], [Jan], [Dec] FROM [Fuelpriceyears] '
+                                         'WHERE [Year] = 2020').fetchall()
+        assert fuel_prices == [('NED', 2020, 20.0 / 3.6, 20.0 / 3.6), ('BEL', 2020, 20.0 / 3.6, 20.0 / 3.6)]
+        assert connection.execute('SELECT COUNT(*) FROM [Fuelpriceyears]').fetchone() == (8,)
+        connection.close()
+
+    def test_fuel_prices_are_emlab_trend_values(self):
+        writer = MDBWriter(None)
+        fuel_price_paths = export_fuelpriceyears(writer, self.db_competes_data, 2020, 2030, 5)
+
+        # EMLab draws the values of the trend tick by tick
+        emlab_trend = trends.TriangularTrend('gasTrend')
+        for (table_name, object_name, parameter_name, parameter_value, _) in \
+                self.db_competes_data['object_parameter_values']:
+            if table_name == 'FuelpriceTrends':
+                emlab_trend.add_parameter_value(None, parameter_name, parameter_value, '0')
+        emlab_values = [emlab_trend.get_value(tick) for tick in range(16)]
+
+        assert fuel_price_paths['gasTrend'][1].tolist() == emlab_values
+        fuel_prices = writer.rows[('Fuelpriceyears', ('Fuelname', 'Country', 'Year', 'Jan', 'Feb', 'March', 'April',
+                                                      'May', 'June', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'))]
+        assert len(fuel_prices) == 16 * 2
+        assert fuel_prices[7] == ('GAS', 'BEL', 2023) + (emlab_values[3] / 3.6,) * 12
+
+    def test_flatten_map(self):
+        value_map = Map(['2020', '2025'], [Map(['NED', 'BEL'], [Map(['MW'], [1.0]), Map(['MW'], [2.0])]),
+                                           Map(['NED'], [Map(['MW', 'Efficiency'], [3.0, 0.5])])])
+        assert flatten_map(value_map) == [(('2020', 'NED'), ('MW',), (1.0,)), (('2020', 'BEL'), ('MW',), (2.0,)),
+                                          (('2025', 'NED'), ('MW', 'Efficiency'), (3.0, 0.5))]
+        assert flatten_map(Map([], [], str)) == []
+
+    def test_get_table_frames(self):
+        frames = get_table_frames([(['Unit', 'MW'], ['U1', 1.0]), (['Unit', 'MW', 'Fuel'], ['U2', 2.0, None]),
+                                   (['Unit', 'MW'], ['U3', 3.0])])
+        assert [list(frame.columns) for frame in frames] == [['Unit', 'MW'], ['Unit', 'MW', 'Fuel']]
+        assert list(frames[0].itertuples(index=False, name=None)) == [('U1', 1.0), ('U3', 3.0)]
+        assert list(frames[1].itertuples(index=False, name=None)) == [('U2', 2.0, None)]
+
+    def test_export_to_mdbs(self, tmp_path):
+        export_times = export_to_mdbs(str(tmp_path) + '/',
+                                      [('COMPETES EU 2050-KIP.mdb', {'Units': 'Unit'}, {}, {}, {}),
+                                       ('COMPETES EU PowerPlants 2050-KIP', {}, {'Technologies': ('Technology', 'Year')},
+                                        {'Lines': ('From', 'To')}, {})],
+                                      2020, 2022, 1, self.db_competes_data, SQLiteBackend)
+        assert sorted(export_times.keys()) == ['COMPETES EU 2050-KIP.mdb', 'COMPETES EU PowerPlants 2050-KIP']
+
+        connection = sqlite3.connect(str(tmp_path / 'COMPETES EU 2050-KIP.mdb'))
+        assert connection.execute('SELECT COUNT(*) FROM [Units]').fetchone() == (2,)
+        assert connection.execute('SELECT COUNT(*) FROM [Fuelpriceyears]').fetchone() == (8,)
+        connection.close()
+        connection = sqlite3.connect(str(tmp_path / 'COMPETES EU PowerPlants 2050-KIP'))
+        assert connection.execute('SELECT * FROM [Technologies] ORDER BY [Year]').fetchall() == \
+               [('CCGT', '2020', 1.0, 0.5), ('CCGT', '2025', 2.0, 0.6)]
+        assert connection.execute('SELECT * FROM [Lines]').fetchall() == [('NED', 'BEL', 100.0)]
+        assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'Fuelpriceyears'").fetchall() == []
+        connection.close()
+
+    def test_export_to_mdbs_summarizes_errors(self, tmp_path):
+        # Units is not a Map, so it cannot be exported as type 2. The other DB is exported regardless
+        with pytest.raises(RuntimeError) as e:
+            export_to_mdbs(str(tmp_path) + '/', [('A.mdb', {}, {'Units': ('Unit', 'Year')}, {}, {}),
+                                                 ('B.mdb', {'Units': 'Unit'}, {}, {}, {})],
+                           2020, 2022, 1, self.db_competes_data, SQLiteBackend)
+        assert 'Export failed for 1 of 2' in str(e.value) and 'A.mdb' in str(e.value)
+        connection = sqlite3.connect(str(tmp_path / 'B.mdb'))
+        assert connection.execute('SELECT COUNT(*) FROM [Units]').fetchone() == (2,)
+        connection.close()
@@ -1,6 +1,12 @@
-from domain.energy import PowerPlant
+import numpy as np
+import pickle
+import pytest
+from domain.energy import PowerPlant, PowerPlantFleet, PowerGeneratingTechnology, Substance, SubstanceInFuelMix
+from domain.energy import FleetCostCalculator
+from domain.trends import GeometricTrend
 from domain.energy import ImportObject
 from util.repository import Repository
+from util.spinedb_reader_writer import add_parameter_value_to_repository
 
 
 class TestPowerPlant:
@@ -49,12 +55,108 @@ class TestPowerPlant:
         assert pp1.calculate_marginal_cost_excl_co2_market_cost(reps, 0) == \
                pp1.calculate_marginal_fuel_cost_per_mw_by_tick(reps, 0)
 
+    def test_power_plant_fleet(self):
+        fleet = PowerPlantFleet()
+        pp1 = PowerPlant('pp1')
+        pp1.capacity = 100
+        pp1.status = 'OPR'
+        pp1.banked_allowances[2] = 5
+        fleet[pp1.name] = pp1   # The data is copied into the fleet
+        pp2 = PowerPlant('pp2', fleet)
+        pp2.capacity = 200
+        assert pp1.fleet is fleet and pp2.fleet is fleet
+        assert fleet.get_column('capacity').tolist() == [100, 200]
+        assert isinstance(pp2.capacity, int)
+        assert fleet.select(fleet.get_column('status') == fleet.get_object_index('status', 'OPR')) == [pp1]
+        assert pp1.banked_allowances[2] == 5
+        pp1.banked_allowances[2] += 1
+        assert fleet.banked_allowances[pp1.index, 2] == 6
+
+    def test_power_plant_fleet_pickle(self):
+        fleet = PowerPlantFleet()
+        pp1 = PowerPlant('pp1', fleet)
+        pp1.capacity = 100
+        unpickled_fleet = pickle.loads(pickle.dumps(fleet))
+        assert unpickled_fleet['pp1'].fleet is unpickled_fleet
+        assert unpickled_fleet['pp1'].capacity == 100
+
+    def test_fleet_cost_calculator(self):
+        class FuelMixReps:
+            power_plants_fuel_mix = dict()
+
+            def get_substances_in_fuel_mix_by_plant(self, plant):
+                return self.power_plants_fuel_mix.get(plant.technology.name)
+        reps = FuelMixReps()
+        substances = []
+        for (name, co2_density, growth_rate) in [('coal', 0.34, 0.02), ('gas', 0.2, 0.05), ('biomass', 0.1, 0.01)]:
+            substance = Substance(name)
+            substance.co2_density = co2_density
+            substance.trend = GeometricTrend(name + 'Trend')
+            substance.trend.start = 3.7
+            substance.trend.growth_rate = growth_rate
+            substances.append(substance)
+        technologies = []
+        for (name, fuels, capture_efficiency) in [('CCGT', [1], 0), ('COALCCS', [0, 2], 0.9), ('NUCLEAR', [], 0)]:
+            technology = PowerGeneratingTechnology(name)
+            technology.co2_capture_efficiency = capture_efficiency
+            reps.power_plants_fuel_mix[name] = SubstanceInFuelMix(name)
+            reps.power_plants_fuel_mix[name].substances = [substances[i] for i in fuels]
+            technologies.append(technology)
+        technologies.append(PowerGeneratingTechnology('WIND'))
+        fleet = PowerPlantFleet()
+        calculator = FleetCostCalculator(fleet, reps.power_plants_fuel_mix)
+        for i in range(20):
+            power_plant = PowerPlant('pp' + str(i), fleet)
+            power_plant.technology = technologies[i % 3]
+            power_plant.efficiency = 0.3 + i / 97
+        for time in [0, 3]:
+            marginal_costs = calculator.get_marginal_costs_excl_co2_market_cost(time)
+            for power_plant in fleet.values():
+                assert marginal_costs[power_plant.index] == \
+                    power_plant.calculate_marginal_cost_excl_co2_market_cost(reps, time)
+        emission_intensities = calculator.get_emission_intensities()
+        for power_plant in fleet.values():
+            assert emission_intensities[power_plant.index] == power_plant.calculate_emission_intensity(reps)
+
+        # Values that are changed in place after the first calculation are used
+        technologies[1].co2_capture_efficiency = 0.5
+        reps.power_plants_fuel_mix['CCGT'].share = 0.8
+        substances[2].co2_density = 0.4
+        emission_intensities = calculator.get_emission_intensities()
+        marginal_costs = calculator.get_marginal_costs_excl_co2_market_cost(3)
+        for power_plant in fleet.values():
+            assert emission_intensities[power_plant.index] == power_plant.calculate_emission_intensity(reps)
+            assert marginal_costs[power_plant.index] == \
+                power_plant.calculate_marginal_cost_excl_co2_market_cost(reps, 3)
+
+        # New technologies are added to the matrix; PowerPlants without fuel mix are an error
+        fleet['pp0'].technology = technologies[3]
+        with pytest.raises(ValueError, match='pp0'):
+            calculator.get_emission_intensities()
+        # Only the selected rows are calculated
+        rows = np.array([fleet['pp2'].index, fleet['pp1'].index])
+        assert calculator.get_emission_intensities(rows).tolist() == \
+            [fleet['pp2'].calculate_emission_intensity(reps), fleet['pp1'].calculate_emission_intensity(reps)]
+
+    def test_add_power_plant_to_repository(self):
+        reps = Repository()
+        add_parameter_value_to_repository(reps, ['PowerPlants', 'pp0', 'MWNL', 100.0, '0'], reps.power_plants,
+                                          PowerPlant)
+        add_parameter_value_to_repository(reps, ['PowerPlants', 'pp0', 'EfficiencyNL', 0.4, '0'], reps.power_plants,
+                                          PowerPlant)
+        assert reps.power_plants['pp0'].fleet is reps.power_plants
+        assert reps.power_plants.size == 1
+        assert reps.power_plants['pp0'].capacity == 100
+        assert isinstance(reps.power_plants['pp0'].capacity, int)
+        assert reps.power_plants['pp0'].efficiency == 0.4
+        assert not hasattr(reps.power_plants['pp0'], '__dict__')
+
     def test_import_object_to_string(self):
         testobj = ImportObject('testobj')
         testobj.parameters['test'] = 'test'
-        assert testobj.__str__().strip() == str(vars(testobj)).strip()
+        assert testobj.__str__().strip() == str({'name': 'testobj', 'parameters': {'test': 'test'}})
 
     def test_import_object_to_repr(self):
         testobj = ImportObject('testobj')
         testobj.parameters['test'] = 'test'
-        assert testobj.__repr__().strip() == str(vars(testobj)).strip()
+        assert testobj.__repr__().strip() == str({'name': 'testobj', 'parameters': {'test': 'test'}})
@@ -0,0 +1,41 @@
+"""
+This file tests the lookups of the QueryResult, as returned by the SpineDB wrapper of the scripts.
+"""
+import pytest
+from spinedb import QueryResult, as_query_result
+
+
+def row(object_name, parameter_name, parameter_value, alternative='0'):
+    return {'object_class_name': 'MarketClearingPoints', 'object_name': object_name,
+            'parameter_name': parameter_name, 'parameter_value': parameter_value, 'alternative': alternative}
+
+
+class TestQueryResult:
+
+    rows = [row('MCP1', 'Market', 'DutchCapacityMarket', '1'), row('MCP1', 'Price', 10.0, '1'),
+            row('MCP2', 'Market', 'DutchCapacityMarket', '2'), row('MCP2', 'Price', 20.0, '2'),
+            row('MCP2', 'Price', 25.0, '3'), row('MCP3', 'Market', 'CO2Auction', '2')]
+
+    def test_get_value(self):
+        query_result = QueryResult(self.rows)
+        assert query_result == self.rows
+        assert query_result.get_value('MCP2', 'Price') == 20.0
+        assert query_result.get_value('MCP2', 'Price', '3') == 25.0
+        assert query_result.get_value('MCP1') == 'DutchCapacityMarket'
+        assert query_result.get_rows('MCP2', alternative='3') == [self.rows[4]]
+        assert query_result.get_rows('MCP4', 'Price') == []
+        with pytest.raises(KeyError):
+            query_result.get_value('MCP1', 'Price', '2')
+
+    def test_get_object_names(self):
+        query_result = as_query_result(self.rows)
+        assert as_query_result(query_result) is query_result
+        assert query_result.get_object_names('Market', 'DutchCapacityMarket') == ['MCP1', 'MCP2']
+        assert query_result.get_object_name('Market', 'DutchCapacityMarket', '2') == 'MCP2'
+        assert query_result.get_object_names('Market', 'CO2Auction', '1') == []
+
+    def test_to_dataframe(self):
+        df = QueryResult(self.rows).to_dataframe()
+        assert list(df.index) == ['MCP1', 'MCP2', 'MCP3']
+        assert df.loc['MCP2', 'Price'] == 20.0
+        assert QueryResult(self.rows).to_dataframe('3').loc['MCP2', 'Price'] == 25.0
@@ -182,6 +182,27 @@ class TestRepository:
         reps.power_plant_dispatch_plans[ppdp2.name] = ppdp2
         assert reps.get_total_accepted_amounts_by_power_plant_and_tick_and_market(plant, 123, market1) == 100 + 200
 
+    def test_get_accepted_amounts_and_revenues_per_power_plant_by_tick(self, reps: Repository):
+        plant = PowerPlant("newplant_for_aggregates")
+        ppdp1 = PowerPlantDispatchPlan("ppdp1_for_aggregates")
+        ppdp2 = PowerPlantDispatchPlan("ppdp2_for_aggregates")
+        market1 = reps.electricity_spot_markets['DutchElectricitySpotMarket']
+        ppdp1.accepted_amount = 100
+        ppdp1.price = 10
+        ppdp1.plant = plant
+        ppdp1.bidding_market = market1
+        ppdp1.tick = 124
+        ppdp2.accepted_amount = 200
+        ppdp2.price = 5
+        ppdp2.plant = plant
+        ppdp2.bidding_market = None
+        ppdp2.tick = 124
+        reps.power_plant_dispatch_plans[ppdp1.name] = ppdp1
+        reps.power_plant_dispatch_plans[ppdp2.name] = ppdp2
+        accepted_amounts, revenues = reps.get_accepted_amounts_and_revenues_per_power_plant_by_tick(124, market1)
+        assert accepted_amounts == {plant: 100}
+        assert revenues == {plant: 100 * 10 + 200 * 5}
+
     def test_get_power_plant_costs_by_tick(self, reps: Repository):
         market1 = reps.electricity_spot_markets['DutchElectricitySpotMarket']
         mc = 1 * 12.78 / 0.35
@@ -0,0 +1,39 @@
+import csv
+import json
+from util.run_report import RunReport
+
+
+class TestRunReport:
+
+    def test_measure(self):
+        class Counters:
+            db_time = 1.0
+            staged_rows = 10
+        counters = Counters()
+        run_report = RunReport()
+        with run_report.measure('Module', 3, counters) as record:
+            counters.db_time += 0.5
+            counters.staged_rows += 7
+            record['commit_time'] = 0.25
+        assert len(run_report.records) == 1
+        record = run_report.records[0]
+        assert list(record.keys()) == RunReport.fields
+        assert record['tick'] == 3 and record['module'] == 'Module'
+        assert record['db_time'] == 0.5
+        assert record['staged_rows'] == 7
+        assert record['commit_time'] == 0.25
+        assert record['wall_time'] >= 0 and record['cpu_time'] >= 0
+
+    def test_write(self, tmp_path):
+        class Counters:
+            db_time = 0.0
+            staged_rows = 0
+        run_report = RunReport()
+        for tick in range(2):
+            with run_report.measure('Module', tick, Counters()):
+                pass
+        run_report.write(str(tmp_path / 'report'))
+        with open(str(tmp_path / 'report.json')) as json_file:
+            assert json.load(json_file) == run_report.records
+        with open(str(tmp_path / 'report.csv')) as csv_file:
+            assert [row['tick'] for row in csv.DictReader(csv_file)] == ['0', '1']
@@ -0,0 +1,31 @@
+import math
+from benchmarks.scenario_generator import *
+from util.spinedb_reader_writer import *
+
+
+class TestScenarioGenerator:
+
+    def test_generate_emlab_data(self):
+        db_data = generate_emlab_data(plants=50, owners=5, technologies=8, zones=3, ticks=4, historical_ppdp_ticks=2,
+                                      hours=24)
+        assert db_data == generate_emlab_data(plants=50, owners=5, technologies=8, zones=3, ticks=4,
+                                              historical_ppdp_ticks=2, hours=24)
+        parameter_priorities = {object_name_and_value[2]: object_name_and_value[3] for object_name_and_value
+                                in generate_config_data()['object_parameter_values']
+                                if object_name_and_value[0] == 'EMLAB Parameters'}
+        reps = Repository()
+        reps.current_tick = 3
+        add_object_parameter_values_to_repository(reps, db_data, parameter_priorities)
+        reps.power_plants.trim()
+
+        assert len(reps.power_plants) == 50
+        assert len(reps.energy_producers) == 5
+        assert len(reps.power_generating_technologies) == 8
+        assert len(reps.zones) == 3
+        assert all(plant.technology is not None and plant.owner is not None for plant in reps.power_plants.values())
+        # Every PowerPlant has a dispatch plan in the two ticks before the current one
+        assert len(reps.power_plant_dispatch_plans) == 2 * 50
+        assert all(not math.isnan(i) for i in reps.get_marginal_costs_excl_co2_market_cost_by_tick(
+            3, list(reps.power_plants.values())).values())
+        assert len(reps.load['NL'].get_hourly_demand_by_year(2020)) == 24
+        assert max(reps.load['NL'].parameters['ldc'].values) > 0
@@ -1,3 +1,5 @@
+import numpy as np
+import pickle
 from domain.trends import *
 
 
@@ -34,3 +36,52 @@ class TestTrend:
         assert st.get_value(10) == 40
         assert st.get_value(1000) == 25
 
+
+    def test_triangular_trend_start_replaces_path(self):
+        tt = TriangularTrend("tt")
+        tt.add_parameter_value(None, 'Top', 1, '0')
+        tt.add_parameter_value(None, 'Min', 0.5, '0')
+        tt.add_parameter_value(None, 'Max', 1.5, '0')
+        tt.add_parameter_value(None, 'Start', 100, '0')
+        path = tt.get_values(range(10)).tolist()
+        tt.add_parameter_value(None, 'Start', 200, '1')
+        assert tt.get_value(0) == 200
+        assert len(tt.values) == 1
+        tt.add_parameter_value(None, 'Start', 100, '2')
+        assert tt.get_values(range(10)).tolist() == path
+
+    def test_pickle_keeps_precomputed_values(self):
+        gt = GeometricTrend("gt")
+        gt.start = 1000
+        gt.growth_rate = 0.05
+        gt.precompute(10)
+        unpickled_gt = pickle.loads(pickle.dumps(gt))
+        assert unpickled_gt.name == "gt"
+        assert np.array_equal(unpickled_gt.precomputed_values, gt.precomputed_values)
+
+    def test_get_values(self):
+        gt = GeometricTrend("gt")
+        gt.start = 1000
+        gt.growth_rate = 0.05
+        gt.precompute(10)
+        assert gt.get_values([0, 3, 3, 25]).tolist() == [gt.compute_value(0), gt.compute_value(3),
+                                                         gt.compute_value(3), gt.compute_value(25)]
+        assert gt.get_value(-1) == 1000 / 1.05
+        gt.growth_rate = 0.1    # Changing a parameter invalidates the precomputed values
+        assert gt.get_value(1) == 1.1 * 1000
+
+    def test_triangular_trend_is_reproducible(self):
+        tt1 = TriangularTrend("tt")
+        tt2 = TriangularTrend("tt")
+        for tt in [tt1, tt2]:
+            tt.top = 1
+            tt.min = 0.5
+            tt.max = 1.5
+            tt.values = [100]
+        tt1.get_value(5)    # Drawing in steps gives the same path as drawing at once
+        assert tt1.get_values(range(20)).tolist() == tt2.get_values(range(20)).tolist()
+        paths = tt1.get_monte_carlo_paths(50, 20)
+        assert paths.shape == (50, 20)
+        assert (paths[:, 0] == 100).all()
+        assert paths[0].tolist() == tt1.get_values(range(20)).tolist()
+        assert not np.array_equal(paths[0], paths[1])
@@ -0,0 +1,136 @@
+"""
+The IndexedDict: a dict of Repository objects by name that also keeps secondary indexes on object attributes.
+This way Repository queries such as "all dispatch plans of this plant at this tick" do not have to scan all objects.
+"""
+from operator import attrgetter
+
+
+class IndexedDict(dict):
+    """
+    Dict of object name to object, with secondary indexes.
+    Every index is defined by a name and the attribute names it is keyed on, e.g. plant_tick=('plant', 'tick').
+    Objects have to be IndexedImportObjects: when one of their attributes changes, the indexes are updated.
+    """
+
+    def __init__(self, **indexed_attributes):
+        super().__init__()
+        self.indexed_attributes = indexed_attributes
+        self.key_functions = {index_name: attrgetter(*attribute_names)
+                              for (index_name, attribute_names) in indexed_attributes.items()}
+        self.indexes = {index_name: dict() for index_name in indexed_attributes.keys()}
+        self.indexed_keys = dict()
+        self.positions = dict()
+        self.position_counter = 0
+
+    def __setitem__(self, name, indexed_object):
+        if name in self.keys():
+            if self[name] is indexed_object:
+                return
+            self.remove_from_indexes(self[name])
+        else:
+            self.positions[name] = self.position_counter
+            self.position_counter += 1
+        super().__setitem__(name, indexed_object)
+        indexed_object.indexed_by.append(self)
+        self.update_indexes(indexed_object)
+
+    def __delitem__(self, name):
+        self.remove_from_indexes(self[name])
+        del self.positions[name]
+        super().__delitem__(name)
+
+    def pop(self, name, *default):
+        if name in self.keys():
+            indexed_object = self[name]
+            del self[name]
+            return indexed_object
+        return super().pop(name, *default)
+
+    def popitem(self):
+        if len(self) == 0:
+            raise KeyError('popitem(): dictionary is empty')
+        name = next(reversed(self.keys()))
+        return name, self.pop(name)
+
+    def setdefault(self, name, default=None):
+        if name not in self.keys():
+            self[name] = default
+        return self[name]
+
+    def update(self, *args, **kwargs):
+        # dict.update would bypass __setitem__, and so the indexes
+        for (name, indexed_object) in dict(*args, **kwargs).items():
+            self[name] = indexed_object
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        for indexed_object in self.values():
+            indexed_object.indexed_by.remove(self)
+        super().clear()
+        self.indexes = {index_name: dict() for index_name in self.indexes.keys()}
+        self.indexed_keys = dict()
+        self.positions = dict()
+
+    def __reduce__(self):
+        # Rebuild the indexes when unpickling, instead of restoring them
+        return rebuild_indexed_dict, (self.indexed_attributes, list(self.items()))
+
+    def update_indexes(self, indexed_object):
+        """
+        (Re-)index the object. This is called by the object itself whenever one of its attributes changes.
+        """
+        old_keys = self.indexed_keys.get(indexed_object.name, {})
+        new_keys = dict()
+        for (index_name, key_function) in self.key_functions.items():
+            try:
+                new_key = key_function(indexed_object)
+            except AttributeError:  # Object is still being initialized
+                return
+            new_keys[index_name] = new_key
+            if index_name in old_keys.keys():
+                if old_keys[index_name] == new_key:
+                    continue
+                self.remove_from_bucket(index_name, old_keys[index_name], indexed_object.name)
+            self.indexes[index_name].setdefault(new_key, dict())[indexed_object.name] = indexed_object
+        self.indexed_keys[indexed_object.name] = new_keys
+
+    def remove_from_indexes(self, indexed_object):
+        for (index_name, key) in self.indexed_keys.pop(indexed_object.name, {}).items():
+            self.remove_from_bucket(index_name, key, indexed_object.name)
+        indexed_object.indexed_by.remove(self)
+
+    def remove_from_bucket(self, index_name, key, name):
+        bucket = self.indexes[index_name][key]
+        del bucket[name]
+        if len(bucket) == 0:
+            del self.indexes[index_name][key]
+
+    def get_by_index(self, index_name: str, *key) -> list:
+        """
+        Get all objects with the given key in the given index, in the order in which they were added to this dict.
+
+        :param index_name: Name of the index
+        :param key: The values of the indexed attributes
+        :return: List of objects
+        """
+        bucket = self.indexes[index_name].get(key[0] if len(key) == 1 else key)
+        if bucket is None:
+            return []
+        return sorted(bucket.values(), key=lambda i: self.positions[i.name])
+
+    def get_first_by_index(self, index_name: str, *key):
+        """
+        Get the first object with the given key in the given index, or None if there is none.
+        """
+        objects = self.get_by_index(index_name, *key)
+        return objects[0] if len(objects) > 0 else None
+
+
+def rebuild_indexed_dict(indexed_attributes: dict, items: list) -> IndexedDict:
+    indexed_dict = IndexedDict(**indexed_attributes)
+    for (name, indexed_object) in items:
+        indexed_dict[name] = indexed_object
+    return indexed_dict
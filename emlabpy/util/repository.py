@@ -5,13 +5,16 @@ All objects are read through the SpineDBReader and stored in the Repository.
 Jim Hommes - 25-3-2021
 """
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
 
 from domain.actors import *
 from domain.energy import *
 from domain.markets import *
 from domain.trends import *
 from domain.zones import *
+from util.indexed_dict import IndexedDict
 
 
 class Repository:
@@ -25,21 +28,29 @@ class Repository:
         Initialize all Repository variables
         """
         self.dbrw = None
+        # The latest commit (id, date) of the SpineDB when this Repository was read
+        self.db_commit = None
 
         self.current_tick = 0
         self.time_step = 0
         self.start_simulation_year = 0
+        self.end_simulation_year = 0
 
         self.energy_producers = dict()
-        self.power_plants = dict()
+        self.power_plants = PowerPlantFleet()
         self.substances = dict()
         self.power_plants_fuel_mix = dict()
+        self.fleet_cost_calculator = FleetCostCalculator(self.power_plants, self.power_plants_fuel_mix)
         self.electricity_spot_markets = dict()
         self.capacity_markets = dict()
         self.co2_markets = dict()
-        self.power_plant_dispatch_plans = dict()
+        self.power_plant_dispatch_plans = IndexedDict(tick=('tick',),
+                                                      plant=('plant',),
+                                                      plant_tick=('plant', 'tick'),
+                                                      market_tick=('bidding_market', 'tick'),
+                                                      plant_market_tick=('plant', 'bidding_market', 'tick'))
         self.power_generating_technologies = dict()
-        self.market_clearing_points = dict()
+        self.market_clearing_points = IndexedDict(market_tick=('market', 'tick'))
         self.power_grid_nodes = dict()
         self.trends = dict()
         self.zones = dict()
@@ -65,14 +76,44 @@ class Repository:
     """
 
     # PowerPlants
+    def get_operational_power_plants(self) -> List[PowerPlant]:
+        return self.power_plants.select(self.power_plants.get_column('status') == self.power_plants.get_object_index(
+            'status', self.power_plant_status_operational))
+
     def get_operational_power_plants_by_owner(self, owner: EnergyProducer) -> List[PowerPlant]:
-        return [i for i in self.power_plants.values()
-                if i.owner == owner and i.status == self.power_plant_status_operational]
+        return self.power_plants.select(
+            (self.power_plants.get_column('owner') == self.power_plants.get_object_index('owner', owner)) &
+            (self.power_plants.get_column('status') == self.power_plants.get_object_index(
+                'status', self.power_plant_status_operational)))
+
+    def update_power_plant_ages(self):
+        """
+        Derive the ages of the PowerPlants from their on-stream year and the current tick. To be called whenever the
+        current tick changes, as the age is only set when the on-stream year is read.
+        """
+        self.power_plants.update_ages(self.current_tick + self.start_simulation_year)
+
+    def get_marginal_costs_excl_co2_market_cost_by_tick(self, time: int, power_plants: List[PowerPlant]) \
+            -> Dict[PowerPlant, float]:
+        """
+        :param power_plants: The PowerPlants to calculate the marginal cost of, e.g. the operational ones
+        :return: The marginal cost excluding CO2 market cost by PowerPlant
+        """
+        rows = np.array([power_plant.index for power_plant in power_plants], dtype=np.int64)
+        return dict(zip(power_plants,
+                        self.fleet_cost_calculator.get_marginal_costs_excl_co2_market_cost(time, rows).tolist()))
+
+    def get_emission_intensities(self, power_plants: List[PowerPlant]) -> Dict[PowerPlant, float]:
+        """
+        :param power_plants: The PowerPlants to calculate the emission intensity of, e.g. the operational ones
+        :return: The emission intensity by PowerPlant
+        """
+        rows = np.array([power_plant.index for power_plant in power_plants], dtype=np.int64)
+        return dict(zip(power_plants, self.fleet_cost_calculator.get_emission_intensities(rows).tolist()))
 
     def get_available_power_plant_capacity_at_tick(self, plant: PowerPlant, current_tick: int) -> float:
         ppdps_sum_accepted_amount = sum([float(i.accepted_amount) for i in
-                                         self.get_power_plant_dispatch_plans_by_plant(plant)
-                                         if i.tick == current_tick])
+                                         self.get_power_plant_dispatch_plans_by_plant_and_tick(plant, current_tick)])
         return plant.capacity - ppdps_sum_accepted_amount
 
     def get_power_plant_electricity_spot_market_revenues_by_tick(self, power_plant: PowerPlant, time: int) -> float:
@@ -82,8 +123,8 @@ class Repository:
                     for i in self.get_power_plant_dispatch_plans_by_plant_and_tick(power_plant, time)])
 
     def get_total_accepted_amounts_by_power_plant_and_tick_and_market(self, power_plant: PowerPlant, time: int, market: Market) -> float:
-        return sum([i.accepted_amount for i in self.power_plant_dispatch_plans.values() if i.tick == time and
-                    i.plant == power_plant and i.bidding_market == market])
+        return sum([i.accepted_amount for i in self.power_plant_dispatch_plans.get_by_index('plant_market_tick',
+                                                                                            power_plant, market, time)])
 
     def get_power_plant_costs_by_tick_and_market(self, power_plant: PowerPlant, time: int, market: Market) -> float:
         # MC is Euro / MW
@@ -94,13 +135,31 @@ class Repository:
         total_capacity = self.get_total_accepted_amounts_by_power_plant_and_tick_and_market(power_plant, time, market)
         return foc + mc * total_capacity
 
+    def get_accepted_amounts_and_revenues_per_power_plant_by_tick(self, time: int, market: Market) -> \
+            Tuple[Dict[PowerPlant, float], Dict[PowerPlant, float]]:
+        """
+        Aggregate the dispatch plans of a tick per power plant in one pass.
+
+        :param time: The tick
+        :param market: The market of which the accepted amounts are summed
+        :return: The accepted amounts in the market and the revenues in all markets, both by PowerPlant
+        """
+        accepted_amounts = {}
+        revenues = {}
+        for ppdp in self.power_plant_dispatch_plans.get_by_index('tick', time):
+            revenues[ppdp.plant] = revenues.get(ppdp.plant, 0) + float(ppdp.accepted_amount * ppdp.price)
+            if ppdp.bidding_market == market:
+                accepted_amounts[ppdp.plant] = accepted_amounts.get(ppdp.plant, 0) + ppdp.accepted_amount
+        return accepted_amounts, revenues
+
     def get_power_plant_operational_profits_by_tick_and_market(self, time: int, market: Market) -> Dict[str, float]:
+        accepted_amounts, revenues = self.get_accepted_amounts_and_revenues_per_power_plant_by_tick(time, market)
+        power_plants = self.get_operational_power_plants()
+        marginal_costs = self.get_marginal_costs_excl_co2_market_cost_by_tick(time, power_plants)
         res = {}
-        for power_plant in [i for i in self.power_plants.values() if i.status == self.power_plant_status_operational]:
-            revenues = self.get_power_plant_electricity_spot_market_revenues_by_tick(power_plant, time)
-            mc = power_plant.calculate_marginal_cost_excl_co2_market_cost(self, time)
-            total_capacity = self.get_total_accepted_amounts_by_power_plant_and_tick_and_market(power_plant, time, market)
-            res[power_plant.name] = revenues - mc * total_capacity
+        for power_plant in power_plants:
+            mc = marginal_costs[power_plant]
+            res[power_plant.name] = revenues.get(power_plant, 0) - mc * accepted_amounts.get(power_plant, 0)
         return res
 
     def get_power_plant_emissions_by_tick(self, time: int) -> Dict[str, float]:
@@ -108,36 +167,39 @@ class Repository:
             res = self.emissions['YearlyEmissions'].emissions[time]
         else:
             res = {}
-        for power_plant in [i for i in self.power_plants.values() if i.status == self.power_plant_status_operational and i.name not in res.keys()]:
-            # Total Capacity is in MWh
-            total_capacity = self.get_total_accepted_amounts_by_power_plant_and_tick_and_market(power_plant, time,
-                                                                                                self.electricity_spot_markets['DutchElectricitySpotMarket'])
-            # Emission intensity is in ton CO2 / MWh
-            emission_intensity = power_plant.calculate_emission_intensity(self)
-            res[power_plant.name] = total_capacity * emission_intensity
+        power_plants = [i for i in self.get_operational_power_plants() if i.name not in res.keys()]
+        if len(power_plants) == 0:
+            return res
+        # Total Capacity is in MWh
+        accepted_amounts, _ = self.get_accepted_amounts_and_revenues_per_power_plant_by_tick(
+            time, self.electricity_spot_markets['DutchElectricitySpotMarket'])
+        # Emission intensity is in ton CO2 / MWh
+        emission_intensities = self.get_emission_intensities(power_plants)
+        for power_plant in power_plants:
+            emission_intensity = emission_intensities[power_plant]
+            res[power_plant.name] = accepted_amounts.get(power_plant, 0) * emission_intensity
         return res
 
     # PowerPlantDispatchPlans
     def get_power_plant_dispatch_plan_price_by_plant_and_time_and_market(self, plant: PowerPlant, time: int,
                                                                          market: Market) -> float:
-        try:
-            return next(i.price for i in self.power_plant_dispatch_plans.values() if i.plant == plant and i.tick == time
-                        and i.bidding_market == market)
-        except StopIteration:
+        ppdp = self.power_plant_dispatch_plans.get_first_by_index('plant_market_tick', plant, market, time)
+        if ppdp is None:
             logging.warning('No PPDP Price found for plant ' + plant.name + ' and at time ' + str(time))
             return 0
+        return ppdp.price
 
     def get_sorted_power_plant_dispatch_plans_by_market_and_time(self, market: Market, time: int) -> \
             List[PowerPlantDispatchPlan]:
-        return sorted([i for i in self.power_plant_dispatch_plans.values()
-                       if i.bidding_market == market and i.tick == time], key=lambda i: i.price)
+        return sorted(self.power_plant_dispatch_plans.get_by_index('market_tick', market, time),
+                      key=lambda i: i.price)
 
     def get_power_plant_dispatch_plans_by_plant(self, plant: PowerPlant) -> List[PowerPlantDispatchPlan]:
-        return [i for i in self.power_plant_dispatch_plans.values() if i.plant == plant]
+        return self.power_plant_dispatch_plans.get_by_index('plant', plant)
 
     def get_power_plant_dispatch_plans_by_plant_and_tick(self, plant: PowerPlant, time: int) -> \
             List[PowerPlantDispatchPlan]:
-        return [i for i in self.power_plant_dispatch_plans.values() if i.plant == plant and i.tick == time]
+        return self.power_plant_dispatch_plans.get_by_index('plant_tick', plant, time)
 
     def set_power_plant_dispatch_plan_production(self,
                                                  ppdp: PowerPlantDispatchPlan,
@@ -152,9 +214,7 @@ class Repository:
                                                    amount: float,
                                                    price: float,
                                                    time: int) -> PowerPlantDispatchPlan:
-        ppdp = next((ppdp for ppdp in self.power_plant_dispatch_plans.values() if ppdp.plant == plant and
-                     ppdp.bidding_market == bidding_market and
-                     ppdp.tick == time), None)
+        ppdp = self.power_plant_dispatch_plans.get_first_by_index('plant_market_tick', plant, bidding_market, time)
         if ppdp is None:
             # PowerPlantDispatchPlan not found, so create a new one
             name = 'PowerPlantDispatchPlan ' + str(datetime.now())
@@ -189,8 +249,11 @@ class Repository:
             return None
 
     def get_allowances_in_circulation(self, zone: Zone, time: int) -> int:
-        return sum([i.banked_allowances[time] for i in self.power_plants.values()
-                    if i.location.parameters['Country'] == zone.name])
+        in_zone = np.array([location is not None and location.parameters['Country'] == zone.name
+                            for location in self.power_plants.object_values['location']], dtype=bool)
+        power_plants = self.power_plants.select(in_zone[self.power_plants.get_column('location')])
+        allowances = self.power_plants.banked_allowances[[i.index for i in power_plants], time]
+        return sum(allowances.tolist())
 
     def get_co2_market_for_zone(self, zone: Zone) -> Optional[CO2Market]:
         try:
@@ -218,10 +281,7 @@ class Repository:
 
     # MarketClearingPoints
     def get_market_clearing_point_for_market_and_time(self, market: Market, time: int) -> Optional[MarketClearingPoint]:
-        try:
-            return next(i for i in self.market_clearing_points.values() if i.market == market and i.tick == time)
-        except StopIteration:
-            return None
+        return self.market_clearing_points.get_first_by_index('market_tick', market, time)
 
     def get_market_clearing_point_price_for_market_and_time(self, market: Market, time: int) -> float:
         if time >= 0:
@@ -235,8 +295,7 @@ class Repository:
                                                price: float,
                                                capacity: float,
                                                time: int) -> MarketClearingPoint:
-        mcp = next((mcp for mcp in self.market_clearing_points.values() if mcp.market == market and mcp.tick == time),
-                   None)
+        mcp = self.market_clearing_points.get_first_by_index('market_tick', market, time)
         if mcp is None:
             # MarketClearingPoint not found, so create a new one
             name = 'MarketClearingPoint ' + str(datetime.now())
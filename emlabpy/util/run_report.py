@@ -0,0 +1,54 @@
+"""
+The RunReport records the wall time, CPU time, time spent in SpineDB calls and amount of staged rows of every module
+per tick. It is written as JSON and CSV next to the log file, so that every run can be profiled afterwards.
+"""
+import csv
+import json
+import time
+from contextlib import contextmanager
+
+
+class RunReport:
+    """
+    List of records, one per measured step (a module at a tick, or reading the Repository).
+    """
+    fields = ['tick', 'module', 'wall_time', 'cpu_time', 'db_time', 'commit_time', 'staged_rows']
+
+    def __init__(self):
+        self.records = []
+
+    @contextmanager
+    def measure(self, name: str, tick: int, dbrw):
+        """
+        Measure the code in the with-block and add it as record. The yielded record can be extended in the block.
+
+        :param name: Name of the module or step
+        :param tick: The current tick
+        :param dbrw: The SpineDBReaderWriter, of which the SpineDB time and staged rows are counted
+        """
+        record = {'tick': tick, 'module': name, 'commit_time': 0.0}
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        start_db_time = dbrw.db_time
+        start_staged_rows = dbrw.staged_rows
+        try:
+            yield record
+        finally:
+            record['wall_time'] = time.perf_counter() - start_wall_time
+            record['cpu_time'] = time.process_time() - start_cpu_time
+            record['db_time'] = dbrw.db_time - start_db_time
+            record['staged_rows'] = dbrw.staged_rows - start_staged_rows
+            self.records.append({field: record[field] for field in self.fields})
+
+    def write(self, path: str):
+        """
+        Write the records to path.json and path.csv
+
+        :param path: Path of the report files, without extension
+        """
+        with open(path + '.json', 'w') as json_file:
+            json.dump(self.records, json_file, indent=2)
+        with open(path + '.csv', 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=self.fields)
+            writer.writeheader()
+            writer.writerows(self.records)
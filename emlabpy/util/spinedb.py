@@ -6,6 +6,7 @@ File provided through Spine Demo by VTT, with additions made by Jim Hommes.
 """
 import logging
 
+from sqlalchemy import Integer, cast, or_, select
 from sqlalchemy.exc import ArgumentError as SQLAlchemyArgumentError
 from spinedb_api import DatabaseMapping, DiffDatabaseMapping
 from spinedb_api.exception import (
@@ -27,19 +28,48 @@ def _handle_errors(errors: list):
         logging.warning(e)
 
 
+class LazyParameterValue:
+    """
+    Parameter value that is only parsed (from_database) when it is first used. Until then only the database
+    representation is kept in memory. Attribute access is forwarded to the parsed value, so that e.g. a lazy Map
+    can be used as a Map.
+    """
+    __slots__ = ('db_value', 'value_type', 'parsed_value')
+
+    def __init__(self, db_value, value_type):
+        self.db_value = db_value
+        self.value_type = value_type
+        self.parsed_value = None
+
+    def get(self):
+        if self.db_value is not None:
+            self.parsed_value = from_database(self.db_value, self.value_type)
+            self.db_value = None
+        return self.parsed_value
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+
 class SpineDB(object):
     """
     Class for working with a Spine database, especially when adding data
     """
 
-    def __init__(self, url: str, mode='r', create=False):
+    def __init__(self, url: str, mode='r', create=False, db_map=None):
         """
         Open Spine database at url for modifying
 
         Raises:
             RuntimeError: Could not open database
+        :param db_map: An open DatabaseMapping of the database at url. If given, it is used instead of opening
+        the database again, so that one connection can be shared
         """
-        if mode == 'r' and not create:
+        if db_map is not None:
+            self._db_map = db_map
+        elif mode == 'r' and not create:
             self._open_db_reading(url)
         elif mode == 'w' and not create:
             self._open_db_writing(url)
@@ -259,6 +289,103 @@ class SpineDB(object):
             _handle_errors([e])
             logging.warning(e)
 
+    def export_data_by_object_classes(self, object_class_names, max_alternative=None, lazy_value_types=('map',)) \
+            -> dict:
+        """
+        Export the objects, object parameters and object parameter values of only the given object classes.
+        The result has the same structure as export_data, but no relationships, alternatives etc.
+
+        :param object_class_names: List of object class names
+        :param max_alternative: If set, only values of which the alternative (a number) is not larger are exported
+        :param lazy_value_types: Values of these types are exported as LazyParameterValue
+        :return: Dict with objects, object_parameters and object_parameter_values
+        """
+        object_subquery = self._db_map.ext_object_sq
+        objects = sorted((row.class_name, row.name, row.description) for row
+                         in self._db_map.query(object_subquery)
+                         .filter(object_subquery.c.class_name.in_(object_class_names)))
+
+        # The default values are not parsed: they are not used when loading
+        definition_subquery = self._db_map.object_parameter_definition_sq
+        object_parameters = sorted((row.object_class_name, row.parameter_name, None, row.value_list_name,
+                                    row.description) for row
+                                   in self._db_map.query(definition_subquery)
+                                   .filter(definition_subquery.c.object_class_name.in_(object_class_names)))
+
+        (query, _, class_table, alternative_table) = self._query_object_parameter_values()
+        query = query.filter(class_table.c.name.in_(object_class_names))
+        if max_alternative is not None:
+            query = query.filter(cast(alternative_table.c.name, Integer) <= max_alternative)
+        object_parameter_values = [(row.object_class_name, row.object_name, row.parameter_name,
+                                    LazyParameterValue(row.value, row.type) if row.type in lazy_value_types
+                                    else from_database(row.value, row.type),
+                                    row.alternative_name) for row in query]
+
+        return {'objects': objects,
+                'object_parameters': object_parameters,
+                'object_parameter_values': object_parameter_values}
+
+    def export_object_parameter_values_changed_since(self, object_class_names, commit_id: int, max_alternative: int,
+                                                     min_alternative: int = None, lazy_value_types=('map',)) -> list:
+        """
+        Export the object parameter values that changed since an earlier export: the values that were committed after
+        the given commit, and the values of the alternatives after min_alternative (that were not exported before).
+        Of every (object, parameter) with such a value all values up to max_alternative are exported, so that the
+        value of the latest alternative can be selected in the same way as from a full export.
+
+        :param object_class_names: List of object class names
+        :param commit_id: The latest commit at the time of the earlier export
+        :param max_alternative: Only values of which the alternative (a number) is not larger are exported
+        :param min_alternative: The max_alternative of the earlier export
+        :param lazy_value_types: Values of these types are exported as LazyParameterValue
+        :return: List of object parameter values in the same structure as from export_data
+        """
+        (query, value_table, class_table, alternative_table) = self._query_object_parameter_values()
+        query = query.filter(class_table.c.name.in_(object_class_names))
+        alternative = cast(alternative_table.c.name, Integer)
+        changed = value_table.c.commit_id > commit_id
+        if min_alternative is not None:
+            changed = or_(changed, alternative > min_alternative)
+        changed_keys = {(row.entity_id, row.parameter_name) for row
+                        in query.filter(alternative <= max_alternative).filter(changed)}
+
+        # Query per chunk of objects, to stay below the maximum amount of SQL variables
+        object_ids = sorted({object_id for (object_id, _) in changed_keys})
+        object_parameter_values = []
+        for chunk_start in range(0, len(object_ids), 500):
+            chunk_query = query.filter(value_table.c.entity_id.in_(object_ids[chunk_start:chunk_start + 500])) \
+                .filter(alternative <= max_alternative)
+            object_parameter_values += [(row.object_class_name, row.object_name, row.parameter_name,
+                                         LazyParameterValue(row.value, row.type) if row.type in lazy_value_types
+                                         else from_database(row.value, row.type),
+                                         row.alternative_name) for row in chunk_query
+                                        if (row.entity_id, row.parameter_name) in changed_keys]
+        return object_parameter_values
+
+    def _query_object_parameter_values(self):
+        """
+        Query on the object parameter values that joins the tables directly. Filtering the object_parameter_value_sq
+        subquery on object class is slow in SQLite.
+
+        :return: The query, and the parameter value, entity class and alternative (sub)tables to filter on
+        """
+        value_table = self._db_map._subquery('parameter_value')
+        class_table = self._db_map._subquery('entity_class')
+        entity_table = self._db_map._subquery('entity')
+        definition_table = self._db_map._subquery('parameter_definition')
+        alternative_table = self._db_map._subquery('alternative')
+        query = self._db_map.query(class_table.c.name.label('object_class_name'),
+                                   entity_table.c.name.label('object_name'),
+                                   definition_table.c.name.label('parameter_name'),
+                                   value_table.c.value, value_table.c.type,
+                                   alternative_table.c.name.label('alternative_name'),
+                                   value_table.c.entity_id) \
+            .filter(value_table.c.entity_class_id == class_table.c.id) \
+            .filter(value_table.c.entity_id == entity_table.c.id) \
+            .filter(value_table.c.parameter_definition_id == definition_table.c.id) \
+            .filter(value_table.c.alternative_id == alternative_table.c.id)
+        return query, value_table, class_table, alternative_table
+
     def commit(self, message):
         """
         Commit current changes
@@ -272,6 +399,19 @@ class SpineDB(object):
     Additions from this point made by Jim Hommes.
     """
 
+    def get_latest_commit(self) -> tuple:
+        """
+        Get the id and date of the latest commit. Every change to the DB is a new commit, so this identifies the
+        state of the DB. A separate connection is used, as the session itself may hold a commit that is not committed.
+
+        :return: Tuple of commit id and date, or None if there are no commits
+        """
+        commit_table = self._db_map._metadata.tables['commit']
+        with self._db_map.engine.connect() as connection:
+            row = connection.execute(select([commit_table.c.id, commit_table.c.date])
+                                     .order_by(commit_table.c.id.desc()).limit(1)).first()
+        return None if row is None else (row.id, str(row.date))
+
     def close_connection(self):
         """
         Close the connection to the SpineDB. Necessary use through Spine as when an exception is thrown, Spine does not
@@ -4,9 +4,14 @@ This is a separate file so that all import definitions are centralized.
 
 Jim Hommes - 25-3-2021
 """
+import hashlib
 import logging
+import os
+import pickle
+import time
 
 from util.repository import *
+from util.run_report import RunReport
 from util.spinedb import SpineDB
 
 
@@ -15,65 +20,236 @@ class SpineDBReaderWriter:
     The class that handles all writing and reading to the SpineDB.
     """
 
-    def __init__(self, db_url: str, config_url: str):
+    def __init__(self, db_url: str, config_url: str, snapshot_dir: str = None, db: SpineDB = None,
+                 config_db: SpineDB = None, timers: list = ()):
+        """
+        :param db_url: URL of the EMLab SpineDB
+        :param config_url: URL of the simulation configuration SpineDB
+        :param snapshot_dir: If set, the Repository is saved to a snapshot in this folder after reading it, and read
+        from that snapshot as long as the DB, the current tick and the configuration have not changed
+        :param db: The EMLab SpineDB when it is already open, otherwise it is opened from db_url
+        :param config_db: The simulation configuration SpineDB when it is already open, otherwise it is opened from
+        config_url
+        :param timers: Other objects with a db_time to which the time spent in SpineDB calls is added as well
+        """
         self.db_url = db_url
-        self.config_db = SpineDB(config_url)
-        self.db = SpineDB(db_url)
+        self.snapshot_dir = snapshot_dir
+        # The time spent in SpineDB calls and the amount of staged rows are counted for the RunReport
+        self.db_time = 0.0
+        self.staged_rows = 0
+        self.run_report = RunReport()
+        self.config_db = SpineDBCallTimer(config_db if config_db is not None else SpineDB(config_url),
+                                          [self] + list(timers))
+        self.db = SpineDBCallTimer(db if db is not None else SpineDB(db_url), [self] + list(timers))
         self.powerplant_dispatch_plan_classname = 'PowerPlantDispatchPlans'
         self.market_clearing_point_object_classname = 'MarketClearingPoints'
 
-    def read_db_and_create_repository(self) -> Repository:
+        # Write buffer: everything that is staged is imported in one batch when flushing (on commit).
+        # The dicts are used as ordered sets, for the parameter values the latest staged value is kept.
+        self.staged_alternatives = dict()
+        self.staged_object_classes = dict()
+        self.staged_object_parameters = dict()
+        self.staged_objects = dict()
+        self.staged_object_parameter_values = dict()
+
+    def read_db_and_create_repository(self, class_filtered: bool = False) -> Repository:
+        """
+        Read the SpineDB and create the Repository.
+
+        :param class_filtered: If True, only the object classes that are in the Repository are read and only the values
+        up to the current tick. Map values are parsed when first used. This takes much less memory than exporting
+        the complete DB.
+        :return: Repository
+        """
         logging.info('SpineDBRW: Start Read Repository')
-        reps = Repository()
-        reps.dbrw = self
-        db_data = self.db.export_data()
+        coupling_parameters = {row['object_name']: row['parameter_value'] for row
+                               in self.config_db.query_object_parameter_values_by_object_class('Coupling Parameters')}
+        # Load the parameter priorities from the config db
+        parameter_priorities = {i['parameter_name']: i['parameter_value'] for i
+                                in self.config_db.query_object_parameter_values_by_object_class('EMLAB Parameters')}
+
+        # The latest commit is determined before reading, so that later commits are certainly read when refreshing
+        latest_commit = self.db.get_latest_commit()
+        if class_filtered or self.snapshot_dir is not None:
+            db_data = self.db.export_data_by_object_classes(['SystemClockTicks'])
+        else:
+            db_data = self.db.export_data()
 
         # Determine current tick
-        reps.current_tick = max(
+        current_tick = max(
             [int(i[3]) for i in db_data['object_parameter_values'] if i[0] == i[1] == 'SystemClockTicks' and
              i[2] == 'ticks'])
-        logging.info('Current tick: ' + str(reps.current_tick))
-        self.stage_init_alternative(reps.current_tick)
-
-        # Load Coupling Parameters and set in repository
-        for row in self.config_db.query_object_parameter_values_by_object_class('Coupling Parameters'):
-            if row['object_name'] == 'Start Year':
-                reps.start_simulation_year = int(row['parameter_value'])
-            elif row['object_name'] == 'Time Step':
-                reps.time_step = int(row['parameter_value'])
-
-        # Load the parameter priorities from the config db
-        parameter_priorities = {i['parameter_name']: i['parameter_value'] for i
-                                in self.config_db.query_object_parameter_values_by_object_class('EMLAB Parameters')}
+        logging.info('Current tick: ' + str(current_tick))
+        self.stage_init_alternative(current_tick)
+
+        snapshot_key = None
+        if self.snapshot_dir is not None:
+            snapshot_key = self.get_snapshot_key(latest_commit, current_tick, class_filtered, coupling_parameters,
+                                                 parameter_priorities)
+            reps = self.read_repository_snapshot(snapshot_key)
+            if reps is not None:
+                logging.info('SpineDBRW: End Read Repository (from snapshot)')
+                return reps
+            if not class_filtered:
+                db_data = self.db.export_data()
 
-        # Sort the object_parameter_values and object_parameters
-        # so that the most recent (highest tick) and highest priority is first selected.
-        sorted_object_parameter_values = sorted(db_data['object_parameter_values'], reverse=True,
-                                                key=lambda item: int(item[4]))
-        sorted_parameter_names = sorted(db_data['object_parameters'],
-                                        key=lambda item: parameter_priorities[item[0]]
-                                        if item[0] in parameter_priorities.keys() else 0, reverse=True)
+        reps = Repository()
+        reps.dbrw = self
+        reps.db_commit = latest_commit
+        reps.current_tick = current_tick
+
+        lifetime_object_class_name = 'PowerGeneratingTechnologyLifetime'
+        if class_filtered:
+            db_data = self.db.export_data_by_object_classes(
+                list(repository_object_classes.keys()) + [lifetime_object_class_name], reps.current_tick)
+
+        # Set Coupling Parameters in repository
+        if 'Start Year' in coupling_parameters.keys():
+            reps.start_simulation_year = int(coupling_parameters['Start Year'])
+        if 'Time Step' in coupling_parameters.keys():
+            reps.time_step = int(coupling_parameters['Time Step'])
+        if 'End Year' in coupling_parameters.keys():
+            reps.end_simulation_year = int(coupling_parameters['End Year'])
 
         # Import all object parameter values in one go
-        for (object_class_name, parameter_name, _, _, _) in sorted_parameter_names:
-            for (_, object_name, _) in [i for i in db_data['objects'] if i[0] == object_class_name]:
-                try:
-                    db_line = next(i for i in sorted_object_parameter_values
-                                   if i[0] == object_class_name and i[1] == object_name and i[2] == parameter_name and
-                                   int(i[4]) <= reps.current_tick)
-                    add_parameter_value_to_repository_based_on_object_class_name(reps, db_line)
-                except StopIteration:
-                    logging.warning('No value found for class: ' + object_class_name +
-                                    ', object: ' + object_name +
-                                    ', parameter: ' + parameter_name)
+        add_object_parameter_values_to_repository(reps, db_data, parameter_priorities)
 
         # Because of COMPETES structure, this is hard to set normally. So separate function:
-        set_expected_lifetimes_of_power_generating_technologies(reps, db_data, 'PowerGeneratingTechnologyLifetime')
+        set_expected_lifetimes_of_power_generating_technologies(reps, db_data, lifetime_object_class_name)
+
+        reps.power_plants.trim()
+
+        # Precompute the trends over the simulation horizon, so that looking up a value is an array lookup
+        if reps.end_simulation_year >= reps.start_simulation_year:
+            for trend in reps.trends.values():
+                trend.precompute(reps.end_simulation_year - reps.start_simulation_year + 1)
+
+        if snapshot_key is not None:
+            self.write_repository_snapshot(snapshot_key, reps)
 
         logging.info('SpineDBRW: End Read Repository')
         # logging.info('Repository: ' + str(reps))
         return reps
 
+    def refresh_repository(self, reps: Repository, class_filtered: bool = False) -> Repository:
+        """
+        Bring a Repository that was read before up to date with the SpineDB. Only the parameter values that were
+        committed since it was read and the values of the ticks since are read and applied, instead of the complete DB.
+        Objects and values that were removed from the DB are not removed from the Repository.
+
+        :param reps: Repository as read by read_db_and_create_repository (or refreshed before)
+        :param class_filtered: As in read_db_and_create_repository, used when the Repository has to be read fully
+        :return: The refreshed Repository
+        """
+        if reps.db_commit is None:
+            return self.read_db_and_create_repository(class_filtered)
+        logging.info('SpineDBRW: Start Refresh Repository')
+        coupling_parameters = {row['object_name']: row['parameter_value'] for row
+                               in self.config_db.query_object_parameter_values_by_object_class('Coupling Parameters')}
+        parameter_priorities = {i['parameter_name']: i['parameter_value'] for i
+                                in self.config_db.query_object_parameter_values_by_object_class('EMLAB Parameters')}
+
+        latest_commit = self.db.get_latest_commit()
+        previous_tick = reps.current_tick
+        reps.current_tick = max(
+            [int(i[3]) for i in self.db.export_data_by_object_classes(['SystemClockTicks'])['object_parameter_values']
+             if i[0] == i[1] == 'SystemClockTicks' and i[2] == 'ticks'])
+        logging.info('Current tick: ' + str(reps.current_tick))
+        self.stage_init_alternative(reps.current_tick)
+        reps.dbrw = self
+
+        if 'Start Year' in coupling_parameters.keys():
+            reps.start_simulation_year = int(coupling_parameters['Start Year'])
+        if 'Time Step' in coupling_parameters.keys():
+            reps.time_step = int(coupling_parameters['Time Step'])
+        if 'End Year' in coupling_parameters.keys():
+            reps.end_simulation_year = int(coupling_parameters['End Year'])
+
+        lifetime_object_class_name = 'PowerGeneratingTechnologyLifetime'
+        object_parameter_values = self.db.export_object_parameter_values_changed_since(
+            list(repository_object_classes.keys()) + [lifetime_object_class_name], reps.db_commit[0],
+            reps.current_tick, previous_tick)
+        reps.db_commit = latest_commit
+        logging.info('SpineDBRW: ' + str(len(object_parameter_values)) + ' changed parameter values')
+
+        # Apply the changed values in the same order of priority as when reading the Repository
+        indexed_values = index_object_parameter_values(object_parameter_values, reps.current_tick)
+        for db_line in sorted(indexed_values.values(),
+                              key=lambda item: parameter_priorities[item[0]]
+                              if item[0] in parameter_priorities.keys() else 0, reverse=True):
+            add_parameter_value_to_repository_based_on_object_class_name(reps, db_line)
+        set_expected_lifetimes_of_power_generating_technologies(
+            reps, {'object_parameter_values': object_parameter_values}, lifetime_object_class_name)
+
+        reps.power_plants.trim()
+        reps.update_power_plant_ages()
+
+        if reps.end_simulation_year >= reps.start_simulation_year:
+            for trend in reps.trends.values():
+                trend.precompute(reps.end_simulation_year - reps.start_simulation_year + 1)
+
+        logging.info('SpineDBRW: End Refresh Repository')
+        return reps
+
+    """
+    Repository snapshots
+    """
+
+    def get_snapshot_key(self, latest_commit: tuple, current_tick: int, class_filtered: bool,
+                         coupling_parameters: dict, parameter_priorities: dict) -> tuple:
+        """
+        The key of a snapshot identifies everything the Repository is read from: the state of the DB (its latest
+        commit), the current tick, the way of loading and the configuration.
+        """
+        config_hash = hashlib.sha1(repr((sorted(coupling_parameters.items()), sorted(parameter_priorities.items())))
+                                   .encode()).hexdigest()
+        return repository_snapshot_version, self.db_url, latest_commit, current_tick, class_filtered, config_hash
+
+    def get_snapshot_path(self) -> str:
+        return os.path.join(self.snapshot_dir,
+                            'repository-' + hashlib.sha1(self.db_url.encode()).hexdigest()[:16] + '.pickle')
+
+    def read_repository_snapshot(self, snapshot_key: tuple) -> Optional[Repository]:
+        """
+        Read the Repository from the snapshot, if the snapshot has the given key.
+
+        :param snapshot_key: The key as from get_snapshot_key
+        :return: The Repository, or None if there is no snapshot with this key
+        """
+        path = self.get_snapshot_path()
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'rb') as snapshot_file:
+                # The key is pickled separately, so the Repository is only unpickled if the key matches
+                if pickle.load(snapshot_file) != snapshot_key:
+                    logging.info('SpineDBRW: Repository snapshot is outdated')
+                    return None
+                reps = pickle.load(snapshot_file)
+        except Exception as e:
+            logging.warning('SpineDBRW: Could not read Repository snapshot ' + path + ': ' + str(e))
+            return None
+        reps.dbrw = self
+        return reps
+
+    def write_repository_snapshot(self, snapshot_key: tuple, reps: Repository):
+        """
+        Write the Repository to the snapshot. The snapshot is written to a temporary file first, so that a snapshot is
+        never read half-written.
+        """
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = self.get_snapshot_path()
+        reps.dbrw = None
+        try:
+            with open(path + '.tmp', 'wb') as snapshot_file:
+                pickle.dump(snapshot_key, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(reps, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            logging.warning('SpineDBRW: Could not write Repository snapshot ' + path + ': ' + str(e))
+        finally:
+            reps.dbrw = self
+
     """
     Staging functions that are the core for communicating with SpineDB
     """
@@ -82,10 +258,13 @@ class SpineDBReaderWriter:
         self.stage_object_classes([object_class_name])
 
     def stage_object_classes(self, arr: list):
-        self.db.import_object_classes(arr)
+        self.staged_rows += len(arr)
+        for object_class in arr:
+            self.staged_object_classes[object_class] = None
 
     def stage_object_parameter(self, object_class: str, object_parameter: str):
-        self.db.import_data({'object_parameters': [[object_class, object_parameter]]})
+        self.staged_rows += 1
+        self.staged_object_parameters[(object_class, object_parameter)] = None
 
     def stage_object_parameters(self, object_class: str, object_parameter_arr: list):
         for object_parameter in object_parameter_arr:
@@ -95,14 +274,41 @@ class SpineDBReaderWriter:
         self.stage_objects([(object_class, object_name)])
 
     def stage_objects(self, arr_of_tuples: list):
-        self.db.import_objects(arr_of_tuples)
+        self.staged_rows += len(arr_of_tuples)
+        for (object_class, object_name) in arr_of_tuples:
+            self.staged_objects[(object_class, object_name)] = None
 
     def stage_object_parameter_values(self,
                                       object_class_name: str, object_name: str, arr_of_tuples: list, current_tick: int):
-        import_arr = [(object_class_name, object_name, i[0], i[1], str(current_tick)) for i in arr_of_tuples]
-        self.db.import_object_parameter_values(import_arr)
+        self.staged_rows += len(arr_of_tuples)
+        for (parameter_name, parameter_value) in arr_of_tuples:
+            self.staged_object_parameter_values[(object_class_name, object_name, parameter_name, str(current_tick))] = \
+                parameter_value
+
+    def flush(self):
+        """
+        Import everything that has been staged since the last flush into the SpineDB, in one batch.
+        """
+        data = {'alternatives': list(self.staged_alternatives.keys()),
+                'object_classes': list(self.staged_object_classes.keys()),
+                'object_parameters': list(self.staged_object_parameters.keys()),
+                'objects': list(self.staged_objects.keys()),
+                'object_parameter_values': [(object_class_name, object_name, parameter_name, parameter_value,
+                                             alternative) for ((object_class_name, object_name, parameter_name,
+                                                                alternative), parameter_value)
+                                            in self.staged_object_parameter_values.items()]}
+        data = {entity_type: entities for (entity_type, entities) in data.items() if len(entities) > 0}
+        if len(data) > 0:
+            logging.info('SpineDBRW: Flush ' + str(sum(len(i) for i in data.values())) + ' staged items')
+            self.db.import_data(data)
+        self.staged_alternatives = dict()
+        self.staged_object_classes = dict()
+        self.staged_object_parameters = dict()
+        self.staged_objects = dict()
+        self.staged_object_parameter_values = dict()
 
     def commit(self, commit_message: str):
+        self.flush()
         self.db.commit(commit_message)
 
     """
@@ -120,7 +326,16 @@ class SpineDBReaderWriter:
                                       'Status'])
 
     def stage_init_alternative(self, current_tick: int):
-        self.db.import_alternatives([str(current_tick)])
+        self.staged_rows += 1
+        self.staged_alternatives[str(current_tick)] = None
+
+    def stage_system_clock_tick(self, current_tick: int):
+        """
+        Advance the clock to the given tick, as clock.py does, for when several ticks are run in one process.
+        """
+        self.stage_init_alternative(current_tick)
+        self.stage_object_parameter_values('SystemClockTicks', 'SystemClockTicks', [('ticks', current_tick)],
+                                           current_tick)
 
     """
     Element specific staging functions
@@ -166,6 +381,32 @@ class SpineDBReaderWriter:
         return str(vars(self))
 
 
+class SpineDBCallTimer:
+    """
+    Wrapper of a SpineDB that adds the time spent in its functions to the db_time of the timers, such as the
+    SpineDBReaderWriter.
+    """
+
+    def __init__(self, db: SpineDB, timers: list):
+        self.db = db
+        self.timers = timers
+
+    def __getattr__(self, name):
+        attribute = getattr(self.db, name)
+        if not callable(attribute):
+            return attribute
+
+        def timed_call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                for timer in self.timers:
+                    timer.db_time += elapsed
+        return timed_call
+
+
 def add_parameter_value_to_repository(reps: Repository, db_line: list, to_dict: dict, class_to_create):
     object_name = db_line[1]
     parameter_name = db_line[2]
@@ -176,11 +417,67 @@ def add_parameter_value_to_repository(reps: Repository, db_line: list, to_dict:
     #              + ', parameter_value: ' + str(parameter_value)
     #              + ', parameter_alt: ' + str(parameter_alt) + '}')
     if object_name not in to_dict.keys():
-        to_dict[object_name] = class_to_create(object_name)
+        if isinstance(to_dict, PowerPlantFleet):
+            # Create the PowerPlant in a row of the fleet directly, instead of in a fleet of its own
+            class_to_create(object_name, to_dict)
+        else:
+            to_dict[object_name] = class_to_create(object_name)
 
     to_dict[object_name].add_parameter_value(reps, parameter_name, parameter_value, parameter_alt)
 
 
+def index_object_parameter_values(object_parameter_values: list, current_tick: int) -> dict:
+    """
+    Function used to group the exported object_parameter_values by (object_class_name, object_name, parameter_name)
+    in a single pass. Per key only the value of the most recent alternative (tick) that is not later than the
+    current tick is kept.
+
+    :param object_parameter_values: The exported object_parameter_values from SpineDB
+    :param current_tick: The current tick, later alternatives are ignored
+    :return: Dict of (object_class_name, object_name, parameter_name) to the selected db_line
+    """
+    indexed_values = dict()
+    for db_line in object_parameter_values:
+        alternative = int(db_line[4])
+        if alternative <= current_tick:
+            key = (db_line[0], db_line[1], db_line[2])
+            if key not in indexed_values or alternative > int(indexed_values[key][4]):
+                indexed_values[key] = db_line
+    return indexed_values
+
+
+def add_object_parameter_values_to_repository(reps: Repository, db_data: dict, parameter_priorities: dict):
+    """
+    Function used to load all object parameter values into the Repository. The values are indexed once, so that
+    loading grows linearly with the size of the SpineDB.
+    Parameters are added in order of the priorities set in the config DB (EMLAB Parameters): some objects refer to
+    other objects, which therefore have to be loaded first.
+
+    :param reps: Repository
+    :param db_data: The exported data from SpineDB
+    :param parameter_priorities: Dict of object_class_name to priority, highest priority is loaded first
+    """
+    indexed_values = index_object_parameter_values(db_data['object_parameter_values'], reps.current_tick)
+
+    object_names_per_class = dict()
+    for (object_class_name, object_name, _) in db_data['objects']:
+        object_names_per_class.setdefault(object_class_name, []).append(object_name)
+
+    sorted_parameter_names = sorted(db_data['object_parameters'],
+                                    key=lambda item: parameter_priorities[item[0]]
+                                    if item[0] in parameter_priorities.keys() else 0, reverse=True)
+
+    for (object_class_name, parameter_name, _, _, _) in sorted_parameter_names:
+        for object_name in object_names_per_class.get(object_class_name, []):
+            db_line = indexed_values.get((object_class_name, object_name, parameter_name))
+            if db_line is not None:
+                add_parameter_value_to_repository_based_on_object_class_name(reps, db_line)
+            else:
+                logging.warning('No value found for class: ' + object_class_name +
+                                ', object: ' + object_name +
+                                ', parameter: ' + parameter_name)
+
+
 def add_relationship_to_repository_array(db_data: dict, to_arr: list, relationship_class_name: str):
     """
     Function used to translate SpineDB relationships to an array of tuples
@@ -211,6 +508,35 @@ def set_expected_lifetimes_of_power_generating_technologies(reps: Repository, db
             reps.get_power_generating_technology_by_techtype_and_fuel(unit[1], key).expected_lifetime = float(value)
 
 
+# Change this when the Repository or domain classes change, so that older snapshots are not read anymore
+repository_snapshot_version = 5
+
+# The SpineDB object classes that are translated to Repository objects:
+# object_class_name: (name of the Repository dict, class of the Repository objects)
+repository_object_classes = {
+    'GeometricTrends': ('trends', GeometricTrend),
+    'TriangularTrends': ('trends', TriangularTrend),
+    'StepTrends': ('trends', StepTrend),
+    'Zones': ('zones', Zone),
+    'EnergyProducers': ('energy_producers', EnergyProducer),
+    'Substances': ('substances', Substance),
+    'ElectricitySpotMarkets': ('electricity_spot_markets', ElectricitySpotMarket),
+    'CO2Auction': ('co2_markets', CO2Market),
+    'CapacityMarkets': ('capacity_markets', CapacityMarket),
+    'PowerGeneratingTechnologies': ('power_generating_technologies', PowerGeneratingTechnology),
+    'Hourly Demand': ('load', HourlyLoad),
+    'PowerGridNodes': ('power_grid_nodes', PowerGridNode),
+    'PowerPlants': ('power_plants', PowerPlant),
+    'PowerPlantDispatchPlans': ('power_plant_dispatch_plans', PowerPlantDispatchPlan),
+    'MarketClearingPoints': ('market_clearing_points', MarketClearingPoint),
+    'NationalGovernments': ('national_governments', NationalGovernment),
+    'Governments': ('governments', Government),
+    'MarketStabilityReserve': ('market_stability_reserves', MarketStabilityReserve),
+    'PowerGeneratingTechnologyFuel': ('power_plants_fuel_mix', SubstanceInFuelMix),
+    'YearlyEmissions': ('emissions', YearlyEmissions),
+}
+
+
 def add_parameter_value_to_repository_based_on_object_class_name(reps, db_line):
     """
     Function used to translate an object_parameter_value from SpineDB to a Repository dict entry.
@@ -218,47 +544,7 @@ def add_parameter_value_to_repository_based_on_object_class_name(reps, db_line):
     :param reps: Repository
     :param db_line: Line from exported data from spinedb_api
     """
-
     object_class_name = db_line[0]
-    if object_class_name == 'GeometricTrends':
-        add_parameter_value_to_repository(reps, db_line, reps.trends, GeometricTrend)
-    elif object_class_name == 'TriangularTrends':
-        add_parameter_value_to_repository(reps, db_line, reps.trends, TriangularTrend)
-    elif object_class_name == 'StepTrends':
-        add_parameter_value_to_repository(reps, db_line, reps.trends, StepTrend)
-    elif object_class_name == 'Zones':
-        add_parameter_value_to_repository(reps, db_line, reps.zones, Zone)
-    elif object_class_name == 'EnergyProducers':
-        add_parameter_value_to_repository(reps, db_line, reps.energy_producers, EnergyProducer)
-    elif object_class_name == 'Substances':
-        add_parameter_value_to_repository(reps, db_line, reps.substances, Substance)
-    elif object_class_name == 'ElectricitySpotMarkets':
-        add_parameter_value_to_repository(reps, db_line, reps.electricity_spot_markets, ElectricitySpotMarket)
-    elif object_class_name == 'CO2Auction':
-        add_parameter_value_to_repository(reps, db_line, reps.co2_markets, CO2Market)
-    elif object_class_name == 'CapacityMarkets':
-        add_parameter_value_to_repository(reps, db_line, reps.capacity_markets, CapacityMarket)
-    elif object_class_name == 'PowerGeneratingTechnologies':
-        add_parameter_value_to_repository(reps, db_line, reps.power_generating_technologies, PowerGeneratingTechnology)
-    elif object_class_name == 'Hourly Demand':
-        add_parameter_value_to_repository(reps, db_line, reps.load, HourlyLoad)
-    elif object_class_name == 'PowerGridNodes':
-        add_parameter_value_to_repository(reps, db_line, reps.power_grid_nodes, PowerGridNode)
-    elif object_class_name == 'PowerPlants':
-        add_parameter_value_to_repository(reps, db_line, reps.power_plants, PowerPlant)
-    elif object_class_name == 'PowerPlantDispatchPlans':
-        add_parameter_value_to_repository(reps, db_line, reps.power_plant_dispatch_plans, PowerPlantDispatchPlan)
-    elif object_class_name == 'MarketClearingPoints':
-        add_parameter_value_to_repository(reps, db_line, reps.market_clearing_points, MarketClearingPoint)
-    elif object_class_name == 'NationalGovernments':
-        add_parameter_value_to_repository(reps, db_line, reps.national_governments, NationalGovernment)
-    elif object_class_name == 'Governments':
-        add_parameter_value_to_repository(reps, db_line, reps.governments, Government)
-    elif object_class_name == 'MarketStabilityReserve':
-        add_parameter_value_to_repository(reps, db_line, reps.market_stability_reserves, MarketStabilityReserve)
-    elif object_class_name == 'PowerGeneratingTechnologyFuel':
-        add_parameter_value_to_repository(reps, db_line, reps.power_plants_fuel_mix, SubstanceInFuelMix)
-    elif object_class_name == 'YearlyEmissions':
-        add_parameter_value_to_repository(reps, db_line, reps.emissions, YearlyEmissions)
-    else:
-        logging.info('Object Class not defined: ' + object_class_name)
+    if object_class_name in repository_object_classes.keys():
+        (dict_name, class_to_create) = repository_object_classes[object_class_name]
+        add_parameter_value_to_repository(reps, db_line, getattr(reps, dict_name), class_to_create)
@@ -6,59 +6,163 @@ This script is responsible for running COMPETES by connecting through the DataEx
 In AIMMS, StartHTTPService has to be running. This means AIMMS is ready to receive REST requests.
 
 Arg1: path to EMLAB SpineDB
-Arg2: AIMMS Service Name given to Procedure that runs COMPETES
+Arg2: path to the configuration SpineDB
+Arg3: AIMMS Service Name given to Procedure that runs COMPETES
+Arg4: 'true' if the Look Ahead is added to the execution year
+Arg5, Arg6, ...: More pairs of AIMMS Service Name and Look Ahead, of which the tasks are run at the same time
+
+The tasks are submitted and polled by an asyncio client (AIMMSTaskClient). The status is polled often at first and
+less often the longer a task runs, and a task is done as soon as its status is finished or interrupted.
 
 @author: hernandezsernar
 @author: Jim Hommes
 """
-
-import requests
-import time
+import asyncio
+import json
 import sys
+import time
+import urllib.request
 from spinedb import SpineDB
 from helper_functions import get_current_ticks
 
-print('===== Starting COMPETES Execution =====')
-print('Read current year from SpineDB...')
-db_emlab = SpineDB(sys.argv[1])
-db_config = SpineDB(sys.argv[2])
-try:
+done_statuses = ['finished', 'interrupted']
+
+
+class AIMMSTaskClient:
+    """
+    Client of the task API of the AIMMS DataExchange library (/api/v1/tasks).
+    The requests themselves are blocking (urllib) and run in a thread, so that many tasks can be polled at once.
+
+    The poll interval starts at min_poll_interval and is multiplied by backoff after every poll, up to
+    max_poll_interval.
+    """
+
+    def __init__(self, url='http://localhost:8080', min_poll_interval=0.5, max_poll_interval=5.0, backoff=1.5,
+                 request_timeout=60):
+        self.url = url
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.request_timeout = request_timeout
+
+    def request(self, method, path):
+        request = urllib.request.Request(self.url + path, method=method)
+        with urllib.request.urlopen(request, timeout=self.request_timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    async def submit_task(self, aimms_service_name, execution_year):
+        """
+        :return: The ID of the task
+        """
+        response = await asyncio.to_thread(self.request, 'POST', '/api/v1/tasks/' + aimms_service_name +
+                                           '?InputYear=' + str(execution_year))
+        return response['id']
+
+    async def get_task_status(self, task_id):
+        """
+        :return: The status of the task as returned by AIMMS: a dict with at least 'status' and 'runtime'
+        """
+        return await asyncio.to_thread(self.request, 'GET', '/api/v1/tasks/' + task_id)
+
+    async def wait_for_task(self, task_id, on_status=None):
+        """
+        Poll the status of a task until it is finished or interrupted.
+
+        :param task_id: ID of the task
+        :param on_status: Function called with (task ID, status) after every poll
+        :return: The last status
+        """
+        poll_interval = self.min_poll_interval
+        status = await self.get_task_status(task_id)
+        while True:
+            if on_status is not None:
+                on_status(task_id, status)
+            if status['status'] in done_statuses:
+                return status
+            await asyncio.sleep(poll_interval)
+            poll_interval = min(poll_interval * self.backoff, self.max_poll_interval)
+            status = await self.get_task_status(task_id)
+
+    async def run_task(self, aimms_service_name, execution_year, on_status=None):
+        """
+        Submit a task and wait until it is finished or interrupted.
+
+        :param on_status: Function called with (task ID, status) after every poll
+        :return: (task ID, last status)
+        """
+        task_id = await self.submit_task(aimms_service_name, execution_year)
+        print('Activity ID of ' + aimms_service_name + ' year ' + str(execution_year) + ': ' + task_id)
+        return task_id, await self.wait_for_task(task_id, on_status)
+
+    async def run_tasks(self, tasks, on_status=None):
+        """
+        Submit all tasks at once and wait until all are finished or interrupted.
+
+        :param tasks: List of (AIMMS service name, execution year)
+        :param on_status: Function called with (task ID, status) after every poll
+        :return: List of (task ID, last status), in the order of tasks
+        """
+        return await asyncio.gather(*[self.run_task(aimms_service_name, execution_year, on_status)
+                                      for (aimms_service_name, execution_year) in tasks])
+
+
+def print_status(task_id, status):
+    print('Current status of ' + task_id + ': ' + str(status['status']) + ', t=' + str(status.get('runtime')))
+
+
+def call_competes(db_emlab, db_config, aimms_services, client=None):
+    """
+    Run the COMPETES tasks of the current year and wait until they are done. The SpineDBs are not closed.
+
+    :param db_emlab: SpineDB of EMLab
+    :param db_config: SpineDB of the simulation configuration
+    :param aimms_services: List of (AIMMS service name, True if the Look Ahead is added to the execution year)
+    :param client: AIMMSTaskClient. By default one to AIMMS on localhost
+    :return: List of (task ID, last status), in the order of aimms_services
+    """
+    print('Read current year from SpineDB...')
     db_config_parameters = db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
     start_simulation_year = next(int(i['parameter_value']) for i in
                                  db_config_parameters if i['object_name'] == 'Start Year')
     look_ahead = next(int(i['parameter_value']) for i in db_config_parameters if i['object_name'] == 'Look Ahead')
     current_emlab_tick, current_competes_tick, current_competes_tick_rounded = get_current_ticks(db_emlab,
                                                                                                  start_simulation_year)
-finally:
-    db_emlab.close_connection()
-    db_config.close_connection()
-
-aimms_service_name = sys.argv[3]
-print('Running AIMMS service ' + aimms_service_name)
-port = 8080
-url = 'http://localhost'
-
-include_look_ahead = sys.argv[4] == 'true'
-print('Add Look Ahead to execution year: ' + str(include_look_ahead))
-execution_year = current_competes_tick
-if include_look_ahead:
-    execution_year += look_ahead
-
-print('Sending HTTP Request to AIMMS year ' + str(execution_year))
-result = requests.post(url + ':' + str(port) + '/api/v1/tasks/' + aimms_service_name + '?InputYear=' +
-                       str(execution_year))
-print('Response Code: ' + str(result.status_code))
-print('Response Body: ' + result.text)
-request_id = result.json()['id']
-print('Activity ID: ' + request_id)
-
-status = requests.get(url + ':' + str(port) + '/api/v1/tasks/' + request_id)
-print(status.json())
-while status.json()['status'] != 'finished' and status.json()['status'] != 'interrupted':
-    print('Current status: ' + status.json()['status'] + ', t=' + str(status.json()['runtime']))
-    time.sleep(20)
-    status = requests.get(url + ':' + str(port) + '/api/v1/tasks/' + request_id)
-print('Done')
-print('Response Code: ' + str(status.status_code))
-print('Response Body: ' + status.text)
-print('===== End of COMPETES Execution =====')
+
+    tasks = []
+    for (aimms_service_name, include_look_ahead) in aimms_services:
+        print('Running AIMMS service ' + aimms_service_name)
+        print('Add Look Ahead to execution year: ' + str(include_look_ahead))
+        execution_year = current_competes_tick
+        if include_look_ahead:
+            execution_year += look_ahead
+        tasks.append((aimms_service_name, execution_year))
+
+    print('Sending HTTP Requests to AIMMS ' + str(tasks))
+    start = time.perf_counter()
+    results = asyncio.run((client if client is not None else AIMMSTaskClient()).run_tasks(tasks, print_status))
+    for ((aimms_service_name, execution_year), (task_id, status)) in zip(tasks, results):
+        print('Done ' + aimms_service_name + ' year ' + str(execution_year) + ' (' + task_id + ')')
+        print('Response Body: ' + json.dumps(status))
+    print('All tasks done in ' + '{:.1f}'.format(time.perf_counter() - start) + ' seconds')
+    return results
+
+
+def execute_aimms_call_competes():
+    """
+    This function executes all steps of this script.
+    """
+    db_emlab = SpineDB(sys.argv[1])
+    db_config = SpineDB(sys.argv[2])
+    try:
+        call_competes(db_emlab, db_config, [(aimms_service_name, include_look_ahead == 'true') for
+                                            (aimms_service_name, include_look_ahead)
+                                            in zip(sys.argv[3::2], sys.argv[4::2])])
+    finally:
+        db_emlab.close_connection()
+        db_config.close_connection()
+
+
+if __name__ == "__main__":
+    print('===== Starting COMPETES Execution =====')
+    execute_aimms_call_competes()
+    print('===== End of COMPETES Execution =====')
@@ -0,0 +1,137 @@
+"""
+This file caches the sheets of the COMPETES output workbooks (Output_Dynamic_Gen&Trans_<year>_Dispatch.xlsx and
+_Investments.xlsx). Parsing these workbooks with openpyxl is slow and they are read by competes_to_emlab.py after every
+COMPETES run and again by generate_plots.py for every year on every invocation.
+
+Every sheet that is read is stored as a pickled pandas DataFrame in <folder of the workbook>/cache/<workbook name>/
+<hash of the workbook>/. The workbook is only opened when a requested sheet is not in the cache, and then all
+missing sheets are read from one open workbook. When a workbook changes, its hash changes: the old cache is removed.
+The cache is keyed by the pandas.read_excel arguments as well, so the cached DataFrame is identical to a read
+DataFrame.
+
+Run to convert all COMPETES output workbooks of a folder ahead of time:
+python competes_output_cache.py <folder with COMPETES output>
+"""
+import hashlib
+import os
+import shutil
+import sys
+import pandas
+
+cache_folder_name = 'cache'
+
+# The sheets of the COMPETES output workbooks as read by the scripts: (sheet name, pandas.read_excel arguments)
+dispatch_sheets = [
+    ('Hourly Nodal Prices', {}),
+    ('NL Unit Generation', {'index_col': 0, 'skiprows': 1}),
+    ('Hourly NL Balance', {'skiprows': 1, 'usecols': ['Exports', 'Sun', 'Wind Onshore', 'Wind Offshore']}),
+    ('Unit Emissions', {'skiprows': 3, 'header': None, 'usecols': 'A:C'}),
+]
+investment_sheets = [
+    ('New Generation Capacity', {'skiprows': 2, 'usecols': 'A:D,G:X'}),
+    ('Decommissioning', {'skiprows': 2, 'usecols': 'A:C'}),
+    ('VRE investment', {'skiprows': 2, 'usecols': 'A:G'}),
+]
+plot_dispatch_sheets = [
+    ('Hourly NL Balance', {'skiprows': 1, 'index_col': 0, 'skipfooter': 2, 'usecols': 'A:W'}),
+    ('CO2 Emissions tech', {'skiprows': 1, 'index_col': 0}),
+    ('Initial generation capacity', {'skiprows': 2}),
+    ('Hourly Nodal Prices', {'skiprows': 1, 'index_col': 0}),
+]
+plot_investment_sheets = [
+    ('VRE investment', {'skiprows': 2}),
+    ('Decommissioning', {'skiprows': 2, 'usecols': 'A:C'}),
+    ('New Generation Capacity', {'skiprows': 2, 'usecols': 'A:D'}),
+]
+
+workbook_hashes = dict()
+
+
+def get_workbook_hash(path_to_workbook):
+    """
+    The hash of the contents of a workbook. It is remembered as long as the file is not modified.
+
+    :param path_to_workbook: Path to the workbook
+    :return: SHA1 hex digest
+    """
+    stat = os.stat(path_to_workbook)
+    key = (os.path.abspath(path_to_workbook), stat.st_mtime_ns, stat.st_size)
+    if key not in workbook_hashes.keys():
+        sha1 = hashlib.sha1()
+        with open(path_to_workbook, 'rb') as workbook_file:
+            for block in iter(lambda: workbook_file.read(1 << 20), b''):
+                sha1.update(block)
+        workbook_hashes[key] = sha1.hexdigest()
+    return workbook_hashes[key]
+
+
+def get_cache_path(path_to_workbook, workbook_hash, sheet_name, read_excel_arguments):
+    arguments_hash = hashlib.sha1(repr(sorted(read_excel_arguments.items())).encode()).hexdigest()[:16]
+    return os.path.join(os.path.dirname(path_to_workbook), cache_folder_name, os.path.basename(path_to_workbook),
+                        workbook_hash, sheet_name + '-' + arguments_hash + '.pickle')
+
+
+def read_workbook_sheets(path_to_workbook, sheets):
+    """
+    Read sheets of a workbook, from the cache if they are in it. Otherwise the workbook is opened once, the missing
+    sheets are read and added to the cache.
+
+    :param path_to_workbook: Path to the workbook
+    :param sheets: List of (sheet name, dict of pandas.read_excel arguments)
+    :return: List of DataFrames, in the order of sheets
+    """
+    workbook_hash = get_workbook_hash(path_to_workbook)
+    cache_paths = [get_cache_path(path_to_workbook, workbook_hash, sheet_name, read_excel_arguments)
+                   for (sheet_name, read_excel_arguments) in sheets]
+    sheet_dfs = [pandas.read_pickle(cache_path) if os.path.exists(cache_path) else None for cache_path in cache_paths]
+
+    missing_sheets = [i for i in range(len(sheets)) if sheet_dfs[i] is None]
+    if len(missing_sheets) > 0:
+        print('Reading ' + str([sheets[i][0] for i in missing_sheets]) + ' from ' + path_to_workbook)
+        remove_outdated_caches(path_to_workbook, workbook_hash)
+        with pandas.ExcelFile(path_to_workbook) as workbook:
+            for i in missing_sheets:
+                (sheet_name, read_excel_arguments) = sheets[i]
+                sheet_dfs[i] = pandas.read_excel(workbook, sheet_name, **read_excel_arguments)
+                os.makedirs(os.path.dirname(cache_paths[i]), exist_ok=True)
+                # Written to a temporary file first, so that an interrupted write never leaves a corrupt cache
+                sheet_dfs[i].to_pickle(cache_paths[i] + '.tmp')
+                os.replace(cache_paths[i] + '.tmp', cache_paths[i])
+    return sheet_dfs
+
+
+def read_workbook_sheet(path_to_workbook, sheet_name, **read_excel_arguments):
+    """
+    Read one sheet of a workbook through the cache, with the same arguments as pandas.read_excel.
+    """
+    return read_workbook_sheets(path_to_workbook, [(sheet_name, read_excel_arguments)])[0]
+
+
+def remove_outdated_caches(path_to_workbook, workbook_hash):
+    workbook_cache_folder = os.path.join(os.path.dirname(path_to_workbook), cache_folder_name,
+                                         os.path.basename(path_to_workbook))
+    if os.path.isdir(workbook_cache_folder):
+        for cached_hash in os.listdir(workbook_cache_folder):
+            if cached_hash != workbook_hash:
+                shutil.rmtree(os.path.join(workbook_cache_folder, cached_hash), ignore_errors=True)
+
+
+def convert_competes_output_folder(path_to_competes_results):
+    """
+    Add the sheets of all COMPETES output workbooks in a folder to the cache.
+
+    :param path_to_competes_results: Folder with the COMPETES output
+    """
+    for file_name in sorted(os.listdir(path_to_competes_results)):
+        if file_name.startswith('Output_Dynamic_Gen&Trans_') and file_name.endswith('_Dispatch.xlsx'):
+            read_workbook_sheets(os.path.join(path_to_competes_results, file_name),
+                                 dispatch_sheets + [i for i in plot_dispatch_sheets if i not in dispatch_sheets])
+        elif file_name.startswith('Output_Dynamic_Gen&Trans_') and file_name.endswith('_Investments.xlsx'):
+            read_workbook_sheets(os.path.join(path_to_competes_results, file_name),
+                                 investment_sheets + [i for i in plot_investment_sheets if i not in investment_sheets])
+
+
+if __name__ == "__main__":
+    print('===== Starting COMPETES Output Cache script =====')
+    convert_competes_output_folder(sys.argv[1])
+    print('===== End of COMPETES Output Cache script =====')
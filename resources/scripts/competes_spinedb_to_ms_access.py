@@ -8,15 +8,27 @@ Arg3: URL of COMPETES configuration with mappings
 Arg4: URL of empty COMPETES MDB
 Arg5: URL of empty COMPETES PowerPlants MDB
 
+The rows are not inserted one by one: they are collected per table and columns by an MDBWriter and then inserted with
+one prepared statement (executemany) per table and columns. Where they are written to is up to the backend: the MS
+Access databases (AccessBackend) or, to test and benchmark the export without MS Access, SQLite (SQLiteBackend).
+The two MDBs are written at the same time, each by its own worker with its own connection (export_to_mdbs).
+
 Jim Hommes - 1-6-2021
 """
-import pyodbc
 import shutil
+import sqlite3
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 import pandas
+from spinedb_api import Map
 from spinedb import SpineDB
-from helper_functions import get_current_ticks
+from helper_functions import get_current_ticks, get_trend_seed, draw_triangular_trend_paths
+try:
+    import pyodbc
+except ImportError:  # pyodbc is only needed to write to MS Access, see AccessBackend
+    pyodbc = None
 
 
 class TriangularTrend:
@@ -24,31 +36,141 @@ class TriangularTrend:
     COPIED FROM EMLAB
 
     The TriangularTrend grows according to a Triangular distribution.
-    Because of the random nature of this trend, values are saved in self.values so that once generated, the value \
-    does not change.
+    The path is drawn with the same seed as in EMLab (the Seed parameter, or else derived from the name of the trend),
+    so that every run draws the same path. Once drawn, the values are kept so that they do not change.
     """
 
-    def __init__(self, top, maxx, minn):
+    def __init__(self, name, top, maxx, minn, seed=None):
+        self.name = name
         self.top = top
         self.max = maxx
         self.min = minn
+        self.seed = int(seed) if seed is not None else get_trend_seed(name)
+        self.values = dict()
 
     def get_values(self, start, start_time, end_time):
-        res_values = [start]
-        for i in range(end_time - start_time):
-            last_value = res_values[-1]
-            random_number = np.random.triangular(-1, 0, 1)
-            if random_number < 0:
-                res_values.append(last_value * (self.top + (random_number * (self.top - self.min))))
-            else:
-                res_values.append(last_value * (self.top + (random_number * (self.max - self.top))))
-        return res_values
+        if (start, start_time, end_time) not in self.values.keys():
+            self.values[(start, start_time, end_time)] = draw_triangular_trend_paths(
+                start, self.top, self.max, self.min, end_time - start_time + 1,
+                np.random.default_rng(self.seed))
+        return self.values[(start, start_time, end_time)]
+
+
+def get_insert_query(table_name, column_names):
+    """
+    :return: The INSERT statement of a table with a parameter for every column
+    """
+    return 'INSERT INTO [' + table_name + '] (' + ', '.join('[' + str(i) + ']' for i in column_names) + \
+           ') VALUES (' + ', '.join(['?'] * len(column_names)) + ');'
+
+
+class AccessBackend:
+    """
+    Writes to an MS Access database through the MS Access ODBC driver (pyodbc, so Windows only).
+    The MS Access driver does not support parameter arrays, so fast_executemany is off by default. It can be turned
+    on for drivers that do support it.
+    """
+
+    def __init__(self, fast_executemany=False):
+        if pyodbc is None:
+            raise RuntimeError('pyodbc is required to write to MS Access')
+        self.errors = (pyodbc.Error,)
+        self.fast_executemany = fast_executemany
+        self.connection = None
+        self.cursor = None
+
+    def connect(self, path_to_database):
+        self.connection = pyodbc.connect(r'DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};DBQ=' +
+                                         path_to_database + ';')
+        self.cursor = self.connection.cursor()
+        self.cursor.fast_executemany = self.fast_executemany
+
+    def insert_rows(self, table_name, column_names, rows):
+        self.cursor.executemany(get_insert_query(table_name, column_names), rows)
+
+    def commit(self):
+        self.cursor.commit()
+
+    def close(self):
+        if self.cursor is not None:
+            self.cursor.close()
+        if self.connection is not None:
+            self.connection.close()
+        self.cursor = None
+        self.connection = None
+
+
+class SQLiteBackend:
+    """
+    Writes to an SQLite database instead of MS Access, to test and benchmark the export on any platform.
+    The tables of the empty MDBs are not in SQLite, so tables and columns are added when they are first written to.
+    """
+
+    def __init__(self):
+        self.errors = (sqlite3.Error,)
+        self.connection = None
+
+    def connect(self, path_to_database):
+        self.connection = sqlite3.connect(path_to_database)
+
+    def insert_rows(self, table_name, column_names, rows):
+        self.connection.execute('CREATE TABLE IF NOT EXISTS [' + table_name + '] (' +
+                                ', '.join('[' + str(i) + ']' for i in column_names) + ');')
+        existing_column_names = [i[1] for i in self.connection.execute('PRAGMA table_info([' + table_name + ']);')]
+        for column_name in column_names:
+            if str(column_name) not in existing_column_names:
+                self.connection.execute('ALTER TABLE [' + table_name + '] ADD COLUMN [' + str(column_name) + '];')
+        self.connection.executemany(get_insert_query(table_name, column_names), rows)
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+
+
+class MDBWriter:
+    """
+    Collects the rows to insert per table and columns. On flush, the rows of every table and columns are inserted
+    with one prepared statement (executemany) instead of one statement per row.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.rows = dict()
+
+    def add_row(self, table_name, column_names, values):
+        """
+        :param table_name: Table Name
+        :param column_names: Column Names, without brackets
+        :param values: Values of the columns, in the same order
+        """
+        self.rows.setdefault((table_name, tuple(column_names)), []).append(tuple(values))
+
+    def add_rows(self, table_name, column_names, rows):
+        """
+        Same as add_row, for a list of rows at once.
+        """
+        self.rows.setdefault((table_name, tuple(column_names)), []).extend(tuple(i) for i in rows)
+
+    def add_frame(self, table_name, frame):
+        """
+        Same as add_rows, for a DataFrame of which the columns are the column names.
+        """
+        self.add_rows(table_name, frame.columns, frame.itertuples(index=False, name=None))
+
+    def flush(self):
+        for ((table_name, column_names), rows) in self.rows.items():
+            self.backend.insert_rows(table_name, column_names, rows)
+        self.rows = dict()
 
 
 def export_to_mdb(path: str, filename: str,
                   tables_objects_type1: dict, tables_objects_type2: dict,
                   tables_relationships_type1: dict, tables_relationships_type2: dict,
-                  start_simulation_year, end_simulation_year, look_ahead):
+                  start_simulation_year, end_simulation_year, look_ahead, db_competes_data, backend=None):
     """
     Initialize the connection to the MS Access DB and import the tables.
     Type1 Mapping: SpineDB has an object with parameters. {'Table Name': 'Object Column Name'}
@@ -68,29 +190,31 @@ def export_to_mdb(path: str, filename: str,
     :param tables_objects_type2: Dict as described above
     :param tables_relationships_type1: Dict as described above
     :param tables_relationships_type2: Dict as described above
+    :param db_competes_data: The COMPETES SpineDB as exported by SpineDB.export_data, or a CompetesDataIndex of it
+    :param backend: AccessBackend (default) or SQLiteBackend
     :return:
     """
+    if backend is None:
+        backend = AccessBackend()
+    competes_data = index_competes_data(db_competes_data)
     print('Initializing connection to ' + filename)
-    conn = None
-    cursor = None
+    writer = MDBWriter(backend)
     try:
-        con_string = r'DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};DBQ=' + path + filename + ';'
-        conn = pyodbc.connect(con_string)
-        cursor = conn.cursor()
+        backend.connect(path + filename)
         print("Connected To " + filename)
 
         # Unique structures / Separate function required
         if filename == 'COMPETES EU 2050-KIP.mdb':
             print('Staging Unique Mappings...')
-            export_co2_prices(cursor)
-            export_fuelpriceyears(cursor, start_simulation_year, end_simulation_year, look_ahead)
-            export_nset(cursor)
+            export_co2_prices(writer, competes_data)
+            export_fuelpriceyears(writer, competes_data, start_simulation_year, end_simulation_year, look_ahead)
+            export_nset(writer, competes_data)
             print('Finished Unique Mappings')
 
         print('Staging Type 1 Mappings...')
         for (table_name, id_parameter_name) in tables_objects_type1.items():
             print('Exporting table ' + table_name)
-            export_type1(cursor, table_name, id_parameter_name)
+            export_type1(writer, competes_data, table_name, id_parameter_name)
         print('Finished Type 1 Mappings')
 
         print('Staging Type 2 Mappings...')
@@ -98,13 +222,14 @@ def export_to_mdb(path: str, filename: str,
             print('Exporting table ' + table_name)
             id_parameter_name = value[0]
             index_parameter_names = value[1:]
-            export_type2(cursor, table_name, id_parameter_name, index_parameter_names)
+            export_type2(writer, competes_data, table_name, id_parameter_name, index_parameter_names)
         print('Finished Type 2 Mappings')
 
         print('Staging Relationships Type 1...')
         for (table_name, (object1_parameter_name, object2_parameter_name)) in tables_relationships_type1.items():
             print('Exporting Relationships table ' + table_name)
-            export_relationships_type1(cursor, table_name, object1_parameter_name, object2_parameter_name)
+            export_relationships_type1(writer, competes_data, table_name, object1_parameter_name,
+                                       object2_parameter_name)
 
         print('Finished Relationships Type 1')
 
@@ -112,206 +237,326 @@ def export_to_mdb(path: str, filename: str,
         for (table_name, (object1_parameter_name, object2_parameter_name, index_parameter_name)) \
                 in tables_relationships_type2.items():
             print('Exporting Relationships table ' + table_name)
-            export_relationships_type2(cursor, table_name, object1_parameter_name, object2_parameter_name,
-                                       index_parameter_name)
+            export_relationships_type2(writer, competes_data, table_name, object1_parameter_name,
+                                       object2_parameter_name, index_parameter_name)
         print('Finished Relationships Type 2')
 
+        print('Inserting...')
+        writer.flush()
         print('Committing...')
-        cursor.commit()
-    except pyodbc.Error as e:
+        backend.commit()
+    except backend.errors as e:
         print("Error in Connection", e)
         raise
     finally:
-        if cursor is not None:
-            cursor.close()
-
-        if conn is not None:
-            conn.close()
+        backend.close()
         print('Done')
 
 
-def export_type1(cursor, table_name, id_parameter_name):
+def export_to_mdbs(path: str, exports: list, start_simulation_year, end_simulation_year, look_ahead,
+                   db_competes_data, backend_factory=AccessBackend, max_workers=None):
+    """
+    Export to several MS Access DBs at the same time, with one worker (thread) per DB as in export_to_mdb. The DBs
+    share nothing but the COMPETES data, which is indexed once and only read. Every worker has its own backend and
+    so its own connection. The inserts run in the database driver, so the workers do not wait for each other.
+    All exports are run to the end, also when one of them fails. The errors are summarized afterwards.
+
+    :param path: Path to COMPETES data folder
+    :param exports: List of (MS Access filename, tables_objects_type1, tables_objects_type2,
+    tables_relationships_type1, tables_relationships_type2), see export_to_mdb
+    :param start_simulation_year:
+    :param end_simulation_year:
+    :param look_ahead:
+    :param db_competes_data: The COMPETES SpineDB as exported by SpineDB.export_data, or a CompetesDataIndex of it
+    :param backend_factory: Function that returns a new backend: AccessBackend (default) or SQLiteBackend
+    :param max_workers: Maximum number of DBs written at the same time. By default all at once
+    :return: Dict of MS Access filename: seconds it took to export
+    """
+    competes_data = index_competes_data(db_competes_data)
+    export_times = dict()
+    errors = dict()
+
+    def export(filename, tables_objects_type1, tables_objects_type2, tables_relationships_type1,
+               tables_relationships_type2):
+        start = time.perf_counter()
+        export_to_mdb(path, filename, tables_objects_type1, tables_objects_type2, tables_relationships_type1,
+                      tables_relationships_type2, start_simulation_year, end_simulation_year, look_ahead,
+                      competes_data, backend_factory())
+        return time.perf_counter() - start
+
+    print('Exporting ' + str(len(exports)) + ' MS Access DBs at the same time...')
+    with ThreadPoolExecutor(max_workers=max_workers if max_workers is not None else max(len(exports), 1)) \
+            as executor:
+        futures = {executor.submit(export, *i): i[0] for i in exports}
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                export_times[filename] = future.result()
+                print('Finished ' + filename + ' in ' + '{:.1f}'.format(export_times[filename]) + ' seconds (' +
+                      str(len(export_times) + len(errors)) + '/' + str(len(exports)) + ')')
+            except Exception as e:
+                errors[filename] = e
+                print('Failed ' + filename + ' (' + str(len(export_times) + len(errors)) + '/' + str(len(exports)) +
+                      '): ' + repr(e))
+
+    if len(errors) > 0:
+        raise RuntimeError('Export failed for ' + str(len(errors)) + ' of ' + str(len(exports)) + ' MS Access DBs: ' +
+                           '; '.join(filename + ': ' + repr(e) for (filename, e) in errors.items()))
+    return export_times
+
+
+class CompetesDataIndex:
+    """
+    The COMPETES SpineDB as exported by SpineDB.export_data, indexed by object class and relationship class in one
+    pass. Everything is kept in the order of the export.
+    """
+
+    def __init__(self, db_competes_data):
+        self.objects = dict()
+        self.object_parameter_values = dict()
+        self.object_parameter_values_by_object = dict()
+        self.relationships = dict()
+        self.relationship_parameter_values = dict()
+        self.relationship_parameter_values_by_relationship = dict()
+        for (class_name, object_name, _) in db_competes_data.get('objects', []):
+            self.objects.setdefault(class_name, []).append(object_name)
+        for (class_name, object_name, parameter_name, value, _) in db_competes_data.get('object_parameter_values', []):
+            self.object_parameter_values.setdefault(class_name, []).append((object_name, parameter_name, value))
+            self.object_parameter_values_by_object.setdefault(class_name, dict()) \
+                .setdefault(object_name, []).append((parameter_name, value))
+        for (class_name, object_names) in db_competes_data.get('relationships', []):
+            self.relationships.setdefault(class_name, []).append(tuple(object_names))
+        for (class_name, object_names, parameter_name, value, _) \
+                in db_competes_data.get('relationship_parameter_values', []):
+            self.relationship_parameter_values.setdefault(class_name, []).append(
+                (tuple(object_names), parameter_name, value))
+            self.relationship_parameter_values_by_relationship.setdefault(class_name, dict()) \
+                .setdefault(tuple(object_names), []).append((parameter_name, value))
+
+
+def index_competes_data(db_competes_data):
+    """
+    :param db_competes_data: The COMPETES SpineDB as exported by SpineDB.export_data, or a CompetesDataIndex of it
+    :return: CompetesDataIndex. A CompetesDataIndex is returned as is
+    """
+    return db_competes_data if isinstance(db_competes_data, CompetesDataIndex) \
+        else CompetesDataIndex(db_competes_data)
+
+
+def flatten_map(value_map, index_values=()):
+    """
+    Flatten a (nested) SpineDB Map to long form. The innermost Maps are the rows: their indexes are the column names.
+    All Maps on the way there are the index values of the row.
+
+    :param value_map: SpineDB Map
+    :param index_values: The index values of the Maps around this Map
+    :return: List of (index values, column names, values) for every row
+    """
+    rows = []
+    if len(value_map.indexes) > 0:
+        if isinstance(value_map.values[0], Map):
+            # In this case, it MUST be another map. Go one level deeper
+            for (index, value) in zip(value_map.indexes, value_map.values):
+                rows += flatten_map(value, index_values + (index,))
+        else:
+            rows.append((index_values, tuple(value_map.indexes), tuple(value_map.values)))
+    return rows
+
+
+def get_table_frames(rows):
+    """
+    Create the columnar frames of a table, ready to be inserted. Usually all rows have the same columns and there is
+    one frame, otherwise there is one per set of columns. Values are kept as they are (dtype object).
+
+    :param rows: List of (column names, values)
+    :return: List of DataFrames, in order of the first row with its columns
+    """
+    values_per_column_names = dict()
+    for (column_names, values) in rows:
+        values_per_column_names.setdefault(tuple(column_names), []).append(tuple(values))
+    return [pandas.DataFrame(values, columns=list(column_names), dtype=object)
+            for (column_names, values) in values_per_column_names.items()]
+
+
+def export_type1(writer, competes_data, table_name, id_parameter_name):
     """
     Type1 Mapping: SpineDB has an object with parameters. {'Table Name': 'Object Column Name'}
 
-    :param cursor: PYODBC Cursor
+    :param writer: MDBWriter
+    :param competes_data: CompetesDataIndex
     :param table_name: Table Name
     :param id_parameter_name: Object ID Column Name
     :return:
     """
-    for (_, id_parameter_value, _) in [i for i in db_competes_data['objects'] if i[0] == table_name]:
-        param_values = [('[' + str(param_name) + ']', param_value) for (itable_name, iid, param_name, param_value, _)
-                        in db_competes_data['object_parameter_values']
-                        if itable_name == table_name and iid == id_parameter_value]
+    param_values_by_object = competes_data.object_parameter_values_by_object.get(table_name, dict())
+    rows = []
+    for id_parameter_value in competes_data.objects.get(table_name, []):
+        param_values = param_values_by_object.get(id_parameter_value, [])
+        rows.append(([id_parameter_name] + [i[0] for i in param_values],
+                     [id_parameter_value] + [i[1] for i in param_values]))
+    for frame in get_table_frames(rows):
+        writer.add_frame(table_name, frame)
 
-        sql_query = 'INSERT INTO [' + table_name + '] ([' + id_parameter_name + '], ' + \
-                    ', '.join([i[0] for i in param_values]) + ') VALUES (?, ' + \
-                    ', '.join(list('?' * len(param_values))) + ');'
-        values = (id_parameter_value,) + tuple(i[1] for i in param_values)
-        cursor.execute(sql_query, values)
 
-
-def export_type2(cursor, table_name, id_parameter_name, index_parameter_names):
+def export_type2(writer, competes_data, table_name, id_parameter_name, index_parameter_names):
     """
     Type2 Mapping: SpineDB has an object with one parameter, which is a map. In this map, the first index is unique,
     and the second is the parameter names. {'Table Name': ('Object Column Name', 'Index Column Name)}
 
-    :param cursor: PYODBC Cursor
+    :param writer: MDBWriter
+    :param competes_data: CompetesDataIndex
     :param table_name: Table Name
     :param id_parameter_name: Object ID Column Name
     :param index_parameter_names: Array of Index Column Names
     """
-    for (_, id_parameter_value, _) in [i for i in db_competes_data['objects'] if i[0] == table_name]:
-        value_map = next(i[3] for i in db_competes_data['object_parameter_values']
-                         if i[0] == table_name and i[1] == id_parameter_value)
-        for value_map_row in value_map.to_dict()['data']:
-            export_type2_recursive(cursor, table_name, id_parameter_name, id_parameter_value, index_parameter_names,
-                                   [value_map_row[0]], value_map_row[1]['data'])
-
-
-def export_type2_recursive(cursor, table_name, id_parameter_name, id_parameter_value, index_parameter_names,
-                           index_parameter_values, data):
-    """
-    This function assists the export_type2 function and should not be used on it's own.
-    In order to explore the SpineDB Map inside of other SpineDB Map structure this is set up as a recursive function.
-    """
-    if len(data) > 0:
-        first_el = data[0]
-        if len(first_el) == 2 and type(first_el[1]) == dict and 'type' in first_el[1].keys() and first_el[1][
-            'type'] == 'map':
-            # In this case, it MUST be another map
-            # Go one level deeper
-            for value_map_row in data:
-                export_type2_recursive(cursor, table_name, id_parameter_name, id_parameter_value,
-                                       index_parameter_names, index_parameter_values + [value_map_row[0]],
-                                       value_map_row[1]['data'])
-        else:
-            # Otherwise, treat as regular value and export it to MDB
-            param_values = [('[' + str(i[0]) + ']', i[1]) for i in data]
-            sql_query = 'INSERT INTO [' + table_name + '] ([' + id_parameter_name + '],[' + \
-                        '],['.join(index_parameter_names) + '],' + ','.join([i[0] for i in param_values]) + \
-                        ') VALUES (?,' + ','.join(list('?' * len(index_parameter_values))) + ',' + ','.join(
-                list('?' * len(param_values))) + ');'
-            values = (id_parameter_value,) + tuple(index_parameter_values) + tuple(i[1] for i in param_values)
-            cursor.execute(sql_query, values)
-
-
-def export_relationships_type1(cursor, table, object1_param_name, object2_param_name):
+    param_values_by_object = competes_data.object_parameter_values_by_object.get(table_name, dict())
+    rows = []
+    for id_parameter_value in competes_data.objects.get(table_name, []):
+        value_map = param_values_by_object[id_parameter_value][0][1]
+        for (index_values, column_names, values) in flatten_map(value_map):
+            rows.append(([id_parameter_name] + list(index_parameter_names) + list(column_names),
+                         (id_parameter_value,) + index_values + values))
+    for frame in get_table_frames(rows):
+        writer.add_frame(table_name, frame)
+
+
+def export_relationships_type1(writer, competes_data, table, object1_param_name, object2_param_name):
     """
     Type1 Relationships Mapping: SpineDB has a relationship with parameters.
     {'Table Name': ('Object 1 Column Name', 'Object 2 Column Name')}
 
-    :param cursor: PYODBC Cursor
+    :param writer: MDBWriter
+    :param competes_data: CompetesDataIndex
     :param table: Table Name
     :param object1_param_name: Object ID1 Column Name
     :param object2_param_name: Object ID2 Column Name
     :return:
     """
-    for (_, object_parameter_name_value_list) in [i for i in db_competes_data['relationships'] if i[0] == table]:
-        param_values = [('[' + str(param_name) + ']', param_value)
-                        for (itable, iobject_list, param_name, param_value, _)
-                        in db_competes_data['relationship_parameter_values']
-                        if itable == table and iobject_list == object_parameter_name_value_list]
-        sql_query = 'INSERT INTO [' + table + '] ([' + object1_param_name + '],[' + \
-                    object2_param_name + '],' + ','.join([i[0] for i in param_values]) + \
-                    ') VALUES (?,?,' + ','.join(list('?' * len(param_values))) + ');'
-        values = tuple(object_parameter_name_value_list) + tuple(i[1] for i in param_values)
-        cursor.execute(sql_query, values)
-
-
-def export_relationships_type2(cursor, table, object1_param_name, object2_param_name, index_param_name):
+    param_values_by_relationship = competes_data.relationship_parameter_values_by_relationship.get(table, dict())
+    rows = []
+    for object_names in competes_data.relationships.get(table, []):
+        param_values = param_values_by_relationship.get(object_names, [])
+        rows.append(([object1_param_name, object2_param_name] + [i[0] for i in param_values],
+                     object_names + tuple(i[1] for i in param_values)))
+    for frame in get_table_frames(rows):
+        writer.add_frame(table, frame)
+
+
+def export_relationships_type2(writer, competes_data, table, object1_param_name, object2_param_name,
+                               index_param_name):
     """
     Type2 Relationships Mapping: SpineDB has a relationship with one parameter which is a map.
     First index is unique, second is the parameter names.
     {'Table Name': ('Object 1 Column Name', 'Object 2 Column Name', 'Index Column Name')}
 
-    :param cursor: PYODBC Cursor
+    :param writer: MDBWriter
+    :param competes_data: CompetesDataIndex
     :param table: Table Name
     :param object1_param_name: Object ID1 Column Name
     :param object2_param_name: Object ID2 Column Name
     :param index_param_name: Index Column Name
     :return:
     """
-    for (_, [object1, object2], _, value_map, _) in [i for i in db_competes_data['relationship_parameter_values']
-                                                     if i[0] == table]:
-        for value_map_row in value_map.to_dict()['data']:
-            index = value_map_row[0]
-            param_values = [('[' + str(i[0]) + ']', i[1]) for i in value_map_row[1]['data']]
-            sql_query = 'INSERT INTO [' + table + '] ([' + object1_param_name + '],[' + \
-                        object2_param_name + '],[' + index_param_name + '],' + \
-                        ','.join([i[0] for i in param_values]) + ') VALUES (?,?,?,' + \
-                        ','.join(list('?' * len(param_values))) + ');'
-            values = (object1, object2, index,) + tuple(i[1] for i in param_values)
-            cursor.execute(sql_query, values)
+    rows = []
+    for ((object1, object2), _, value_map) in competes_data.relationship_parameter_values.get(table, []):
+        for (index, index_value_map) in zip(value_map.indexes, value_map.values):
+            rows.append(([object1_param_name, object2_param_name, index_param_name] + list(index_value_map.indexes),
+                         (object1, object2, index) + tuple(index_value_map.values)))
+    for frame in get_table_frames(rows):
+        writer.add_frame(table, frame)
 
 
-def export_co2_prices(cursor):
+def export_co2_prices(writer, competes_data):
     """
     Separate function because of structure in SpineDB.
 
-    :param cursor: PYODBC Cursor
+    :param writer: MDBWriter
+    :param competes_data: CompetesDataIndex
     :return:
     """
     print('Exporting CO2 Prices...')
     table_name = 'EU_ETS_CO2price'
-    for (object_class_name, year, month, price, _) in [i for i in db_competes_data['object_parameter_values']
-                                                       if i[0] == table_name]:
-        sql_query = 'INSERT INTO [' + table_name + '] ([Year input], [Month input], [CO2price]) VALUES (?,?,?)'
-        cursor.execute(sql_query, (year, month, price))
+    writer.add_rows(table_name, ['Year input', 'Month input', 'CO2price'],
+                    competes_data.object_parameter_values.get(table_name, []))
 
 
-def export_fuelpriceyears(cursor, start_simulation_year, end_simulation_year, look_ahead):
+def get_fuel_price_paths(competes_data, start_simulation_year, end_year):
+    """
+    Draw the path of every fuel price trend (FuelpriceTrends) once, from the start simulation year until the end year.
+    The paths are the same as the values of the TriangularTrends in EMLab: the same seed and the same draws are used.
+
+    :param competes_data: CompetesDataIndex
+    :param start_simulation_year: The year of the Start value
+    :param end_year: The last year of the paths
+    :return: Dict of trend name: (fuel name, array of the price per year)
+    """
+    table_name_spine = 'FuelpriceTrends'
+    param_values_by_object = competes_data.object_parameter_values_by_object.get(table_name_spine, dict())
+    fuel_price_paths = dict()
+    for trend_name in competes_data.objects.get(table_name_spine, []):
+        param_values = dict(param_values_by_object.get(trend_name, []))
+        trend_obj = TriangularTrend(trend_name, param_values['Top'], param_values['Max'], param_values['Min'],
+                                    param_values.get('Seed'))
+        fuel_price_paths[trend_name] = (param_values['Fuel'], trend_obj.get_values(param_values['Start'],
+                                                                                   start_simulation_year, end_year))
+    return fuel_price_paths
+
+
+def export_fuelpriceyears(writer, competes_data, start_simulation_year, end_simulation_year, look_ahead):
     """
     Separate function because of the required execution of the "trends" to print numbers into MS Access.
     The price is divided by 3.6 because of the conversion of MWh to GJ.
+    Every year of a fuel has the same price in all countries and months: the path of a fuel is drawn once and
+    broadcast to all countries and months, and all rows are inserted at once.
 
     :param start_simulation_year:
     :param end_simulation_year:
-    :param cursor: PYODBC
-    :return:
+    :param writer: MDBWriter
+    :param competes_data: CompetesDataIndex, or the COMPETES SpineDB as exported by SpineDB.export_data
+    :return: The drawn paths, see get_fuel_price_paths
     """
     print('Exporting Fuelpriceyears...')
-    table_name_spine = 'FuelpriceTrends'
+    competes_data = index_competes_data(competes_data)
     table_name_competes = 'Fuelpriceyears'
     years = list(range(start_simulation_year, end_simulation_year + look_ahead + 1))
-    months = ['[' + i[1] + ']' for i in db_competes_data['objects'] if i[0] == 'Months']
-    countries = [i[1] for i in db_competes_data['objects'] if i[0] == 'Country']
-    for (_, trend_name, _) in [i for i in db_competes_data['objects'] if i[0] == table_name_spine]:
-        param_values = {k: v for (table_name, object_name, k, v, _) in db_competes_data['object_parameter_values']
-                        if table_name == table_name_spine and object_name == trend_name}
-        fuelname = param_values['Fuel']
-        trend_obj = TriangularTrend(param_values['Top'], param_values['Max'], param_values['Min'])
-
-        for year in years:
-            prices = trend_obj.get_values(param_values['Start'], years[0], years[-1])
-            for country in countries:
-                print("Exporting for year " + str(year) + ' and country ' + country)
-                sql_query = 'INSERT INTO [' + table_name_competes + '] ([Fuelname], [Country], [Year], ' + ', '.join(
-                    months) + ') VALUES (' + ','.join(['?'] * 15) + ');'
-                cursor.execute(sql_query, (fuelname, country, year,) + (prices[year - start_simulation_year] / 3.6,) * 12)
-
-
-def export_nset(cursor):
+    months = competes_data.objects.get('Months', [])
+    countries = competes_data.objects.get('Country', [])
+    # Rows per year and then per country, with the price of the year in every month
+    years_and_countries = [(year, country) for year in years for country in countries]
+    fuel_price_paths = get_fuel_price_paths(competes_data, start_simulation_year, years[-1])
+    for (trend_name, (fuelname, prices)) in fuel_price_paths.items():
+        print('Exporting ' + trend_name + ' for ' + str(len(years)) + ' years and ' + str(len(countries)) +
+              ' countries')
+        monthly_prices = np.broadcast_to(np.repeat(prices / 3.6, len(countries))[:, np.newaxis],
+                                         (len(years_and_countries), len(months))).tolist()
+        writer.add_rows(table_name_competes, ['Fuelname', 'Country', 'Year'] + months,
+                        [(fuelname, country, year) + tuple(row_prices)
+                         for ((year, country), row_prices) in zip(years_and_countries, monthly_prices)])
+    return fuel_price_paths
+
+
+def export_nset(writer, competes_data):
     """
     Separate function because of single object structure
 
-    :param cursor: PYODBC cursor
+    :param writer: MDBWriter
+    :param competes_data: CompetesDataIndex
     :return:
     """
-    for (_, object_name, _) in [i for i in db_competes_data['objects'] if i[0] == 'Nset']:
-        sql_query = 'INSERT INTO [Nset] ([n2]) VALUES (?);'
-        cursor.execute(sql_query, (object_name,))
-
+    writer.add_rows('Nset', ['n2'], [(object_name,) for object_name in competes_data.objects.get('Nset', [])])
 
-print('===== Starting COMPETES SpineDB to MS Access script =====')
 
-config_url = sys.argv[3]
-print('Config DB path: ' + config_url)
+def export_competes_to_ms_access(db_competes, db_emlab, db_config, empty_mdb_files, backend_factory=AccessBackend):
+    """
+    All steps of this script on open SpineDBs, without closing them.
 
-print('Reading current tick...')
-db_emlab = SpineDB(sys.argv[2])
-db_config = SpineDB(config_url)
-try:
+    :param db_competes: SpineDB of COMPETES
+    :param db_emlab: SpineDB of EMLab
+    :param db_config: SpineDB of the simulation configuration
+    :param empty_mdb_files: Paths of the empty MS Access DBs (empty_<MS Access filename>)
+    :param backend_factory: Function that returns a new backend, see export_to_mdbs
+    """
+    print('Reading current tick...')
     db_config_parameters = db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
     start_simulation_year = next(int(i['parameter_value']) for i in db_config_parameters
                                  if i['object_name'] == 'Start Year')
@@ -322,28 +567,22 @@ try:
     current_emlab_tick, current_competes_tick, current_competes_tick_rounded = get_current_ticks(db_emlab,
                                                                                                  start_simulation_year)
     db_config_competes_mappings = db_config.query_object_parameter_values_by_object_class('COMPETES Parameters')
-finally:
-    db_emlab.close_connection()
-    db_config.close_connection()
 
-print('Copying empty Result Excel sheets...')
-originalfile = '../../COMPETES/Results/Empty output files/Output_Dynamic_Gen&Trans_INSERTYEAR.xlsx'
-shutil.copyfile(originalfile, originalfile.replace("INSERTYEAR", str(current_competes_tick) + '_Dispatch').replace("INSERTOUTPUTYEAR", str(current_competes_tick) + '_Dispatch').replace('/Empty output files', ''))
-shutil.copyfile(originalfile, originalfile.replace("INSERTYEAR", str(current_competes_tick + look_ahead) + '_Investments').replace("INSERTOUTPUTYEAR", str(current_competes_tick + look_ahead) + '_Investments').replace('/Empty output files', ''))
+    print('Copying empty Result Excel sheets...')
+    originalfile = '../../COMPETES/Results/Empty output files/Output_Dynamic_Gen&Trans_INSERTYEAR.xlsx'
+    shutil.copyfile(originalfile, originalfile.replace("INSERTYEAR", str(current_competes_tick) + '_Dispatch').replace("INSERTOUTPUTYEAR", str(current_competes_tick) + '_Dispatch').replace('/Empty output files', ''))
+    shutil.copyfile(originalfile, originalfile.replace("INSERTYEAR", str(current_competes_tick + look_ahead) + '_Investments').replace("INSERTOUTPUTYEAR", str(current_competes_tick + look_ahead) + '_Investments').replace('/Empty output files', ''))
 
-print('Copying empty databases...')
-originalfiles = sys.argv[4:]
-targetfiles = [i.replace('empty_', '') for i in originalfiles]
+    print('Copying empty databases...')
+    originalfiles = empty_mdb_files
+    targetfiles = [i.replace('empty_', '') for i in originalfiles]
 
-for originalfile in originalfiles:
-    shutil.copyfile(originalfile, originalfile.replace("empty_", ""))
-print('Done copying empty databases')
+    for originalfile in originalfiles:
+        shutil.copyfile(originalfile, originalfile.replace("empty_", ""))
+    print('Done copying empty databases')
 
-print('Connecting and exporting COMPETES SpineDB...')
-db_competes = SpineDB(sys.argv[1])
-try:
-    db_competes_data = db_competes.export_data()
-    db_competes.close_connection()
+    print('Exporting COMPETES SpineDB...')
+    competes_data = CompetesDataIndex(db_competes.export_data())
     print('Done')
 
     path_to_data = originalfiles[0].split("empty_")[0]
@@ -388,17 +627,38 @@ try:
                                      if i['object_name'] == 'PP Relationship Type 2'}
     print(pp_relationship_mapping_type2)
 
-    export_to_mdb(path_to_data, 'COMPETES EU 2050-KIP.mdb',
-                  object_mapping_type1, object_mapping_type2, relationship_mapping_type1, relationship_mapping_type2,
-                  start_simulation_year, end_simulation_year, look_ahead)
-
-    export_to_mdb(path_to_data, 'COMPETES EU PowerPlants 2050-KIP', pp_object_mapping_type1, pp_object_mapping_type2,
-                  pp_relationship_mapping_type1, pp_relationship_mapping_type2,
-                  start_simulation_year, end_simulation_year, look_ahead)
-except Exception as e:
-    print('Exception occurred: ' + str(e))
-    raise
-finally:
-    print('Closing database connection...')
-    db_competes.close_connection()
+    export_to_mdbs(path_to_data,
+                   [('COMPETES EU 2050-KIP.mdb', object_mapping_type1, object_mapping_type2,
+                     relationship_mapping_type1, relationship_mapping_type2),
+                    ('COMPETES EU PowerPlants 2050-KIP', pp_object_mapping_type1, pp_object_mapping_type2,
+                     pp_relationship_mapping_type1, pp_relationship_mapping_type2)],
+                   start_simulation_year, end_simulation_year, look_ahead, competes_data, backend_factory)
+
+
+def execute_export_to_ms_access():
+    """
+    This function executes all steps of this script.
+    """
+    config_url = sys.argv[3]
+    print('Config DB path: ' + config_url)
+
+    print('Connecting to the SpineDBs...')
+    db_competes = SpineDB(sys.argv[1])
+    db_emlab = SpineDB(sys.argv[2])
+    db_config = SpineDB(config_url)
+    try:
+        export_competes_to_ms_access(db_competes, db_emlab, db_config, sys.argv[4:])
+    except Exception as e:
+        print('Exception occurred: ' + str(e))
+        raise
+    finally:
+        print('Closing database connection...')
+        db_competes.close_connection()
+        db_emlab.close_connection()
+        db_config.close_connection()
+
+
+if __name__ == "__main__":
+    print('===== Starting COMPETES SpineDB to MS Access script =====')
+    execute_export_to_ms_access()
     print('===== End of COMPETES SpineDB to MS Access script =====')
@@ -15,8 +15,9 @@ import sys
 import pandas
 import numpy as np
 from datetime import datetime
-from spinedb import SpineDB
+from spinedb import SpineDB, as_query_result
 from helper_functions import get_current_ticks
+from competes_output_cache import read_workbook_sheets, dispatch_sheets, investment_sheets
 
 
 def query_databases(db_emlab, db_competes):
@@ -44,30 +45,23 @@ def query_databases(db_emlab, db_competes):
 
 def read_excel_sheets(path_to_competes_results, file_name_gentransinv, file_name_gentransdisp):
     """
-    This function reads all Excel sheets output by COMPETES. This is done with pandas.
+    This function reads all Excel sheets output by COMPETES. This is done with pandas, through the cache of
+    competes_output_cache: a workbook is only opened (once) if its sheets have not been read before.
+    Only the columns that are used are kept. The values are kept as float64: they are summed over all hours and
+    exported.
 
     :param path_to_competes_results: URL
     :param file_name_gentransinv: Filename of the Investment output
-    :param file_name_uc: Filename of the Unit Commitment output
+    :param file_name_gentransdisp: Filename of the Dispatch output
     :return: The pandas dataframes of the read Excel sheets
     """
     # Unit Commitment
-    hourly_nodal_prices_df = pandas.read_excel(path_to_competes_results + '/' + file_name_gentransdisp,
-                                               'Hourly Nodal Prices')
-    unit_generation_df = pandas.read_excel(path_to_competes_results + '/' + file_name_gentransdisp,
-                                           'NL Unit Generation', index_col=0, skiprows=1)
-    hourly_nl_balance_df = pandas.read_excel(path_to_competes_results + '/' + file_name_gentransdisp,
-                                             'Hourly NL Balance', skiprows=1)
-    yearly_emissions_df = pandas.read_excel(path_to_competes_results + '/' + file_name_gentransdisp,
-                                            'Unit Emissions', skiprows=3, header=None)
+    hourly_nodal_prices_df, unit_generation_df, hourly_nl_balance_df, yearly_emissions_df = read_workbook_sheets(
+        path_to_competes_results + '/' + file_name_gentransdisp, dispatch_sheets)
 
     # Investment and Decom decisions
-    new_generation_capacity_df = pandas.read_excel(path_to_competes_results + '/' + file_name_gentransinv,
-                                                   'New Generation Capacity', skiprows=2, usecols='A:D,G:X')
-    decommissioning_df = pandas.read_excel(path_to_competes_results + '/' + file_name_gentransinv, 'Decommissioning',
-                                           skiprows=2, usecols='A:C')
-    vre_investment_df = pandas.read_excel(path_to_competes_results + '/' + file_name_gentransinv, 'VRE investment',
-                                          skiprows=2, usecols='A:G')
+    new_generation_capacity_df, decommissioning_df, vre_investment_df = read_workbook_sheets(
+        path_to_competes_results + '/' + file_name_gentransinv, investment_sheets)
 
     return hourly_nodal_prices_df, unit_generation_df, new_generation_capacity_df, decommissioning_df, \
            vre_investment_df, hourly_nl_balance_df, yearly_emissions_df
@@ -105,10 +99,15 @@ def export_decommissioning_decisions_to_emlab_and_competes(db_competes, db_emlab
     :param current_emlab_tick: int
     """
     print('Exporting Decommissioning to EMLAB and COMPETES...')
+    # The first row of every DECOM version, the units are matched on part of the name so can not be looked up
+    decom_version_rows = dict()
+    for i in db_competes_powerplants:
+        if '(D)' in i['object_name']:
+            decom_version_rows.setdefault(i['object_name'], i)
     for index, row in decommissioning_df.iterrows():
         try:
             power_plant_name_decom_version_row = next(
-                i for i in db_competes_powerplants if row['unit'] in i['object_name'] and '(D)' in i['object_name'])
+                i for i in decom_version_rows.values() if row['unit'] in i['object_name'])
             power_plant_name_decom_version = power_plant_name_decom_version_row['object_name']
             onstream_title = 'ON-STREAMNL' if row['node'] == 'NED' else 'ON-STREAMEU'
             db_competes.import_object_parameter_values([(power_plant_name_decom_version_row['object_class_name'],
@@ -137,17 +136,16 @@ def export_vre_investment_decisions(db_emlab, db_competes, current_emlab_tick, c
     :param db_emlab_powerplants: Queried Powerplants from EMLab
     """
     print('Exporting VRE Investment Decisions to EMLAB and COMPETES...')
+    db_emlab_technologies = as_query_result(db_emlab_technologies)
+    db_competes_vre_capacities = as_query_result(db_competes_vre_capacities)
     for index, vre_row in vre_investment_df.iterrows():
         if 'New' in vre_row.index and not pandas.isnull(vre_row['New']):
-            expected_permit_time = next(int(i['parameter_value']) for i in db_emlab_technologies if i['object_name'] ==
-                                        vre_row['WindOn'] and i['parameter_name'] == 'expectedPermittime')
-            expected_lead_time = next(int(i['parameter_value']) for i in db_emlab_technologies if i['object_name'] ==
-                                      vre_row['WindOn'] and i['parameter_name'] == 'expectedLeadtime')
+            expected_permit_time = int(db_emlab_technologies.get_value(vre_row['WindOn'], 'expectedPermittime'))
+            expected_lead_time = int(db_emlab_technologies.get_value(vre_row['WindOn'], 'expectedLeadtime'))
             build_time = expected_permit_time + expected_lead_time
 
             # There has only been an investment if there is a column New
-            vre_capacity_per_year = next(
-                i['parameter_value'] for i in db_competes_vre_capacities if i['object_name'] == vre_row['WindOn'])
+            vre_capacity_per_year = db_competes_vre_capacities.get_value(vre_row['WindOn'])
             vre_capacity_per_bus = vre_capacity_per_year.get_value(str(current_competes_tick + build_time))
             vre_capacity = vre_capacity_per_bus.get_value(vre_row['Bus'])
             old_mw = vre_capacity.get_value('Initial Capacity(MW)')
@@ -158,8 +156,7 @@ def export_vre_investment_decisions(db_emlab, db_competes, current_emlab_tick, c
                 [('VRE Capacities', vre_row['WindOn'], 'VRE Capacities', vre_capacity_per_year, '0')])
 
         if 'Bus' in vre_row.index and vre_row['Bus'] == 'NED':  # Retrieve Initial from SpineDB COMPETES
-            vre_capacity_per_year = next(
-                i['parameter_value'] for i in db_competes_vre_capacities if i['object_name'] == vre_row['WindOn'])
+            vre_capacity_per_year = db_competes_vre_capacities.get_value(vre_row['WindOn'])
             new_mw = vre_capacity_per_year.get_value(str(current_competes_tick + step)).get_value(vre_row['Bus']) \
                 .get_value('Initial Capacity(MW)')
             db_emlab.import_object_parameter_values(
@@ -169,17 +166,18 @@ def export_vre_investment_decisions(db_emlab, db_competes, current_emlab_tick, c
 
 
 def get_year_online_by_technology(db_emlab_technologies, fuel, techtype, current_competes_tick):
-    technologies_by_fuel = [i['object_name'] for i in db_emlab_technologies if i['parameter_name'] == 'FUELNEW' and i['parameter_value'] == fuel]
-    technologies_by_techtype = [i['object_name'] for i in db_emlab_technologies if i['parameter_name'] == 'FUELTYPENEW' and i['parameter_value'] == techtype]
-    technology = next(name for name in technologies_by_fuel if name in technologies_by_techtype)
-    expected_permit_time = next(int(i['parameter_value']) for i in db_emlab_technologies if i['object_name'] == technology and i['parameter_name'] == 'expectedPermittime')
-    expected_lead_time = next(int(i['parameter_value']) for i in db_emlab_technologies if i['object_name'] == technology and i['parameter_name'] == 'expectedLeadtime')
+    db_emlab_technologies = as_query_result(db_emlab_technologies)
+    technologies_by_techtype = set(db_emlab_technologies.get_object_names('FUELTYPENEW', techtype))
+    technology = next(name for name in db_emlab_technologies.get_object_names('FUELNEW', fuel)
+                      if name in technologies_by_techtype)
+    expected_permit_time = int(db_emlab_technologies.get_value(technology, 'expectedPermittime'))
+    expected_lead_time = int(db_emlab_technologies.get_value(technology, 'expectedLeadtime'))
     build_time = expected_permit_time + expected_lead_time
     return current_competes_tick + build_time
 
 
 def get_plant_efficiency_and_availability_by_fuel_and_tech(db_competes_new_technologies, tech, year, bus, fuel):
-    res_map = next(i['parameter_value'] for i in db_competes_new_technologies if i['object_name'] == tech)
+    res_map = as_query_result(db_competes_new_technologies).get_value(tech)
     res_map_per_parameter = res_map.get_value(str(year)).get_value(bus).get_value(fuel)
     return res_map_per_parameter.get_value('Efficiencynew'), res_map_per_parameter.get_value('Availibilitynew')
 
@@ -268,6 +266,7 @@ def export_power_plant_dispatch_plans_to_emlab(db_emlab, current_emlab_tick, uni
     This function exports all dispatch and nodal prices from COMPETES output. EMLab interprets this as
     PowerPlantDispatchPlans. In order to achieve the right results, the price of the ppdp is set at the average of
     all the prices the plant operates. Capacity is set to total capacity of the year (sum).
+    All plants are calculated at once on the hour x plant generation matrix.
 
     :param db_emlab: SpineDB
     :param current_emlab_tick: int
@@ -277,39 +276,60 @@ def export_power_plant_dispatch_plans_to_emlab(db_emlab, current_emlab_tick, uni
     :param db_emlab_powerplants: Queried Powerplants from EMLab
     """
     print('Exporting PowerPlantDispatchPlans into EMLAB')
+    # Lookups of the existing PPDPs of this tick and the owners of the plants, the first row found is used
+    ppdp_names_by_plant = dict()
+    for row in db_emlab_ppdps:
+        if row['parameter_name'] == 'Plant' and row['alternative'] == str(current_emlab_tick):
+            ppdp_names_by_plant.setdefault(row['parameter_value'], row['object_name'])
+    owners_by_plant = dict()
+    for row in db_emlab_powerplants:
+        if row['parameter_name'] == 'FirmNL':
+            owners_by_plant.setdefault(row['object_name'], row['parameter_value'])
+
+    power_plants = list(unit_generation_df.columns)
+    hours = min(len(unit_generation_df.index), len(hourly_nodal_prices_nl))
+    generation = np.asarray(unit_generation_df.values, dtype=float)
+    prices = np.asarray(hourly_nodal_prices_nl[:hours], dtype=float)
+    accepted_amounts = sum_over_hours(generation)
+    revenues = sum_over_hours(np.where(generation[:hours] > 0, generation[:hours] * prices[:, np.newaxis], 0))
+
+    new_ppdp_name_prefix = 'PowerPlantDispatchPlan ' + str(datetime.now()) + ' '
     ppdp_objects_to_import = []
     ppdp_values_to_import = []
-    for power_plant in unit_generation_df.columns:
-        print('Staging PPDP for ' + str(power_plant))
-        try:
-            ppdp_name = next(i['object_name'] for i in db_emlab_ppdps if
-                             i['parameter_name'] == 'Plant' and i['parameter_value'] == power_plant and i[
-                                 'alternative'] == str(current_emlab_tick))
-        except StopIteration:
-            ppdp_name = 'PowerPlantDispatchPlan ' + str(datetime.now())
+    for (power_plant, accepted, revenue) in zip(power_plants, accepted_amounts.tolist(), revenues.tolist()):
+        if power_plant in ppdp_names_by_plant.keys():
+            ppdp_name = ppdp_names_by_plant[power_plant]
+        else:
+            ppdp_name = new_ppdp_name_prefix + str(power_plant)
             ppdp_objects_to_import.append(('PowerPlantDispatchPlans', ppdp_name))
 
-        accepted = sum(unit_generation_df[power_plant].values)
         if accepted > 0:
-            hourly_nodal_prices_nl_where_plant_generated = [i for i in zip(unit_generation_df[power_plant].values,
-                                                                           hourly_nodal_prices_nl) if i[0] > 0]
-            ppdp_price = sum([float(i[0]) * float(i[1]) for i in
-                              hourly_nodal_prices_nl_where_plant_generated]) / accepted if accepted > 0 else 0
-            owner = next(row['parameter_value'] for row in db_emlab_powerplants if
-                         row['object_name'] == power_plant and row['parameter_name'] == 'FirmNL')
-            status = 'Accepted' if accepted > 0 else 'Failed'
-            values = [('AcceptedAmount', accepted), ('Capacity', accepted), ('EnergyProducer', owner),
-                      ('Market', 'DutchElectricitySpotMarket'), ('Plant', power_plant), ('Status', status),
-                      ('Price', ppdp_price)]
-            ppdp_values_to_import = ppdp_values_to_import + [
-                ('PowerPlantDispatchPlans', ppdp_name, i[0], i[1], str(current_emlab_tick)) for i in values]
-        else:
-            print('Accepted amount == 0, not importing')
+            values = [('AcceptedAmount', accepted), ('Capacity', accepted), ('EnergyProducer',
+                                                                              owners_by_plant[power_plant]),
+                      ('Market', 'DutchElectricitySpotMarket'), ('Plant', power_plant), ('Status', 'Accepted'),
+                      ('Price', revenue / accepted)]
+            ppdp_values_to_import += [('PowerPlantDispatchPlans', ppdp_name, i[0], i[1], str(current_emlab_tick))
+                                      for i in values]
+    print('Staged PPDPs for ' + str(len(ppdp_values_to_import) // 7) + ' of ' + str(len(power_plants)) +
+          ' plants, the others have an accepted amount of 0')
     db_emlab.import_objects(ppdp_objects_to_import)
     db_emlab.import_object_parameter_values(ppdp_values_to_import)
     print('Done exporting PowerPlantDispatchPlans to EMLAB')
 
 
+def sum_over_hours(hourly_values):
+    """
+    Sum an hour x plant matrix per plant. The cumulative sum adds the hours one by one, in the same order as summing
+    the hours of one plant in Python, so that the sums are exactly the same (numpy.sum adds pairwise).
+
+    :param hourly_values: Array of shape (hours, plants)
+    :return: Array with the sum per plant
+    """
+    if len(hourly_values) == 0:
+        return np.zeros(hourly_values.shape[1:])
+    return np.cumsum(hourly_values, axis=0)[-1]
+
+
 def get_hourly_nodal_prices(hourly_nodal_prices_df):
     """
     This function retrieves the desired data of the dataframe of hourly nodal prices from COMPETES.
@@ -337,10 +357,8 @@ def export_market_clearing_points_to_emlab(db_emlab, current_emlab_tick, hourly_
 
     print('Checking if MCP already exists for this run')
     try:
-        newobject_mcp_name = next(i['object_name'] for i in db_emlab_mcps
-                                  if i['parameter_name'] == 'Market'
-                                  and i['parameter_value'] == 'DutchElectricitySpotMarket')
-    except StopIteration:
+        newobject_mcp_name = as_query_result(db_emlab_mcps).get_object_name('Market', 'DutchElectricitySpotMarket')
+    except KeyError:
         newobject_mcp_name = 'MarketClearingPoint ' + str(datetime.now())
 
     print('Staging...')
@@ -385,6 +403,74 @@ def export_total_sum_exports_to_emlab(db_emlab, hourly_nl_balance_df, current_em
                                               str(current_emlab_tick))])
 
 
+def import_competes_results(db_emlab, db_competes, db_config, path_to_competes_results, file_name_gentransinv,
+                            file_name_gentransdisp):
+    """
+    All steps of this script on open SpineDBs, without closing them.
+
+    :param db_emlab: SpineDB of EMLab
+    :param db_competes: SpineDB of COMPETES
+    :param db_config: SpineDB of the simulation configuration
+    :param path_to_competes_results: Path to the COMPETES Results folder
+    :param file_name_gentransinv: Filename of COMPETES output Gen&Trans with a "?" as placeholder for the year
+    :param file_name_gentransdisp: Filename of COMPETES output UC with a "?" as placeholder for the year
+    """
+    db_config_parameters = db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
+    start_simulation_year = int(db_config_parameters.get_value('Start Year'))
+    look_ahead = int(db_config_parameters.get_value('Look Ahead'))
+    current_emlab_tick, current_competes_tick, current_competes_tick_rounded = get_current_ticks(db_emlab,
+                                                                                                 start_simulation_year)
+    print('Current EM-Lab tick: ' + str(current_emlab_tick))
+    print('Current COMPETES tick: ' + str(current_competes_tick))
+
+    db_emlab_powerplants, db_emlab_ppdps, db_competes_powerplants, db_emlab_mcps, db_competes_vre_capacities, \
+    db_emlab_technologies, db_competes_new_technologies = query_databases(db_emlab, db_competes)
+
+    print('Staging next SpineDB alternative...')
+    step = int(db_config_parameters.get_value('Time Step'))
+    db_emlab.import_alternatives([str(current_emlab_tick + step)])
+
+    file_name_gentransinv = file_name_gentransinv.replace('?', str(current_competes_tick + look_ahead))
+    file_name_gentransdisp = file_name_gentransdisp.replace('?', str(current_competes_tick))
+
+    print('Loading sheets...')
+    hourly_nodal_prices_df, unit_generation_df, new_generation_capacity_df, decommissioning_df, vre_investment_df, \
+    hourly_nl_balance_df, yearly_emissions_df = read_excel_sheets(path_to_competes_results, file_name_gentransinv,
+                                             file_name_gentransdisp)
+
+    new_generation_capacity_df = crop_dataframe_until_first_empty_row(new_generation_capacity_df)
+    vre_investment_df = crop_dataframe_until_first_empty_row(vre_investment_df)
+    decommissioning_df = crop_dataframe_until_first_empty_row(decommissioning_df)
+
+    # VRE Plants are added to unit_generation sheet
+    hourly_nl_balance_df = hourly_nl_balance_df.rename(columns={'Sun': 'SunPV', 'Wind Onshore': 'WindOn',
+                                                                'Wind Offshore': 'WindOff'})
+    unit_generation_df = unit_generation_df.transpose().join(
+        hourly_nl_balance_df[['SunPV', 'WindOn', 'WindOff']]).replace(np.nan, 0)
+    print('Done loading sheets')
+
+    hourly_nodal_prices_nl = get_hourly_nodal_prices(hourly_nodal_prices_df)
+    export_vre_investment_decisions(db_emlab, db_competes, current_emlab_tick, current_competes_tick,
+                                    vre_investment_df, db_emlab_technologies, db_competes_vre_capacities,
+                                    step)
+    export_market_clearing_points_to_emlab(db_emlab, current_emlab_tick, hourly_nodal_prices_nl, db_emlab_mcps)
+    export_power_plant_dispatch_plans_to_emlab(db_emlab, current_emlab_tick, unit_generation_df, db_emlab_ppdps,
+                                               hourly_nodal_prices_nl, db_emlab_powerplants)
+    export_investment_decisions_to_emlab_and_competes(db_emlab, db_competes, current_emlab_tick,
+                                                      new_generation_capacity_df, current_competes_tick,
+                                                      db_emlab_technologies, db_competes_new_technologies)
+    export_decommissioning_decisions_to_emlab_and_competes(db_competes, db_emlab, db_competes_powerplants,
+                                                           decommissioning_df, current_competes_tick,
+                                                           current_emlab_tick, look_ahead)
+    export_total_sum_exports_to_emlab(db_emlab, hourly_nl_balance_df, current_emlab_tick)
+    export_yearly_emissions_to_emlab(db_emlab, yearly_emissions_df, current_emlab_tick)
+
+    print('Committing...')
+    db_emlab.commit('Imported from COMPETES run ' + str(current_competes_tick))
+    db_competes.commit('Imported from COMPETES run ' + str(current_competes_tick))
+    print('Done')
+
+
 def export_all_competes_results():
     """
     This is the main export function
@@ -397,62 +483,7 @@ def export_all_competes_results():
     print('Done')
 
     try:
-        db_config_parameters = db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
-        start_simulation_year = next(int(i['parameter_value']) for i in db_config_parameters
-                                     if i['object_name'] == 'Start Year')
-        look_ahead = next(int(i['parameter_value']) for i in db_config_parameters if i['object_name'] == 'Look Ahead')
-        current_emlab_tick, current_competes_tick, current_competes_tick_rounded = get_current_ticks(db_emlab,
-                                                                                                     start_simulation_year)
-        print('Current EM-Lab tick: ' + str(current_emlab_tick))
-        print('Current COMPETES tick: ' + str(current_competes_tick))
-
-        db_emlab_powerplants, db_emlab_ppdps, db_competes_powerplants, db_emlab_mcps, db_competes_vre_capacities, \
-        db_emlab_technologies, db_competes_new_technologies = query_databases(db_emlab, db_competes)
-
-        print('Staging next SpineDB alternative...')
-        step = next(int(i['parameter_value']) for i in db_config_parameters if i['object_name'] == 'Time Step')
-        db_emlab.import_alternatives([str(current_emlab_tick + step)])
-
-        path_to_competes_results = sys.argv[4]
-        file_name_gentransinv = sys.argv[5].replace('?', str(current_competes_tick + look_ahead))
-        file_name_gentransdisp = sys.argv[6].replace('?', str(current_competes_tick))
-
-        print('Loading sheets...')
-        hourly_nodal_prices_df, unit_generation_df, new_generation_capacity_df, decommissioning_df, vre_investment_df, \
-        hourly_nl_balance_df, yearly_emissions_df = read_excel_sheets(path_to_competes_results, file_name_gentransinv,
-                                                 file_name_gentransdisp)
-
-        new_generation_capacity_df = crop_dataframe_until_first_empty_row(new_generation_capacity_df)
-        vre_investment_df = crop_dataframe_until_first_empty_row(vre_investment_df)
-        decommissioning_df = crop_dataframe_until_first_empty_row(decommissioning_df)
-
-        # VRE Plants are added to unit_generation sheet
-        hourly_nl_balance_df = hourly_nl_balance_df.rename(columns={'Sun': 'SunPV', 'Wind Onshore': 'WindOn',
-                                                                    'Wind Offshore': 'WindOff'})
-        unit_generation_df = unit_generation_df.transpose().join(
-            hourly_nl_balance_df[['SunPV', 'WindOn', 'WindOff']]).replace(np.nan, 0)
-        print('Done loading sheets')
-
-        hourly_nodal_prices_nl = get_hourly_nodal_prices(hourly_nodal_prices_df)
-        export_vre_investment_decisions(db_emlab, db_competes, current_emlab_tick, current_competes_tick,
-                                        vre_investment_df, db_emlab_technologies, db_competes_vre_capacities,
-                                        step)
-        export_market_clearing_points_to_emlab(db_emlab, current_emlab_tick, hourly_nodal_prices_nl, db_emlab_mcps)
-        export_power_plant_dispatch_plans_to_emlab(db_emlab, current_emlab_tick, unit_generation_df, db_emlab_ppdps,
-                                                   hourly_nodal_prices_nl, db_emlab_powerplants)
-        export_investment_decisions_to_emlab_and_competes(db_emlab, db_competes, current_emlab_tick,
-                                                          new_generation_capacity_df, current_competes_tick,
-                                                          db_emlab_technologies, db_competes_new_technologies)
-        export_decommissioning_decisions_to_emlab_and_competes(db_competes, db_emlab, db_competes_powerplants,
-                                                               decommissioning_df, current_competes_tick,
-                                                               current_emlab_tick, look_ahead)
-        export_total_sum_exports_to_emlab(db_emlab, hourly_nl_balance_df, current_emlab_tick)
-        export_yearly_emissions_to_emlab(db_emlab, yearly_emissions_df, current_emlab_tick)
-
-        print('Committing...')
-        db_emlab.commit('Imported from COMPETES run ' + str(current_competes_tick))
-        db_competes.commit('Imported from COMPETES run ' + str(current_competes_tick))
-        print('Done')
+        import_competes_results(db_emlab, db_competes, db_config, sys.argv[4], sys.argv[5], sys.argv[6])
     except Exception as e:
         print('Exception occurred: ' + str(e))
         raise
@@ -0,0 +1,278 @@
+"""
+This script runs coupled ticks of EMLab and COMPETES in one process, instead of one process per script as in the
+SpineToolbox workflow. Every tick runs the steps of the workflow as functions, in the same order: EMLab preprocessing,
+the EMLab CO2 market, EMLab to COMPETES, COMPETES SpineDB to MS Access, COMPETES (AIMMS), COMPETES output to EMLab,
+the EMLab capacity market and the clock increment.
+
+The three SpineDBs are opened once and shared by all steps, EMLab included. The query results of an object class are
+kept (CachedSpineDB) and only queried again after a step imported into that object class. The EMLab Repository stays in
+memory, and is only refreshed with what changed in the SpineDB since the previous EMLab step (refresh_repository).
+The time of every step is recorded in a RunReport, which is written to logs/<run>-coupled-report.json and .csv.
+
+Arg1: URL of EMLAB SpineDB
+Arg2: URL of COMPETES SpineDB
+Arg3: URL of the configuration SpineDB
+Arg4: Path of the empty COMPETES MDB
+Arg5: Path of the empty COMPETES PowerPlants MDB
+Arg6: Number of ticks to run
+Arg7 (optional): initialize_clock, to set the clock to tick 0 first
+"""
+import inspect
+import logging
+import os
+import sys
+import time
+
+# EMLab is imported from emlabpy, as it is run from there in the SpineToolbox workflow
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'emlabpy'))
+
+import emlab
+import clock
+from util import spinedb as emlab_spinedb
+from util.run_report import RunReport
+from util.spinedb_reader_writer import SpineDBReaderWriter, SpineDBCallTimer
+from spinedb import SpineDB
+from helper_functions import get_current_ticks
+from emlab_preprocessing import preprocess_emlab
+from emlab_to_competes import export_emlab_to_competes
+from competes_spinedb_to_ms_access import export_competes_to_ms_access, AccessBackend
+from aimms_call_competes import call_competes
+from competes_to_emlab import import_competes_results
+
+# The functions of SpineDB of which the results are cached, with a function of the arguments that returns the object
+# classes the result depends on (None: all of the DB)
+cached_functions = {
+    'query_object_parameter_values_by_object_class': lambda args: {args[0]},
+    'query_object_parameter_values_by_object_classes': lambda args: set(args[0]),
+    'query_object_parameter_values_by_object_class_and_object_name': lambda args: {args[0]},
+    'export_data': lambda args: None,
+}
+
+
+def get_arguments(function, args, kwargs) -> list:
+    """
+    :return: The arguments of a call of the function in the order of its parameters, whether they were given
+    positionally or as keyword arguments
+    """
+    arguments = inspect.signature(function).bind(*args, **kwargs)
+    arguments.apply_defaults()
+    return list(arguments.arguments.values())
+
+
+def get_imported_object_class_names(function_name, args):
+    """
+    :param function_name: Name of the import function of SpineDB
+    :param args: Arguments of the import function, as returned by get_arguments
+    :return: Set of the object classes that are imported into
+    """
+    if function_name == 'import_data':
+        data = args[0]
+        return {i if isinstance(i, str) else i[0] for i in data.get('object_classes', [])} | \
+               {i[0] for entity_type in ['objects', 'object_parameters', 'object_parameter_values', 'object_groups']
+                for i in data.get(entity_type, [])}
+    if function_name == 'import_object_classes':
+        return {i if isinstance(i, str) else i[0] for i in args[0]}
+    if function_name in ['import_objects', 'import_object_parameter_values', 'import_object_groups']:
+        return {i[0] for i in args[0]}
+    return set()
+
+
+def get_cache_key(value):
+    """
+    :return: The value as hashable key: lists become tuples
+    """
+    return tuple(get_cache_key(i) for i in value) if isinstance(value, (list, tuple)) else value
+
+
+class SpineDBQueryCache:
+    """
+    The cached query results of one SpineDB. All CachedSpineDBs of the same SpineDB share it, so that an import through
+    one of them is seen by all.
+    """
+
+    def __init__(self):
+        # Key: (SpineDB type, function name, arguments), value: (object class names or None, result)
+        self.results = dict()
+
+    def invalidate(self, object_class_names):
+        """
+        Remove the results of these object classes, and of all that depend on the complete DB.
+        """
+        self.results = {key: (result_object_class_names, result) for (key, (result_object_class_names, result))
+                        in self.results.items()
+                        if result_object_class_names is not None and
+                        result_object_class_names.isdisjoint(object_class_names)}
+
+
+class CachedSpineDB:
+    """
+    Wrapper of an open SpineDB (of the scripts or of EMLab) that keeps the query results in a SpineDBQueryCache.
+    An import removes the results of the object classes it imports into, so queries always return what the SpineDB
+    would return. The results are shared: they must not be changed.
+
+    The amount of imported rows is added to the staged_rows of the counter. The time is measured by a SpineDBCallTimer
+    around it.
+    """
+
+    def __init__(self, db, cache: SpineDBQueryCache, counter):
+        self.db = db
+        self.cache = cache
+        self.counter = counter
+
+    def __getattr__(self, name):
+        attribute = getattr(self.db, name)
+        if not callable(attribute):
+            return attribute
+
+        def cached_call(*args, **kwargs):
+            if name in cached_functions.keys():
+                arguments = get_arguments(attribute, args, kwargs)
+                key = (type(self.db), name, get_cache_key(arguments))
+                if key not in self.cache.results.keys():
+                    self.cache.results[key] = (cached_functions[name](arguments), attribute(*args, **kwargs))
+                return self.cache.results[key][1]
+            if name.startswith('import_'):
+                arguments = get_arguments(attribute, args, kwargs)
+                self.cache.invalidate(get_imported_object_class_names(name, arguments))
+                self.counter.staged_rows += sum(len(i) for i in arguments[0].values()) if name == 'import_data' \
+                    else len(arguments[0])
+            return attribute(*args, **kwargs)
+        return cached_call
+
+
+class CoupledRun:
+    """
+    The SpineDBs, caches and EMLab Repository that are shared by the steps of all ticks of a coupled run.
+    The steps are run in the order of steps, every step is a function without arguments.
+    """
+
+    def __init__(self, db_emlab_url, db_competes_url, db_config_url, empty_mdb_files,
+                 aimms_services=(('spine_run_gentransdisp', False), ('spine_run_gentransinv', True)),
+                 path_to_competes_results='../../COMPETES/Results/',
+                 file_name_gentransinv='Output_Dynamic_Gen&Trans_?_Investments.xlsx',
+                 file_name_gentransdisp='Output_Dynamic_Gen&Trans_?_Dispatch.xlsx',
+                 backend_factory=AccessBackend, aimms_client=None):
+        """
+        :param empty_mdb_files: Paths of the empty MS Access DBs, see export_competes_to_ms_access
+        :param aimms_services: List of (AIMMS service name, True if the Look Ahead is added), run at the same time
+        :param path_to_competes_results: Path to the COMPETES Results folder
+        :param file_name_gentransinv: Filename of COMPETES output Gen&Trans with a "?" as placeholder for the year
+        :param file_name_gentransdisp: Filename of COMPETES output UC with a "?" as placeholder for the year
+        :param backend_factory: Function that returns a new backend of the MS Access export
+        :param aimms_client: AIMMSTaskClient. By default one to AIMMS on localhost
+        """
+        self.empty_mdb_files = empty_mdb_files
+        self.aimms_services = list(aimms_services)
+        self.path_to_competes_results = path_to_competes_results
+        self.file_name_gentransinv = file_name_gentransinv
+        self.file_name_gentransdisp = file_name_gentransdisp
+        self.backend_factory = backend_factory
+        self.aimms_client = aimms_client
+        # The time spent in SpineDB calls and the amount of imported rows of all steps, for the RunReport
+        self.db_time = 0.0
+        self.staged_rows = 0
+        self.run_report = RunReport()
+
+        print('Connecting to the SpineDBs...')
+        self.dbs = []
+        self.db_emlab = self.open_db(db_emlab_url)
+        self.db_competes = self.open_db(db_competes_url)
+        self.db_config = self.open_db(db_config_url)
+        # EMLab shares the connections and caches, through the SpineDB of EMLab. The SpineDBReaderWriter times its
+        # calls for the report of EMLab and for this run at once
+        self.spinedb_reader_writer = SpineDBReaderWriter(
+            db_emlab_url, db_config_url,
+            db=CachedSpineDB(emlab_spinedb.SpineDB(db_emlab_url, db_map=self.db_emlab.db_map),
+                             self.db_emlab.cache, self),
+            config_db=CachedSpineDB(emlab_spinedb.SpineDB(db_config_url, db_map=self.db_config.db_map),
+                                    self.db_config.cache, self),
+            timers=[self])
+        self.reps = None
+
+        self.steps = [('EMLAB Preprocessing', self.preprocess_emlab),
+                      ('EMLAB CO2 Market', self.run_co2_market),
+                      ('EMLAB to COMPETES', self.export_emlab_to_competes),
+                      ('COMPETES SpineDB to MS Access', self.export_competes_to_ms_access),
+                      ('COMPETES', self.call_competes),
+                      ('COMPETES to EMLAB', self.import_competes_results),
+                      ('EMLAB Capacity Market', self.run_capacity_market),
+                      ('Increment Clock', self.increment_clock)]
+
+    def open_db(self, url):
+        db = SpineDBCallTimer(CachedSpineDB(SpineDB(url), SpineDBQueryCache(), self), [self])
+        self.dbs.append(db)
+        return db
+
+    def close(self):
+        print('Closing database connections...')
+        for db in self.dbs:
+            db.close_connection()
+
+    def get_current_emlab_tick(self):
+        return get_current_ticks(self.db_emlab, 0)[0]
+
+    def initialize_clock(self):
+        clock.initialize_clock(self.db_emlab)
+
+    def preprocess_emlab(self):
+        preprocess_emlab(self.db_emlab, self.db_config)
+
+    def run_co2_market(self):
+        self.reps = emlab.run_emlab(self.spinedb_reader_writer, run_co2_market=True, reps=self.reps)
+
+    def export_emlab_to_competes(self):
+        export_emlab_to_competes(self.db_emlab, self.db_competes, self.db_config)
+
+    def export_competes_to_ms_access(self):
+        export_competes_to_ms_access(self.db_competes, self.db_emlab, self.db_config, self.empty_mdb_files,
+                                     self.backend_factory)
+
+    def call_competes(self):
+        call_competes(self.db_emlab, self.db_config, self.aimms_services, self.aimms_client)
+
+    def import_competes_results(self):
+        import_competes_results(self.db_emlab, self.db_competes, self.db_config, self.path_to_competes_results,
+                                self.file_name_gentransinv, self.file_name_gentransdisp)
+
+    def run_capacity_market(self):
+        self.reps = emlab.run_emlab(self.spinedb_reader_writer, run_capacity_market=True, reps=self.reps)
+
+    def increment_clock(self):
+        clock.increment_clock(self.db_emlab, self.db_config)
+
+    def run_tick(self):
+        """
+        Run all steps of the current tick, each measured in the RunReport.
+        """
+        tick = self.get_current_emlab_tick()
+        for (name, step) in self.steps:
+            print('===== ' + name + ' (tick ' + str(tick) + ') =====')
+            with self.run_report.measure(name, tick, self):
+                step()
+
+    def run(self, ticks: int):
+        """
+        Run a number of ticks.
+        """
+        for _ in range(ticks):
+            self.run_tick()
+
+
+if __name__ == "__main__":
+    print('===== Starting Coupled Run =====')
+    if not os.path.isdir('logs'):
+        os.makedirs('logs')
+    run_name = 'logs/' + str(round(time.time() * 1000))
+    logging.basicConfig(filename=run_name + '-log.txt', level=logging.DEBUG)
+
+    coupled_run = CoupledRun(sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4:6])
+    try:
+        if len(sys.argv) > 7 and sys.argv[7] == 'initialize_clock':
+            coupled_run.initialize_clock()
+        coupled_run.run(int(sys.argv[6]))
+    finally:
+        # The steps are in the coupled report, the EMLab modules in the report of EMLab as in emlab.py
+        coupled_run.run_report.write(run_name + '-coupled-report')
+        coupled_run.spinedb_reader_writer.run_report.write(run_name + '-report')
+        coupled_run.close()
+    print('===== End of Coupled Run =====')
@@ -13,7 +13,7 @@ Arg2: URL to SpineDB COMPETES
 
 Jim Hommes - 29-6-2021
 """
-from spinedb import SpineDB
+from spinedb import SpineDB, as_query_result
 import sys
 
 
@@ -29,17 +29,16 @@ def replace_power_generating_technology_fuel_names(db_emlab, db_emlab_fuelmap, d
     :param db_emlab_technologies: Technologies as queried in EMLAB SPineDB
     """
     print('Setting correct PowerGeneratingTechnologyFuel names...')
+    db_emlab_technologies = as_query_result(db_emlab_technologies)
+    db_emlab_fuelmap = as_query_result(db_emlab_fuelmap)
     for row in db_emlab_technologies:
         if row['parameter_name'] == 'FUELTYPENEW':
-            old_substance_name = next(i['parameter_value'] for i in db_emlab_technologies if
-                                      i['object_name'] == row['object_name'] and i['parameter_name'] == 'FUELNEW')
+            old_substance_name = db_emlab_technologies.get_value(row['object_name'], 'FUELNEW')
             try:
-                new_substance_name = next(fm_row['parameter_value'] for fm_row in db_emlab_fuelmap if
-                                          fm_row['object_name'] == row['parameter_value']).get_value(
-                    old_substance_name)
+                new_substance_name = db_emlab_fuelmap.get_value(row['parameter_value']).get_value(old_substance_name)
                 db_emlab.import_object_parameter_values(
                     [('PowerGeneratingTechnologyFuel', row['object_name'], 'FUELNEW', new_substance_name, '0')])
-            except StopIteration:  # Not all technologies are in the FuelMap
+            except KeyError:  # Not all technologies are in the FuelMap
                 print('Tech not found in FuelMap: ' + row['parameter_value'])
     print('Done setting correct PowerGeneratingTechnologyFuel names')
 
@@ -70,11 +69,11 @@ def import_initial_vre_fixed_oc_start_values(db_emlab, db_competes_vre_technolog
     :param db_competes_vre_technologies:
     :return:
     """
+    db_emlab_technologies = as_query_result(db_emlab_technologies)
     for row in db_competes_vre_technologies:
         amount_fixed_oc_start = row['parameter_value'].get_value(str(initialization_year))\
             .get_value('Fixed O&M(Euro/kW/yr)') * 1000
-        trend_name = next(i['parameter_value'] for i in db_emlab_technologies if i['object_name'] == row['object_name']
-                          and i['parameter_name'] == 'fixedOperatingCostTimeSeries')
+        trend_name = db_emlab_technologies.get_value(row['object_name'], 'fixedOperatingCostTimeSeries')
         db_emlab.import_object_parameter_values([('GeometricTrends', trend_name, 'start', amount_fixed_oc_start, '0')])
 
 
@@ -89,13 +88,12 @@ def import_initial_fixed_oc_start_values(db_emlab, db_competes_technologies, db_
     :param db_emlab_technologies:
     :param initialization_year:
     """
+    db_emlab_technologies = as_query_result(db_emlab_technologies)
     for row in db_competes_technologies:
         technology_map = row['parameter_value']
         for technology_order in technology_map.indexes:
             amount_fixed_oc_start = technology_map.get_value(technology_order).get_value('FIXED O&M') * 1000
-            trend_name = next(i['parameter_value'] for i in db_emlab_technologies
-                              if i['object_name'] == technology_order
-                              and i['parameter_name'] == 'fixedOperatingCostTimeSeries')
+            trend_name = db_emlab_technologies.get_value(technology_order, 'fixedOperatingCostTimeSeries')
             db_emlab.import_object_parameter_values([('GeometricTrends', trend_name, 'start',
                                                       amount_fixed_oc_start, '0')])
 
@@ -119,9 +117,8 @@ def execute_all_initialization_preprocessing():
         db_competes_technologies = db_competes.query_object_parameter_values_by_object_class('Technologies')
         print('Done querying')
 
-        start_simulation_year = next(int(i['parameter_value']) for i in
-                                     db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
-                                     if i['object_name'] == 'Start Year')
+        start_simulation_year = int(db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
+                                    .get_value('Start Year'))
         replace_power_generating_technology_fuel_names(db_emlab, db_emlab_fuelmap, db_emlab_technologies_fuel)
         import_initial_vre(db_emlab, db_competes_vre_capacities, start_simulation_year)
         import_initial_fixed_oc_start_values(db_emlab, db_competes_technologies, db_emlab_technologies)
@@ -8,7 +8,7 @@ Arg1: URL to SpineDB EM-Lab
 Jim Hommes - 29-6-2021
 """
 import sys
-from spinedb import SpineDB
+from spinedb import SpineDB, as_query_result
 from helper_functions import get_current_ticks
 
 
@@ -25,6 +25,7 @@ def set_correct_power_plant_statuses(db_emlab, db_emlab_powerplants, current_com
     :param current_competes_tick: int
     """
     print('Setting correct powerplant statuses...')
+    db_emlab_powerplants = as_query_result(db_emlab_powerplants)
     powerplant_statuses = {row['object_name']: row['parameter_value'] for row in db_emlab_powerplants if
                            row['object_class_name'] == 'PowerPlants' and row['parameter_name'] == 'STATUSNL'}
 
@@ -83,9 +84,7 @@ def decom_power_plants_and_return_sum(list_of_plants, powerplant_statuses, curre
         if 'SUM' not in plant:
             powerplant_statuses[plant] = 'DECOM'
             if year <= current_competes_tick:
-                res += next(row['parameter_value'] for row in db_emlab_powerplants if
-                            row['object_class_name'] == 'PowerPlants' and row['object_name'] == plant and row[
-                                'parameter_name'] == 'MWNL')
+                res += as_query_result(db_emlab_powerplants).get_value(plant, 'MWNL')
     return res
 
 
@@ -109,17 +108,16 @@ def hotfix_disable_double_vre_plants(db_emlab, current_emlab_tick):
                                              for i in object_names])
 
 
-def execute_all_preprocessing():
+def preprocess_emlab(db_emlab, db_config):
     """
-    This function executes all steps of this script.
+    All steps of this script on open SpineDBs, without closing them.
+
+    :param db_emlab: SpineDB of EMLab
+    :param db_config: SpineDB of the simulation configuration
     """
-    print('Creating connection to SpineDB...')
-    db_emlab = SpineDB(sys.argv[1])
-    db_config = SpineDB(sys.argv[2])
     print('Querying SpineDB...')
-    start_simulation_year = next(int(i['parameter_value']) for i
-                                 in db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
-                                 if i['object_name'] == 'Start Year')
+    start_simulation_year = int(db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
+                                .get_value('Start Year'))
     db_emlab_powerplants = db_emlab.query_object_parameter_values_by_object_class('PowerPlants')
 
     current_emlab_tick, current_competes_tick, current_competes_tick_rounded = get_current_ticks(db_emlab,
@@ -129,13 +127,22 @@ def execute_all_preprocessing():
     print('Current EMLAB Tick: ' + str(current_emlab_tick))
     print('Current COMPETES Tick: ' + str(current_competes_tick))
 
-    try:
-        set_correct_power_plant_statuses(db_emlab, db_emlab_powerplants, current_competes_tick)
-        hotfix_disable_double_vre_plants(db_emlab, current_emlab_tick)
+    set_correct_power_plant_statuses(db_emlab, db_emlab_powerplants, current_competes_tick)
+    hotfix_disable_double_vre_plants(db_emlab, current_emlab_tick)
+
+    print('Committing...')
+    db_emlab.commit('DB EMLAB Preprocessing tick ' + str(current_competes_tick))
 
-        print('Committing...')
-        db_emlab.commit('DB EMLAB Preprocessing tick ' + str(current_competes_tick))
 
+def execute_all_preprocessing():
+    """
+    This function executes all steps of this script.
+    """
+    print('Creating connection to SpineDB...')
+    db_emlab = SpineDB(sys.argv[1])
+    db_config = SpineDB(sys.argv[2])
+    try:
+        preprocess_emlab(db_emlab, db_config)
     except Exception as e:
         print('Exception thrown: ' + str(e))
         raise
@@ -9,7 +9,7 @@ Jim Hommes - 1-6-2021
 """
 import sys
 import math
-from spinedb import SpineDB
+from spinedb import SpineDB, as_query_result
 from helper_functions import get_current_ticks
 
 
@@ -165,11 +165,9 @@ def get_cm_market_clearing_price(tick, db_emlab_marketclearingpoints):
     :param db_emlab_marketclearingpoints: MCPs as queried from SpineDB EMLab
     :return: MCP (float)
     """
-    market_clearing_point = next(row['object_name'] for row in db_emlab_marketclearingpoints if
-                                 row['parameter_name'] == 'Market' and row[
-                                     'parameter_value'] == 'DutchCapacityMarket' and row['alternative'] == str(tick))
-    market_clearing_price = next(row['parameter_value'] for row in db_emlab_marketclearingpoints if
-                                 row['object_name'] == market_clearing_point and row['parameter_name'] == 'Price')
+    db_emlab_marketclearingpoints = as_query_result(db_emlab_marketclearingpoints)
+    market_clearing_point = db_emlab_marketclearingpoints.get_object_name('Market', 'DutchCapacityMarket', str(tick))
+    market_clearing_price = db_emlab_marketclearingpoints.get_value(market_clearing_point, 'Price')
     market_clearing_price = market_clearing_price / 1000  # EMLAB is in Euro / MWh - COMPETES is in Euro / kWh
     print('Current CM Market Clearing Price: ' + str(market_clearing_price))
     return market_clearing_price
@@ -187,23 +185,20 @@ def get_participating_technologies_in_capacity_market(db_emlab_powerplantdispatc
     :param current_emlab_tick: int
     :return: Set of technology names
     """
-    capacity_market_ppdps = [row['object_name'] for row in db_emlab_powerplantdispatchplans if
-                             row['parameter_name'] == 'Market' and row['parameter_value'] == 'DutchCapacityMarket' and
-                             row['alternative'] == str(current_emlab_tick - step)]
-    capacity_market_accepted_ppdps = [row['object_name'] for row in db_emlab_powerplantdispatchplans if
+    db_emlab_powerplantdispatchplans = as_query_result(db_emlab_powerplantdispatchplans)
+    db_emlab_powerplants = as_query_result(db_emlab_powerplants)
+    capacity_market_ppdps = set(db_emlab_powerplantdispatchplans.get_object_names('Market', 'DutchCapacityMarket',
+                                                                                  str(current_emlab_tick - step)))
+    capacity_market_accepted_ppdps = {row['object_name'] for row in db_emlab_powerplantdispatchplans if
                                       row['object_name'] in capacity_market_ppdps and row[
-                                          'parameter_name'] == 'AcceptedAmount' and row['parameter_value'] > 0]
+                                          'parameter_name'] == 'AcceptedAmount' and row['parameter_value'] > 0}
     capacity_market_participating_plants = [row['parameter_value'] for row in db_emlab_powerplantdispatchplans if
                                             row['object_name'] in capacity_market_accepted_ppdps and row[
                                                 'parameter_name'] == 'Plant']
     capacity_market_participating_tech_fuel_combinations = set()
     for plant in capacity_market_participating_plants:
-        tech = next(row['parameter_value'] for row in db_emlab_powerplants if
-                    row['object_name'] == plant and
-                    row['parameter_name'] == 'TECHTYPENL')
-        fuel = next(row['parameter_value'] for row in db_emlab_powerplants if
-                    row['object_name'] == plant and
-                    row['parameter_name'] == 'FUELNL')
+        tech = db_emlab_powerplants.get_value(plant, 'TECHTYPENL')
+        fuel = db_emlab_powerplants.get_value(plant, 'FUELNL')
         capacity_market_participating_tech_fuel_combinations.add((tech, fuel))
     return capacity_market_participating_tech_fuel_combinations
 
@@ -259,11 +254,9 @@ def get_co2_market_clearing_price(db_emlab_marketclearingpoints, current_emlab_t
     :return: The market clearing price (float)
     """
     print('Loading CO2 MarketClearingPrice...')
-    mcp_object = next(row['object_name'] for row in db_emlab_marketclearingpoints if
-                      row['parameter_name'] == 'Market' and row['parameter_value'] == 'CO2Auction' and row[
-                          'alternative'] == str(current_emlab_tick))
-    mcp = next(row['parameter_value'] for row in db_emlab_marketclearingpoints if
-               row['object_name'] == mcp_object and row['parameter_name'] == 'Price')
+    db_emlab_marketclearingpoints = as_query_result(db_emlab_marketclearingpoints)
+    mcp_object = db_emlab_marketclearingpoints.get_object_name('Market', 'CO2Auction', str(current_emlab_tick))
+    mcp = db_emlab_marketclearingpoints.get_value(mcp_object, 'Price')
     print('Price found: ' + str(mcp))
     return mcp
 
@@ -311,6 +304,45 @@ def initialize_co2_spine_structure(db_competes, current_competes_tick, object_cl
     print('Done exporting CO2 structure')
 
 
+def export_emlab_to_competes(db_emlab, db_competes, db_config):
+    """
+    All steps of this script on open SpineDBs, without closing them.
+
+    :param db_emlab: SpineDB of EMLab
+    :param db_competes: SpineDB of COMPETES
+    :param db_config: SpineDB of the simulation configuration
+    """
+    print('Querying databases...')
+    db_emlab_marketclearingpoints = db_emlab.query_object_parameter_values_by_object_class('MarketClearingPoints')
+    db_emlab_powerplantdispatchplans = db_emlab.query_object_parameter_values_by_object_class(
+        'PowerPlantDispatchPlans')
+    db_emlab_powerplants = db_emlab.query_object_parameter_values_by_object_class('PowerPlants')
+    db_config_parameters = db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
+    print('Done querying Databases')
+
+    time_step = int(db_config_parameters.get_value('Time Step'))
+    start_simulation_year = int(db_config_parameters.get_value('Start Year'))
+    look_ahead = int(db_config_parameters.get_value('Look Ahead'))
+    current_emlab_tick, current_competes_tick, current_competes_tick_rounded = get_current_ticks(db_emlab, start_simulation_year)
+    print('Current EMLAB Tick: ' + str(current_emlab_tick))
+    print('Current COMPETES Tick: ' + str(current_competes_tick))
+
+    co2_object_class_name = 'EU_ETS_CO2price'
+    months = ['Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    initialize_co2_spine_structure(db_competes, current_competes_tick, co2_object_class_name, months, look_ahead)
+    export_co2_market_clearing_price(db_competes, db_emlab_marketclearingpoints, current_emlab_tick,
+                                     co2_object_class_name, current_competes_tick, months, look_ahead)
+    export_capacity_market_revenues(db_competes, current_emlab_tick, db_emlab_powerplantdispatchplans,
+                                    db_emlab_marketclearingpoints, current_competes_tick, time_step,
+                                    db_emlab_powerplants, look_ahead)
+
+    print('Committing...')
+    db_competes.commit('Committing EMLAB to COMPETES script. EMLab tick: ' + str(current_emlab_tick) +
+                       ', COMPETES tick: ' + str(current_competes_tick))
+
+    print('Done!')
+
+
 def execute_export_to_competes():
     """
     This function runs all the scripts in this file.
@@ -322,37 +354,7 @@ def execute_export_to_competes():
     print('Done establishing connections')
 
     try:
-        print('Querying databases...')
-        db_emlab_marketclearingpoints = db_emlab.query_object_parameter_values_by_object_class('MarketClearingPoints')
-        db_emlab_powerplantdispatchplans = db_emlab.query_object_parameter_values_by_object_class(
-            'PowerPlantDispatchPlans')
-        db_emlab_powerplants = db_emlab.query_object_parameter_values_by_object_class('PowerPlants')
-        db_config_parameters = db_config.query_object_parameter_values_by_object_class('Coupling Parameters')
-        print('Done querying Databases')
-
-        time_step = next(int(i['parameter_value']) for i in db_config_parameters if i['object_name'] == 'Time Step')
-        start_simulation_year = next(int(i['parameter_value']) for i in db_config_parameters
-                                     if i['object_name'] == 'Start Year')
-        look_ahead = next(int(i['parameter_value']) for i in db_config_parameters
-                          if i['object_name'] == 'Look Ahead')
-        current_emlab_tick, current_competes_tick, current_competes_tick_rounded = get_current_ticks(db_emlab, start_simulation_year)
-        print('Current EMLAB Tick: ' + str(current_emlab_tick))
-        print('Current COMPETES Tick: ' + str(current_competes_tick))
-
-        co2_object_class_name = 'EU_ETS_CO2price'
-        months = ['Jan', 'Feb', 'March', 'April', 'May', 'June', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        initialize_co2_spine_structure(db_competes, current_competes_tick, co2_object_class_name, months, look_ahead)
-        export_co2_market_clearing_price(db_competes, db_emlab_marketclearingpoints, current_emlab_tick,
-                                         co2_object_class_name, current_competes_tick, months, look_ahead)
-        export_capacity_market_revenues(db_competes, current_emlab_tick, db_emlab_powerplantdispatchplans,
-                                        db_emlab_marketclearingpoints, current_competes_tick, time_step,
-                                        db_emlab_powerplants, look_ahead)
-
-        print('Committing...')
-        db_competes.commit('Committing EMLAB to COMPETES script. EMLab tick: ' + str(current_emlab_tick) +
-                           ', COMPETES tick: ' + str(current_competes_tick))
-
-        print('Done!')
+        export_emlab_to_competes(db_emlab, db_competes, db_config)
     except Exception as e:
         print('Exception occurred: ' + str(e))
         raise
@@ -2,7 +2,9 @@ import matplotlib.pyplot as plt
 import os
 import pandas
 import numpy as np
-from spinedb import SpineDB
+from spinedb import SpineDB, as_query_result
+from competes_output_cache import read_workbook_sheet, read_workbook_sheets, plot_dispatch_sheets, \
+    plot_investment_sheets
 import pandas as pd
 
 
@@ -15,12 +17,12 @@ def get_participating_technologies_in_capacity_market(db_emlab_powerplantdispatc
     :param db_emlab_powerplantdispatchplans: PPDPs as queried from SpineDB EMLab
     :return: Set of technology names
     """
+    db_emlab_powerplantdispatchplans = as_query_result(db_emlab_powerplantdispatchplans)
+    db_emlab_powerplants = as_query_result(db_emlab_powerplants)
     capacity_market_aggregated_per_tech = pd.DataFrame()
     for year in years_emlab:
-        capacity_market_ppdps = [row['object_name'] for row in db_emlab_powerplantdispatchplans if
-                                 row['parameter_name'] == 'Market' and
-                                 row['parameter_value'] == 'DutchCapacityMarket' and
-                                 row['alternative'] == str(year)]
+        capacity_market_ppdps = set(db_emlab_powerplantdispatchplans.get_object_names('Market', 'DutchCapacityMarket',
+                                                                                      str(year)))
         capacity_market_accepted_ppdps = [row['object_name'] for row in db_emlab_powerplantdispatchplans if
                                           row['object_name'] in capacity_market_ppdps and
                                           row['parameter_name'] == 'AcceptedAmount' and
@@ -29,18 +31,10 @@ def get_participating_technologies_in_capacity_market(db_emlab_powerplantdispatc
         list_of_tech_fuel_cominations = []
         capacity_market_participating_capacities = []
         for ppdp in capacity_market_accepted_ppdps:
-            plant_name = next(row['parameter_value'] for row in db_emlab_powerplantdispatchplans if
-                              row['object_name'] == ppdp and
-                              row['parameter_name'] == 'Plant')
-            plant_accepted_amount = next(row['parameter_value'] for row in db_emlab_powerplantdispatchplans if
-                                  row['object_name'] == ppdp and
-                                  row['parameter_name'] == 'AcceptedAmount')
-            plant_technology = next(row['parameter_value'] for row in db_emlab_powerplants if
-                                    row['object_name'] == plant_name and
-                                    row['parameter_name'] == 'TECHTYPENL')
-            plant_fuel = next(row['parameter_value'] for row in db_emlab_powerplants if
-                              row['object_name'] == plant_name and
-                              row['parameter_name'] == 'FUELNL')
+            plant_name = db_emlab_powerplantdispatchplans.get_value(ppdp, 'Plant')
+            plant_accepted_amount = db_emlab_powerplantdispatchplans.get_value(ppdp, 'AcceptedAmount')
+            plant_technology = db_emlab_powerplants.get_value(plant_name, 'TECHTYPENL')
+            plant_fuel = db_emlab_powerplants.get_value(plant_name, 'FUELNL')
             list_of_tech_fuel_cominations.append(plant_technology + ', ' + plant_fuel)
             capacity_market_participating_capacities.append(plant_accepted_amount)
 
@@ -55,8 +49,7 @@ def get_participating_technologies_in_capacity_market(db_emlab_powerplantdispatc
 
 def plot_mcps_with_filter(db_mcps, market, years_to_generate, path_to_plots, title, file_name, yl, ylim):
     # MCP Plots
-    filtered_mcps = [i['object_name'] for i in db_mcps if
-                     i['parameter_name'] == 'Market' and i['parameter_value'] == market]
+    filtered_mcps = set(as_query_result(db_mcps).get_object_names('Market', market))
     mcp_x = []
     mcp_y = []
 
@@ -160,8 +153,8 @@ def plot_co2_emissions(co2_emission_sums, years_to_generate, path_to_plots):
 def plot_nl_unit_generation(path_and_filename_dispatch, year, path_to_plots):
     print('Plot NL Unit Generation')
     # Plot 3 NL Unit Generation curve
-    nl_unit_generation_df = pandas.read_excel(path_and_filename_dispatch, 'NL Unit Generation', skiprows=1, index_col=0,
-                                              header=0).transpose()
+    nl_unit_generation_df = read_workbook_sheet(path_and_filename_dispatch, 'NL Unit Generation', index_col=0,
+                                                skiprows=1).transpose()
 
     plt.figure()
     axs3 = nl_unit_generation_df.plot()
@@ -192,11 +185,9 @@ def plot_and_prepare_hourly_nodal_price_duration_curve(hourly_nodal_prices_df, y
     return price_duration_curves
 
 
-def plot_hourly_nodal_prices(path_and_filename_dispatch, year, path_to_plots):
+def plot_hourly_nodal_prices(hourly_nodal_prices_df, year, path_to_plots):
     # Plot 2 Hourly Nodal Prices
-    print('Read and create hourly nodal prices plot')
-    hourly_nodal_prices_df = pandas.read_excel(path_and_filename_dispatch, 'Hourly Nodal Prices', skiprows=1,
-                                               index_col=0)
+    print('Create hourly nodal prices plot')
     # hourly_nodal_prices_df[hourly_nodal_prices_df > 250] = 250
 
     plt.figure()
@@ -263,11 +254,10 @@ def prepare_annual_nl_balance(hourly_nl_balance_df, annual_balance, years_to_gen
     return annual_balance
 
 
-def plot_hourly_nl_balance(path_and_filename_dispatch, path_to_plots, year):
+def plot_hourly_nl_balance(hourly_nl_balance_df, path_to_plots, year):
     # Plot 1 Hourly NL Balance (per year)
-    print('Read and Create Hourly NL Balance plot')
-    hourly_nl_balance_df = pandas.read_excel(path_and_filename_dispatch, 'Hourly NL Balance', skiprows=1, index_col=0,
-                                             skipfooter=2, usecols='A:W').replace(np.nan, 0)
+    print('Create Hourly NL Balance plot')
+    hourly_nl_balance_df = hourly_nl_balance_df.replace(np.nan, 0)
     hourly_nl_balance_demand = hourly_nl_balance_df['Demand']
     hourly_nl_balance_df = hourly_nl_balance_df.drop(['Demand'], axis=1)
     hourly_nl_balance_df['Exports'] = -1 * hourly_nl_balance_df['Exports']
@@ -296,10 +286,9 @@ def plot_hourly_nl_balance(path_and_filename_dispatch, path_to_plots, year):
     return hourly_nl_balance_df, hourly_nl_balance_demand
 
 
-def prepare_co2_emission_data(path_and_filename_dispatch, co2_emission_sums, years_to_generate, year):
+def prepare_co2_emission_data(co2_emissions, co2_emission_sums, years_to_generate, year):
     # Preparing values for CO2 Emissions plot, plot after years iterations
     print('Prepare CO2 Emission plot data')
-    co2_emissions = pandas.read_excel(path_and_filename_dispatch, 'CO2 Emissions tech', skiprows=1, index_col=0)
     co2_emissions.columns = [i[0] + ',' + i[1] for i in zip(co2_emissions.columns.values, co2_emissions.iloc[0].values)]
 
     for index, value in co2_emissions.loc['NED'].iteritems():
@@ -314,10 +303,9 @@ def prepare_co2_emission_data(path_and_filename_dispatch, co2_emission_sums, yea
     return co2_emission_sums
 
 
-def prepare_vre_investment_data(path_and_filename_investments, vre_investment_sums, years_to_generate, year):
+def prepare_vre_investment_data(vre_investments, vre_investment_sums, years_to_generate, year):
     # Preparing values for VRE Investments plot, plot after years iterations
     print('Preparing VRE Investment data')
-    vre_investments = pandas.read_excel(path_and_filename_investments, 'VRE investment', skiprows=2)
     for index, row in vre_investments[vre_investments['Bus'] == 'NED'].iterrows():
         if row['WindOn'] in vre_investment_sums.keys():
             vre_investment_sums[row['WindOn']].append(row['Initial'])
@@ -330,14 +318,12 @@ def prepare_vre_investment_data(path_and_filename_investments, vre_investment_su
     return vre_investment_sums
 
 
-def prepare_investment_and_decom_data(path_and_filename_investments, investment_sums, years_to_generate, year,
+def prepare_investment_and_decom_data(decommissioning, investments, investment_sums, years_to_generate, year,
                                       emlab_spine_powerplants_tech_dict, emlab_spine_powerplants_fuel_dict,
                                       emlab_spine_technologies, look_ahead, nl_investment_sums):
-    print('Loading investment and decom data')
-    decommissioning = pandas.read_excel(path_and_filename_investments, 'Decommissioning', skiprows=2, usecols='A:C')
+    print('Preparing investment and decom data')
     decommissioning = decommissioning.dropna()
     nl_decommissioning = decommissioning[decommissioning['node'] == 'NED'].copy()
-    investments = pandas.read_excel(path_and_filename_investments, 'New Generation Capacity', skiprows=2, usecols="A:D")
     investments = investments.dropna()
     nl_investments = investments[investments['Node'] == 'NED'].copy()
 
@@ -374,15 +360,12 @@ def prepare_decom_data(decommissioning, emlab_spine_powerplants_tech_dict, inves
 
 
 def get_year_online_by_technology(db_emlab_technologies, fuel, techtype, current_competes_tick):
-    technologies_by_fuel = [i['object_name'] for i in db_emlab_technologies if
-                            i['parameter_name'] == 'FUELNEW' and i['parameter_value'] == fuel]
-    technologies_by_techtype = [i['object_name'] for i in db_emlab_technologies if
-                                i['parameter_name'] == 'FUELTYPENEW' and i['parameter_value'] == techtype]
-    technology = next(name for name in technologies_by_fuel if name in technologies_by_techtype)
-    expected_permit_time = next(int(i['parameter_value']) for i in db_emlab_technologies if
-                                i['object_name'] == technology and i['parameter_name'] == 'expectedPermittime')
-    expected_lead_time = next(int(i['parameter_value']) for i in db_emlab_technologies if
-                              i['object_name'] == technology and i['parameter_name'] == 'expectedLeadtime')
+    db_emlab_technologies = as_query_result(db_emlab_technologies)
+    technologies_by_techtype = set(db_emlab_technologies.get_object_names('FUELTYPENEW', techtype))
+    technology = next(name for name in db_emlab_technologies.get_object_names('FUELNEW', fuel)
+                      if name in technologies_by_techtype)
+    expected_permit_time = int(db_emlab_technologies.get_value(technology, 'expectedPermittime'))
+    expected_lead_time = int(db_emlab_technologies.get_value(technology, 'expectedLeadtime'))
     build_time = expected_permit_time + expected_lead_time
     return current_competes_tick + build_time
 
@@ -407,9 +390,8 @@ def prepare_investment_data(investments, investment_sums, years_to_generate, yea
     return investment_sums, investments
 
 
-def prepare_annual_installed_capacity(path_and_filename_dispatch, emlab_spine_powerplants_tech_dict,
+def prepare_annual_installed_capacity(installed_capacity_df, emlab_spine_powerplants_tech_dict,
                                       annual_installed_capacity, year, years_to_generate):
-    installed_capacity_df = pandas.read_excel(path_and_filename_dispatch, 'Initial generation capacity', skiprows=2)
     installed_capacity_df = installed_capacity_df[installed_capacity_df['i'] == 'NED']
     installed_capacity_df['Technology'] = [emlab_spine_powerplants_tech_dict[i] for i in
                                            installed_capacity_df['h'].values]
@@ -467,8 +449,7 @@ def plot_capacity_market_technologies(capacity_market_participating_technologies
 def plot_capacity_market_revenues(capacity_market_participating_technologies_peryear, db_mcps, path_to_plots,
                                   years_to_generate, years_emlab, title, file_name, yl):
     if len(capacity_market_participating_technologies_peryear.index) > 0:
-        filtered_mcps = [i['object_name'] for i in db_mcps if
-                         i['parameter_name'] == 'Market' and i['parameter_value'] == 'DutchCapacityMarket']
+        filtered_mcps = set(as_query_result(db_mcps).get_object_names('Market', 'DutchCapacityMarket'))
 
         years_dictionary = dict(zip(years_emlab, years_to_generate))
         for row in [i for i in db_mcps if i['object_name'] in filtered_mcps]:
@@ -558,26 +539,31 @@ def generate_plots():
         path_and_filename_investments = path_to_competes_results + '/' + filename_to_load_investment.replace('?',
                                                                                                              str(year + look_ahead))
 
+        # Reading the sheets, from the cache if they have been read before
+        hourly_nl_balance_df, co2_emissions, installed_capacity_df, hourly_nodal_prices_df = read_workbook_sheets(
+            path_and_filename_dispatch, plot_dispatch_sheets)
+        vre_investments, decommissioning, investments = read_workbook_sheets(path_and_filename_investments,
+                                                                             plot_investment_sheets)
+
         # Preparing Data
-        investment_sums, nl_investment_sums = prepare_investment_and_decom_data(path_and_filename_investments,
+        investment_sums, nl_investment_sums = prepare_investment_and_decom_data(decommissioning, investments,
                                                                                 investment_sums,
                                                                                 years_to_generate, year,
                                                                                 spine_powerplants_tech_dict,
                                                                                 spine_powerplants_fuel_dict,
                                                                                 emlab_spine_technologies,
                                                                                 look_ahead, nl_investment_sums)
-        vre_nl_installed_capacity = prepare_vre_investment_data(path_and_filename_investments,
+        vre_nl_installed_capacity = prepare_vre_investment_data(vre_investments,
                                                                 vre_nl_installed_capacity,
                                                                 years_to_generate, year)
-        co2_emission_sums = prepare_co2_emission_data(path_and_filename_dispatch, co2_emission_sums, years_to_generate,
-                                                      year)
-        annual_installed_capacity = prepare_annual_installed_capacity(path_and_filename_dispatch,
+        co2_emission_sums = prepare_co2_emission_data(co2_emissions, co2_emission_sums, years_to_generate, year)
+        annual_installed_capacity = prepare_annual_installed_capacity(installed_capacity_df,
                                                                       spine_powerplants_tech_dict,
                                                                       annual_installed_capacity, year,
                                                                       years_to_generate)
 
         # Plots
-        hourly_nl_balance_df, hourly_nl_balance_demand = plot_hourly_nl_balance(path_and_filename_dispatch,
+        hourly_nl_balance_df, hourly_nl_balance_demand = plot_hourly_nl_balance(hourly_nl_balance_df,
                                                                                 path_to_plots, year)
 
         # Another prepare data
@@ -589,7 +575,7 @@ def generate_plots():
         residual_load_curves = plot_and_prepare_residual_load_duration_curve(hourly_nl_balance_demand,
                                                                              hourly_nl_balance_df, year,
                                                                              path_to_plots, residual_load_curves)
-        hourly_nodal_prices_df = plot_hourly_nodal_prices(path_and_filename_dispatch, year, path_to_plots)
+        hourly_nodal_prices_df = plot_hourly_nodal_prices(hourly_nodal_prices_df, year, path_to_plots)
         price_duration_curves = plot_and_prepare_hourly_nodal_price_duration_curve(hourly_nodal_prices_df, year,
                                                                                    path_to_plots,
                                                                                    price_duration_curves)
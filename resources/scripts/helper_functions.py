@@ -5,6 +5,8 @@ An example that all of them use is to read the current year from the EMLAB Spine
 Jim Hommes - 29-6-2021
 """
 from spinedb import *
+import numpy as np
+import zlib
 
 
 def get_current_ticks(db: SpineDB, offset: int):
@@ -19,3 +21,38 @@ def get_current_ticks(db: SpineDB, offset: int):
     current_competes_tick = current_emlab_tick + offset
     current_competes_tick_rounded = offset + round(current_emlab_tick / 5) * 5
     return int(current_emlab_tick), int(current_competes_tick), int(current_competes_tick_rounded)
+
+
+def get_trend_seed(name: str) -> int:
+    """
+    COPIED FROM EMLAB (domain/trends.py)
+
+    Default seed of a trend: derived from its name, so that it is the same in every run (unlike hash()).
+    """
+    return zlib.crc32(name.encode())
+
+
+def draw_triangular_trend_paths(start, top, maximum, minimum, n_ticks: int, random_generator: np.random.Generator,
+                                n_paths=None) -> np.ndarray:
+    """
+    COPIED FROM EMLAB (domain/trends.py), keep them identical so that EMLab and COMPETES draw the same paths.
+
+    Draw the path(s) of a triangular trend. Every tick the value is multiplied with a factor around top, of which the
+    deviation is triangularly distributed between minimum and maximum.
+
+    :param start: The value at the first tick
+    :param top: The most likely growth factor
+    :param maximum: The maximum growth factor
+    :param minimum: The minimum growth factor
+    :param n_ticks: Number of ticks, including the start
+    :param random_generator: NumPy Generator to draw the random numbers from
+    :param n_paths: If None, one path is drawn. Otherwise the number of paths
+    :return: Array of shape (n_ticks,), or (n_paths, n_ticks) if n_paths is given
+    """
+    shape = (n_ticks - 1,) if n_paths is None else (n_paths, n_ticks - 1)
+    random_numbers = random_generator.triangular(-1, 0, 1, shape)
+    factors = np.where(random_numbers < 0, top + (random_numbers * (top - minimum)),
+                       top + (random_numbers * (maximum - top)))
+    starts = np.full(shape[:-1] + (1,), float(start))
+    # Cumulative product from the start value: the same as multiplying the last value with the factor every tick
+    return np.cumprod(np.concatenate((starts, factors), axis=-1), axis=-1)
@@ -5,6 +5,7 @@ File provided through Spine Demo by VTT, with additions made by Jim Hommes.
 29-6-2021
 """
 import logging
+import pandas
 
 from sqlalchemy.exc import ArgumentError as SQLAlchemyArgumentError
 from spinedb_api import DatabaseMapping, DiffDatabaseMapping
@@ -27,19 +28,128 @@ def _handle_errors(errors: list):
         logging.warning(e)
 
 
+class QueryResult(list):
+    """
+    The rows (dicts with object_class_name, object_name, parameter_name, parameter_value and alternative) as queried
+    by the query_object_parameter_values functions of SpineDB. It is a list of these rows, but can also look up rows
+    by object name, parameter name and alternative and the object names by parameter value. The indexes for this are
+    created at the first lookup, in one pass over the rows. The rows should not be changed after that.
+
+    When more rows match a lookup, the first one is used (as next() over the rows would).
+    """
+
+    def __init__(self, rows=()):
+        super().__init__(rows)
+        self._rows_by_key = None
+        self._object_names_by_value = None
+
+    def _create_indexes(self):
+        self._rows_by_key = dict()
+        self._object_names_by_value = dict()
+        for row in self:
+            # Every row can be found by its object name alone, with its parameter name and with its alternative
+            for key in [(row['object_name'], None, None), (row['object_name'], row['parameter_name'], None),
+                        (row['object_name'], row['parameter_name'], row['alternative'])]:
+                self._rows_by_key.setdefault(key, []).append(row)
+            for alternative in [None, row['alternative']]:
+                try:
+                    self._object_names_by_value.setdefault((row['parameter_name'], row['parameter_value'],
+                                                            alternative), []).append(row['object_name'])
+                except TypeError:  # Values such as Maps can not be hashed, so can not be looked up
+                    break
+
+    def get_rows(self, object_name, parameter_name=None, alternative=None):
+        """
+        :param object_name: Name of the object
+        :param parameter_name: Name of the parameter. If None, the rows of all parameters of the object
+        :param alternative: Name of the alternative. If None, the rows of all alternatives
+        :return: List of the matching rows, in queried order
+        """
+        if self._rows_by_key is None:
+            self._create_indexes()
+        if parameter_name is None and alternative is not None:
+            return [row for row in self._rows_by_key.get((object_name, None, None), [])
+                    if row['alternative'] == alternative]
+        return self._rows_by_key.get((object_name, parameter_name, alternative), [])
+
+    def get_value(self, object_name, parameter_name=None, alternative=None):
+        """
+        Raises:
+            KeyError: No row matches
+        :param object_name: Name of the object
+        :param parameter_name: Name of the parameter. If None, the first value of any parameter of the object
+        :param alternative: Name of the alternative. If None, the first value of any alternative
+        :return: The parameter value of the first matching row
+        """
+        rows = self.get_rows(object_name, parameter_name, alternative)
+        if len(rows) == 0:
+            raise KeyError((object_name, parameter_name, alternative))
+        return rows[0]['parameter_value']
+
+    def get_object_names(self, parameter_name, parameter_value, alternative=None):
+        """
+        Reverse lookup: the objects of which the parameter has a certain value.
+
+        :param parameter_name: Name of the parameter
+        :param parameter_value: Value of the parameter
+        :param alternative: Name of the alternative. If None, the rows of all alternatives
+        :return: List of object names, one for every matching row in queried order
+        """
+        if self._object_names_by_value is None:
+            self._create_indexes()
+        return self._object_names_by_value.get((parameter_name, parameter_value, alternative), [])
+
+    def get_object_name(self, parameter_name, parameter_value, alternative=None):
+        """
+        Raises:
+            KeyError: No row matches
+        :return: The object name of the first row of which the parameter has the value
+        """
+        object_names = self.get_object_names(parameter_name, parameter_value, alternative)
+        if len(object_names) == 0:
+            raise KeyError((parameter_name, parameter_value, alternative))
+        return object_names[0]
+
+    def to_dataframe(self, alternative=None):
+        """
+        Pivot the rows to a wide DataFrame: one row per object and one column per parameter.
+
+        :param alternative: Name of the alternative. If None, the first value of any alternative
+        :return: DataFrame indexed by object name. Parameters an object does not have are NaN
+        """
+        values_by_object_name = dict()
+        for row in self:
+            if alternative is None or row['alternative'] == alternative:
+                values_by_object_name.setdefault(row['object_name'], dict()).setdefault(row['parameter_name'],
+                                                                                        row['parameter_value'])
+        return pandas.DataFrame.from_dict(values_by_object_name, orient='index')
+
+
+def as_query_result(rows):
+    """
+    :param rows: QueryResult or list of rows as queried from SpineDB
+    :return: The rows as QueryResult. A QueryResult is returned as is, so that its indexes are kept
+    """
+    return rows if isinstance(rows, QueryResult) else QueryResult(rows)
+
+
 class SpineDB(object):
     """
     Class for working with a Spine database, especially when adding data
     """
 
-    def __init__(self, url: str, mode='r', create=False):
+    def __init__(self, url: str, mode='r', create=False, db_map=None):
         """
         Open Spine database at url for modifying
         
         Raises:
             RuntimeError: Could not open database
+        :param db_map: An open DatabaseMapping of the database at url. If given, it is used instead of opening
+        the database again, so that one connection can be shared
         """
-        if mode == 'r' and not create:
+        if db_map is not None:
+            self._db_map = db_map
+        elif mode == 'r' and not create:
             self._open_db_reading(url)
         elif mode == 'w' and not create:
             self._open_db_writing(url)
@@ -279,22 +389,30 @@ class SpineDB(object):
         """
         self._db_map.connection.close()
 
+    @property
+    def db_map(self):
+        """
+        The open DatabaseMapping, so that the connection can be shared with another SpineDB (see db_map of __init__).
+        """
+        return self._db_map
+
     def query_object_parameter_values_by_object_class(self, object_class_name):
         """
         When not all data is required, this function can be used to query all parameter values for a certain
         object class.
 
         :param object_class_name: Name of the object class.
-        :return: Dict with object_class_name, object_name, parameter_name, parameter_value and alternative
+        :return: QueryResult of dicts with object_class_name, object_name, parameter_name, parameter_value and
+            alternative
         """
         subquery = self._db_map.object_parameter_value_sq
-        return [{'object_class_name': value_row.object_class_name,
-                 'object_name': value_row.object_name,
-                 'parameter_name': value_row.parameter_name,
-                 'parameter_value': from_database(value_row.value, value_row.type),
-                 'alternative': value_row.alternative_name}
-                for value_row
-                in self._db_map.query(subquery).filter(subquery.c.object_class_name == object_class_name).all()]
+        return QueryResult({'object_class_name': value_row.object_class_name,
+                            'object_name': value_row.object_name,
+                            'parameter_name': value_row.parameter_name,
+                            'parameter_value': from_database(value_row.value, value_row.type),
+                            'alternative': value_row.alternative_name}
+                           for value_row
+                           in self._db_map.query(subquery).filter(subquery.c.object_class_name == object_class_name).all())
 
     def query_object_parameter_values_by_object_classes(self, object_class_name_list):
         """
@@ -302,16 +420,17 @@ class SpineDB(object):
         can be specified.
 
         :param object_class_name_list: List of object class names.
-        :return: Dict with object_class_name, object_name, parameter_name, parameter_value and alternative
+        :return: QueryResult of dicts with object_class_name, object_name, parameter_name, parameter_value and
+            alternative
         """
         subquery = self._db_map.object_parameter_value_sq
-        return [{'object_class_name': value_row.object_class_name,
-                 'object_name': value_row.object_name,
-                 'parameter_name': value_row.parameter_name,
-                 'parameter_value': value_row.value,
-                 'alternative': value_row.alternative_name}
-                for value_row
-                in self._db_map.query(subquery).filter(subquery.c.object_class_name.in_(object_class_name_list)).all()]
+        return QueryResult({'object_class_name': value_row.object_class_name,
+                            'object_name': value_row.object_name,
+                            'parameter_name': value_row.parameter_name,
+                            'parameter_value': value_row.value,
+                            'alternative': value_row.alternative_name}
+                           for value_row
+                           in self._db_map.query(subquery).filter(subquery.c.object_class_name.in_(object_class_name_list)).all())
 
     def query_object_parameter_values_by_object_class_and_object_name(self, object_class_name, object_name):
         """
@@ -320,13 +439,14 @@ class SpineDB(object):
 
         :param object_class_name: Name of the object class.
         :param object_name: Name of the object.
-        :return: Dict with object_class_name, object_name, parameter_name, parameter_value and alternative
+        :return: QueryResult of dicts with object_class_name, object_name, parameter_name, parameter_value and
+            alternative
         """
         subquery = self._db_map.object_parameter_value_sq
-        return [{'object_class_name': value_row.object_class_name,
-                 'object_name': value_row.object_name,
-                 'parameter_name': value_row.parameter_name,
-                 'parameter_value': from_database(value_row.value, value_row.type),
-                 'alternative': value_row.alternative_name}
-                for value_row
-                in self._db_map.query(subquery).filter(subquery.c.object_class_name == object_class_name).filter(subquery.c.object_name == object_name).all()]
+        return QueryResult({'object_class_name': value_row.object_class_name,
+                            'object_name': value_row.object_name,
+                            'parameter_name': value_row.parameter_name,
+                            'parameter_value': from_database(value_row.value, value_row.type),
+                            'alternative': value_row.alternative_name}
+                           for value_row
+                           in self._db_map.query(subquery).filter(subquery.c.object_class_name == object_class_name).filter(subquery.c.object_name == object_name).all())